@@ -0,0 +1,380 @@
+"""
+Alerts
+======
+بناء رسالة التنبيه من بيانات الرسالة المتطابقة، وإرسالها عبر dispatcher واحد:
+
+- rate limiter (token bucket) لكل وجهة.
+- FloodWait بيوقف الإرسال كله (global) بدل ما كل تنبيه ينام لوحده.
+- طابور محفوظ في القاعدة — التنبيه ما يتمسحش إلا بعد ما يتبعت فعلاً.
+- وضع الملخص (digest): تجميع التنبيهات لفترة/عدد وإرسالها في رسالة واحدة.
+- التنبيهات عالية القيمة (lead — scoring.py) بتتحط قبل باقي الطابور.
+"""
+
+import json
+import time
+import asyncio
+import logging
+from collections import deque
+
+from telethon import errors
+from telethon.tl.types import User
+
+from storage import Database
+from metrics import metrics
+
+log = logging.getLogger("userbot")
+
+# حد طول رسالة تيليجرام 4096 — نسيب هامش للـ markdown
+MESSAGE_LIMIT = 4000
+# طول مقتطف الرسالة جوه الملخص
+DIGEST_SNIPPET = 120
+# أقصى طول لنص الرسالة جوه التنبيه — الباقي (روابط/بيانات) لازم يفضل تحت MESSAGE_LIMIT
+ALERT_TEXT_LIMIT = 2500
+
+# أخطاء الوجهة نفسها (قناة اتمسحت/مفيش صلاحية/id غلط) — إعادة المحاولة لنفس الوجهة مش هتفيد
+PEER_ERRORS = (
+    ValueError,
+    errors.PeerIdInvalidError,
+    errors.ChannelInvalidError,
+    errors.ChannelPrivateError,
+    errors.ChatWriteForbiddenError,
+    errors.ChatAdminRequiredError,
+)
+
+# ──────────────────────────── HELPERS ───────────────────────────
+
+def build_message_link(chat: dict, msg_id: int) -> str:
+    """بناء رابط الرسالة من بيانات الجروب (entities.chat_info)."""
+    if chat.get("username"):
+        return f"https://t.me/{chat['username']}/{msg_id}"
+    if chat.get("id"):
+        # supergroup/channel خاص — internal id
+        internal_id = chat["id"]
+        return f"https://t.me/c/{internal_id}/{msg_id}"
+    return ""
+
+
+def get_sender_name(sender) -> str:
+    """الحصول على اسم المرسل."""
+    if sender is None:
+        return "مجهول"
+    if isinstance(sender, User):
+        parts = []
+        if sender.first_name:
+            parts.append(sender.first_name)
+        if sender.last_name:
+            parts.append(sender.last_name)
+        return " ".join(parts) if parts else "بدون اسم"
+    if hasattr(sender, "title"):
+        return sender.title
+    return "مجهول"
+
+# ──────────────────────────── FORMAT ────────────────────────────
+
+def format_alert(alert: dict) -> str:
+    """تحويل بيانات التنبيه (dict) لنص markdown جاهز للإرسال."""
+    sender_id = alert["sender_id"]
+    text = alert["text"]
+    if len(text) > ALERT_TEXT_LIMIT:
+        text = text[:ALERT_TEXT_LIMIT] + "…"
+    alert_lines = [
+        "🔴 **تنبيه جديد _(Monitor Bot)_**",
+        "",
+        "📨 **الرسالة:**",
+        f"> {text}",
+    ]
+    if alert.get("document"):
+        alert_lines.append(f"📎 **الملف:** {alert['document']}")
+    alert_lines += [
+        "",
+        f"👤 **المرسل:** {alert['sender_name']}",
+        f"🏷 **المجموعة:** {alert['chat_title']}",
+        f"⏰ **الوقت:** {alert['time']}",
+        "",
+        f"🎯 `{'`, `'.join(alert['matched'])}`",
+    ]
+    if "score" in alert:
+        category = f" — 📂 {alert['category']}" if alert.get("category") else ""
+        star = "🔥" if alert.get("lead") else "⭐"
+        alert_lines.append(f"{star} **الأهمية:** {alert['score']:g}{category}")
+
+    # نسخ مكررة من نفس الرسالة اتكتمت واتجمعت هنا
+    if alert.get("duplicates"):
+        chats = alert.get("duplicate_chats") or []
+        where = f" ({', '.join(chats)})" if chats else ""
+        alert_lines.append(f"🔁 **تكررت في {alert['duplicates']} رسالة أخرى**{where}")
+
+    alert_lines += [
+        "",
+        "ــــــــــــــــــــــــــــــــــــــــــــــــ",
+        "🚀 **خيارات التواصل السريع:**",
+        f"1️⃣ [اضغط هنا للمراسلة (رابط 1)](tg://user?id={sender_id})",
+        f"2️⃣ [اضغط هنا للمراسلة (رابط 2)](tg://openmessage?user_id={sender_id})",
+    ]
+
+    # إضافة رابط بروفايل لو فيه يوزرنيم
+    if alert["sender_username"]:
+        alert_lines.append(
+            f"3️⃣ [رابط المعرف (@{alert['sender_username']})](https://t.me/{alert['sender_username']})"
+        )
+
+    if alert["link"]:
+        alert_lines.append(f"3️⃣ [ذهاب للرسالة في الجروب]({alert['link']})")
+
+    alert_lines.append("")
+    alert_lines.append("👨‍💻 تم التطوير بواسطة: **المهندس / طه أيمن**")
+
+    return "\n".join(alert_lines)
+
+
+def format_digest(alerts: list[dict]) -> str:
+    """رسالة ملخص واحدة لعدة تنبيهات — مجمعة حسب المجموعة ثم الكلمات المتطابقة."""
+    groups: dict[str, dict[str, list[dict]]] = {}
+    for alert in alerts:
+        by_kw = groups.setdefault(alert["chat_title"], {})
+        by_kw.setdefault(", ".join(alert["matched"]), []).append(alert)
+
+    lines = [f"📬 **ملخص التنبيهات ({len(alerts)})**"]
+    for chat_title, by_kw in groups.items():
+        lines.append("")
+        lines.append(f"🏷 **{chat_title}**")
+        for keywords, items in by_kw.items():
+            lines.append(f"🎯 `{keywords}`")
+            for alert in items:
+                snippet = " ".join(alert["text"].split())
+                if len(snippet) > DIGEST_SNIPPET:
+                    snippet = snippet[:DIGEST_SNIPPET] + "…"
+                link = alert["link"] or f"tg://user?id={alert['sender_id']}"
+                dup = f" (🔁 {alert['duplicates']})" if alert.get("duplicates") else ""
+                lead = "🔥 " if alert.get("lead") else ""
+                lines.append(f"  • {lead}{alert['sender_name']}: {snippet} — [الرسالة]({link}){dup}")
+
+    lines.append("")
+    lines.append("👨‍💻 تم التطوير بواسطة: **المهندس / طه أيمن**")
+    return "\n".join(lines)
+
+# ──────────────────────────── RATE LIMIT ────────────────────────
+
+class TokenBucket:
+    """rate limiter بسيط: rate توكن في الثانية وسعة burst."""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+
+    def delay(self) -> float:
+        """ترجع 0 وتستهلك توكن لو متاح، وإلا عدد الثواني لحد التوكن الجاي."""
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+# ──────────────────────────── DISPATCHER ────────────────────────
+
+class AlertDispatcher:
+    """طابور إرسال واحد للتنبيهات — محفوظ في القاعدة ومراعي لـ FloodWait."""
+
+    # بعد كام محاولة فاشلة (غير FloodWait) يبقى dead letter — ما يفضلش سادد أول الطابور
+    DEAD_AFTER = 6
+
+    def __init__(self, client, store, rate_per_minute: float = 20, burst: int = 5):
+        self.client = client
+        self.store = store
+        self.rate = rate_per_minute / 60
+        self.burst = burst
+        self.buckets: dict = {}
+        self.pending: deque = deque()       # (id, alert)
+        self.wakeup = asyncio.Event()
+        self.flood_until = 0.0              # time.monotonic() — إيقاف عام بعد FloodWait
+        self.task: asyncio.Task = None
+        self.stats = {"sent": 0, "digests": 0, "flood_waits": 0, "retries": 0, "errors": 0, "dead": 0}
+
+    async def load(self):
+        """تحميل التنبيهات اللي ما اتبعتتش من التشغيل اللي فات."""
+        rows = await self.store.execute(Database.get_pending_alerts)
+        self.stats["dead"] = await self.store.execute(Database.count_dead_alerts)
+        items = [(alert_id, json.loads(payload)) for alert_id, payload in rows]
+        # ترتيب ثابت: الـ leads الأول وبعدهم الباقي — كل مجموعة بترتيب وصولها
+        self.pending.extend(sorted(items, key=lambda item: not item[1].get("lead")))
+        if rows:
+            log.info(f"📬  {len(rows)} تنبيه معلّق من التشغيل السابق — هيتبعتوا الآن.")
+            self.wakeup.set()
+
+    def start(self):
+        self.task = asyncio.create_task(self._run(), name="alert-dispatcher")
+
+    async def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
+            self.task = None
+
+    def __len__(self) -> int:
+        return len(self.pending)
+
+    async def enqueue(self, alert: dict):
+        """حفظ التنبيه في القاعدة ثم إضافته للطابور."""
+        alert["queued_at"] = time.time()
+        alert_id = await self.store.execute(
+            Database.add_pending_alert, json.dumps(alert, ensure_ascii=False)
+        )
+        item = (alert_id, alert)
+        if alert.get("lead"):
+            # قبل كل التنبيهات العادية — وبعد الـ leads اللي سبقته
+            index = 0
+            for _, queued in self.pending:
+                if not queued.get("lead"):
+                    break
+                index += 1
+            self.pending.insert(index, item)
+        else:
+            self.pending.append(item)
+        self.wakeup.set()
+
+    def target(self):
+        """الوجهة الحالية: القناة المحددة بـ /setlog أو Saved Messages."""
+        target_chat = self.store.get_config("log_channel") or "me"
+        # إذا كان الهدف هو قناة، تأكد من أنها رقم (int)
+        if target_chat != "me":
+            try:
+                target_chat = int(target_chat)
+            except ValueError:
+                pass
+        return target_chat
+
+    def _bucket(self, target) -> TokenBucket:
+        bucket = self.buckets.get(target)
+        if bucket is None:
+            bucket = self.buckets[target] = TokenBucket(self.rate, self.burst)
+        return bucket
+
+    def digest_settings(self) -> tuple[float, int]:
+        """(مدة النافذة بالثواني, أقصى عدد) — النافذة 0 يعني وضع الملخص مقفول."""
+        try:
+            window = float(self.store.get_config("digest_window") or 0)
+            count = int(self.store.get_config("digest_max") or 0)
+        except ValueError:
+            return 0.0, 0
+        return window, count or 20
+
+    def _digest_batch(self, count: int) -> tuple[list, str]:
+        """أكبر دفعة من أول الطابور (لحد count) يدخل ملخصها في رسالة واحدة."""
+        batch = []
+        text = ""
+        for item in self.pending:
+            if len(batch) >= count:
+                break
+            candidate = format_digest([a for _, a in batch] + [item[1]])
+            if batch and len(candidate) > MESSAGE_LIMIT:
+                break
+            batch.append(item)
+            text = candidate
+        return batch, text
+
+    async def _dead_letter(self, alert_id: int, alert: dict, error: Exception):
+        """التنبيه يطلع من أول الطابور — ويفضل في القاعدة (dead = 1) بسبب الفشل."""
+        self.pending.remove((alert_id, alert))
+        self.stats["dead"] += 1
+        log.error(f"☠️  تنبيه فشل نهائياً واتشال من الطابور ({type(error).__name__}): {error}")
+        try:
+            await self.store.execute(Database.dead_letter_alert, alert_id, f"{type(error).__name__}: {error}")
+        except Exception as e:
+            self.stats["errors"] += 1
+            log.error(f"❌  فشل حفظ التنبيه الفاشل: {e}")
+
+    async def _run(self):
+        while True:
+            if not self.pending:
+                self.wakeup.clear()
+                await self.wakeup.wait()
+                continue
+
+            # FloodWait عام — ما فيش إرسال لأي وجهة لحد ما يخلص
+            wait = self.flood_until - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+                continue
+
+            alert_id, alert = self.pending[0]
+            attempts = alert.get("attempts", 0)
+            # Saved Messages بس لو قناة الـ log نفسها طلعت مش صالحة — مش بعد أخطاء مؤقتة
+            target = "me" if alert.get("fallback") else self.target()
+
+            window, count = self.digest_settings()
+            if window > 0:
+                # وضع الملخص: نستنى لحد ما النافذة تخلص أو العدد يكتمل
+                # من أقدم تنبيه — lead جديد في أول الطابور ما يأخرش اللي قبله
+                oldest = min(queued.get("queued_at", 0) for _, queued in self.pending)
+                wait = oldest + window - time.time()
+                if wait > 0 and len(self.pending) < count:
+                    self.wakeup.clear()
+                    try:
+                        await asyncio.wait_for(self.wakeup.wait(), timeout=wait)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+                batch, text = self._digest_batch(count)
+            else:
+                batch, text = [(alert_id, alert)], format_alert(alert)
+
+            wait = self._bucket(target).delay()
+            if wait > 0:
+                await asyncio.sleep(wait)
+                continue
+
+            start = time.perf_counter()
+            try:
+                await self.client.send_message(target, text, parse_mode="md")
+            except errors.FloodWaitError as e:
+                self.stats["flood_waits"] += 1
+                self.flood_until = time.monotonic() + e.seconds
+                log.warning(f"⏳  FloodWait: إيقاف الإرسال {e.seconds} ثانية ({len(self.pending)} في الطابور)")
+                continue
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.stats["retries"] += 1
+                log.error(f"❌  خطأ في إرسال التنبيه إلى {target} (محاولة {attempts + 1}): {e}")
+                peer_error = isinstance(e, PEER_ERRORS)
+                if peer_error and target != "me":
+                    # الوجهة نفسها مش صالحة — المحاولة الجاية على Saved Messages على طول
+                    alert["attempts"] = attempts + 1
+                    alert["fallback"] = True
+                    continue
+                alert["attempts"] = attempts + 1
+                # النص نفسه مرفوض أو حتى Saved Messages رافضة — مفيش فايدة من التكرار
+                final = peer_error or isinstance(e, errors.MessageTooLongError)
+                if final or alert["attempts"] >= self.DEAD_AFTER:
+                    await self._dead_letter(alert_id, alert, e)
+                    continue
+                # خطأ تاني (شبكة/سيرفر) — نعيد المحاولة على نفس الوجهة بتأخير متزايد
+                await asyncio.sleep(min(60, 2 ** attempts))
+                continue
+
+            now = time.time()
+            metrics.observe("send", time.perf_counter() - start)
+            for item in batch:
+                # remove مش popleft — lead ممكن يكون دخل قدام الطابور أثناء الإرسال
+                self.pending.remove(item)
+                sent = item[1]
+                # من وقت التطابق لحد ما التنبيه اتبعت (rate limit + FloodWait + digest)
+                metrics.observe("alert_delay", now - sent.get("queued_at", now))
+            self.stats["sent"] += len(batch)
+            if len(batch) > 1:
+                self.stats["digests"] += 1
+                log.info(f"📬  ملخص — {len(batch)} تنبيه في رسالة واحدة")
+            else:
+                log.info(
+                    f"🔔  تنبيه — [{alert['chat_title']}] من {alert['sender_name']} "
+                    f"(الكلمات: {', '.join(alert['matched'])})"
+                )
+            try:
+                await self.store.execute(Database.del_pending_alerts, [i for i, _ in batch])
+            except Exception as e:
+                self.stats["errors"] += 1
+                log.error(f"❌  فشل حذف {len(batch)} تنبيه من الطابور: {e}")
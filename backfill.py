@@ -0,0 +1,188 @@
+"""
+Backfill
+========
+استرجاع الرسائل اللي فاتت وقت ما البوت كان واقف (Android قفل Termux مثلاً).
+
+- كل رسالة live بتحدّث "آخر رسالة اتشافت" للجروب بتاعها (في الذاكرة — بتتحفظ دفعات).
+- عند التشغيل كل جروب ليه علامة بتتفتح له فجوة: من آخر رسالة اتشافت لحد أول رسالة
+  live توصل بعد التشغيل.
+- run() بتمشي على الفجوات بـ iter_messages (من الأقدم للأحدث) بعدد محدود من الجروبات
+  في نفس الوقت، وتدخل الرسائل لنفس الـ pipeline من نفس بوابة الرسائل الـ live
+  (admit: المراقبة متوقفة؟ / نفس الرسالة من حساب تاني؟). التقدم بيتحفظ كل CHECKPOINT_EVERY
+  رسالة — لو البوت وقع في النص بيكمل من نفس المكان.
+"""
+
+import asyncio
+import logging
+
+from telethon import errors
+
+from storage import Database
+
+log = logging.getLogger("userbot")
+
+CHECKPOINT_EVERY = 100
+SAVE_INTERVAL = 30
+
+# ──────────────────────────── BACKFILL ──────────────────────────
+
+class Backfill:
+    """علامات آخر رسالة لكل جروب + فحص الفجوات."""
+
+    def __init__(self, client, store, pipeline, concurrency: int = 3, limit: int = 2000, admit=None):
+        self.client = client
+        self.store = store
+        self.pipeline = pipeline
+        self.admit = admit                       # (message, is_channel) → تدخل المطابقة؟
+        self.concurrency = concurrency
+        self.limit = limit                       # أقصى عدد رسائل لكل فجوة في المرة الواحدة
+        self.marks: dict[int, int] = {}          # chat_id → آخر رسالة اتشافت
+        self.gaps: dict[int, list] = {}          # gap_id → [gap_id, chat_id, after_id, before_id]
+        self.open_gaps: dict[int, list] = {}     # chat_id → الفجوة اللي لسه مستنية أول رسالة live
+        self.done: list[int] = []
+        self.dirty = False
+        self.running: asyncio.Task = None
+        self.saver: asyncio.Task = None
+        self.stats = {"chats": 0, "messages": 0, "flood_waits": 0, "errors": 0}
+
+    async def load(self):
+        self.marks, gaps = await self.store.execute(Database.open_backfill_gaps)
+        for gap in gaps:
+            self.gaps[gap[0]] = gap
+            if gap[3] is None:
+                self.open_gaps[gap[1]] = gap
+        if gaps:
+            log.info(f"🕳  {len(gaps)} فجوة رسائل ممكن تتسترجع (/backfill).")
+
+    def start(self):
+        self.saver = asyncio.create_task(self._save_loop(), name="backfill-save")
+
+    async def stop(self):
+        for task in (self.running, self.saver):
+            if task is not None:
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+        await self.save()
+
+    def __len__(self) -> int:
+        return len(self.gaps)
+
+    # ───────── live ─────────
+
+    def seen(self, chat_id: int, msg_id: int):
+        """رسالة live وصلت (بدون await)."""
+        if msg_id > self.marks.get(chat_id, 0):
+            self.marks[chat_id] = msg_id
+            self.dirty = True
+        # أول رسالة live بتقفل الفجوة — اللي بعدها البوت شافه بنفسه
+        gap = self.open_gaps.pop(chat_id, None)
+        if gap is not None:
+            gap[3] = msg_id
+            self.dirty = True
+
+    async def save(self):
+        if not self.dirty and not self.done:
+            return
+        self.dirty = False
+        done, self.done = self.done, []
+        gaps = [list(gap) for gap in self.gaps.values()]
+        await self.store.execute(Database.save_backfill, dict(self.marks), gaps, done)
+
+    async def _save_loop(self):
+        while True:
+            await asyncio.sleep(SAVE_INTERVAL)
+            try:
+                await self.save()
+            except Exception as e:
+                log.error(f"❌  فشل حفظ علامات الجروبات: {e}")
+
+    # ───────── backfill ─────────
+
+    def run(self) -> asyncio.Task:
+        """تشغيل الاسترجاع في الخلفية (لو مش شغال بالفعل)."""
+        if self.running is None or self.running.done():
+            self.running = asyncio.create_task(self._run(), name="backfill")
+        return self.running
+
+    async def _run(self) -> dict:
+        if not self.gaps:
+            return dict(self.stats)
+        log.info(f"⏪  بدء استرجاع {len(self.gaps)} فجوة...")
+
+        # آخر رسالة في كل جروب من قائمة المحادثات — الجروب اللي ما اتغيرش ما يتطلبش خالص
+        dialogs = {}
+        async for dialog in self.client.iter_dialogs():
+            if dialog.is_group or dialog.is_channel:
+                dialogs[dialog.id] = dialog
+
+        limit = asyncio.Semaphore(self.concurrency)
+
+        async def fill(gap):
+            async with limit:
+                await self._fill(gap, dialogs.get(gap[1]))
+
+        await asyncio.gather(*(fill(gap) for gap in list(self.gaps.values())))
+        await self.save()
+        log.info(
+            f"⏪  انتهى الاسترجاع: {self.stats['messages']} رسالة من {self.stats['chats']} جروب"
+            f" (FloodWait: {self.stats['flood_waits']})"
+        )
+        return dict(self.stats)
+
+    def _close(self, gap):
+        self.gaps.pop(gap[0], None)
+        if self.open_gaps.get(gap[1]) is gap:
+            del self.open_gaps[gap[1]]
+        self.done.append(gap[0])
+
+    async def _fill(self, gap, dialog):
+        chat_id, after_id = gap[1], gap[2]
+        top = dialog.message.id if dialog is not None and dialog.message else 0
+        # جروب خرجنا منه أو مفيش جديد فيه
+        if dialog is None or not self.store.chat_allowed(chat_id) or top <= after_id:
+            self._close(gap)
+            return
+
+        count = 0
+        while True:
+            try:
+                async for message in self.client.iter_messages(
+                    dialog.entity,
+                    min_id=gap[2],
+                    max_id=gap[3] or 0,
+                    reverse=True,
+                    limit=self.limit - count,
+                ):
+                    # رسايلنا إحنا (الـ live بيستقبل incoming بس)
+                    if not message.out and (self.admit is None or self.admit(message, dialog.is_channel)):
+                        await self.pipeline.put(message)
+                    gap[2] = message.id
+                    count += 1
+                    if count % CHECKPOINT_EVERY == 0:
+                        self.dirty = True
+                        await self.save()
+                break
+            except errors.FloodWaitError as e:
+                # نكمل من آخر checkpoint بعد الانتظار
+                self.stats["flood_waits"] += 1
+                log.warning(f"⏳  FloodWait أثناء الاسترجاع ({e.seconds}s) — {dialog.name}")
+                await asyncio.sleep(e.seconds + 1)
+            except Exception as e:
+                # الفجوة تفضل محفوظة — المرة الجاية تكمل من نفس المكان
+                self.stats["errors"] += 1
+                self.dirty = True
+                log.error(f"❌  فشل استرجاع {dialog.name}: {e}")
+                return
+
+        self.stats["chats"] += 1
+        self.stats["messages"] += count
+        if count >= self.limit:
+            # لسه في رسائل — الفجوة تفضل مفتوحة من آخر checkpoint للمرة الجاية
+            self.dirty = True
+            log.info(f"⏪  {dialog.name}: {count} رسالة (وصلنا للحد — الباقي في المرة الجاية)")
+            return
+        if gap[3] is None and gap[2] > self.marks.get(chat_id, 0):
+            self.marks[chat_id] = gap[2]
+        self._close(gap)
+        if count:
+            log.info(f"⏪  {dialog.name}: {count} رسالة")
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Benchmark — normalize_arabic
+============================
+مقارنة التطبيع الجديد (جداول مترجمة) بالتطبيقين القديمين اللي كانوا في main.py،
+وبنسخة str.translate بنفس الجدول كمرجع.
+
+    python bench/bench_normalize.py [عدد الرسائل]
+"""
+
+import os
+import re
+import sys
+import random
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from normalize import normalize_arabic, build_table  # noqa: E402
+from storage import DEFAULT_KEYWORDS    # noqa: E402
+
+# ──────────────────────────── OLD ───────────────────────────────
+
+def old_normalize_v1(text: str) -> str:
+    """أول normalize_arabic في main.py (قبل الإصلاح)."""
+    arabic_diacritics = re.compile(r"[\u064B-\u065F\u0670\u0640]")
+    text = arabic_diacritics.sub("", text)
+    text = re.sub(r"\s+", " ", text)
+    text = text.replace("؟", "").replace("!", "").replace(".", "").replace("،", "")
+    return text.strip()
+
+
+def old_normalize_v2(text: str) -> str:
+    """التاني (اللي كان شغال فعلاً لأنه بيغطي على الأول)."""
+    arabic_diacritics = re.compile(
+        r"[\u064B-\u065F\u0670\u0640]"
+    )
+    return arabic_diacritics.sub("", text)
+
+
+_TRANSLATE = str.maketrans({ch: rep or None for ch, rep in build_table().items()})
+
+
+def translate_normalize(text: str) -> str:
+    """نفس الجدول بـ str.translate — للمقارنة بس."""
+    return " ".join(text.lower().translate(_TRANSLATE).split())
+
+# ──────────────────────────── CORPUS ────────────────────────────
+
+def make_corpus(count: int, seed: int = 7) -> list[str]:
+    """رسائل عربية صناعية فيها تشكيل وتطويل وترقيم."""
+    rnd = random.Random(seed)
+    words = " ".join(DEFAULT_KEYWORDS).split() + [
+        "السَّلامُ", "عليكُم", "ضروريـــ", "بكرا!!", "الله،", "يعطيكم", "العافية؟", "مَرحبا.",
+    ]
+    return [" ".join(rnd.choice(words) for _ in range(rnd.randint(5, 40))) for _ in range(count)]
+
+
+def bench(name: str, fn, corpus: list[str], repeat: int = 5):
+    runs = timeit.repeat(lambda: [fn(t) for t in corpus], number=1, repeat=repeat)
+    per_msg = min(runs) / len(corpus) * 1e6
+    print(f"{name:<28} {per_msg:8.2f} µs/رسالة")
+    return per_msg
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    corpus = make_corpus(count)
+    print(f"📊  {count} رسالة — متوسط {sum(map(len, corpus)) // count} حرف\n")
+
+    print("— تطبيع الرسالة لوحدها:")
+    # الكود القديم كان بيعمل lower() قبل التطبيع — نقارن نفس الشغل
+    bench("old v1 (regex + replace)", lambda t: old_normalize_v1(t.lower()), corpus)
+    bench("old v2 (regex فقط)", lambda t: old_normalize_v2(t.lower()), corpus)
+    bench("str.translate (مرجع)", translate_normalize, corpus)
+    bench("new (normalize.py)", normalize_arabic, corpus)
+
+    # المسار الحقيقي القديم: الرسالة + كل كلمة مفتاحية مع كل رسالة.
+    # الجديد: الكلمات متطبّعة مرة وقت التحميل — الرسالة بس.
+    print(f"\n— لكل رسالة مع {len(DEFAULT_KEYWORDS)} كلمة مفتاحية:")
+    old = bench(
+        "old v2 (رسالة + كل الكلمات)",
+        lambda t: [old_normalize_v2(t.lower())] + [old_normalize_v2(k.lower()) for k in DEFAULT_KEYWORDS],
+        corpus,
+        repeat=3,
+    )
+    new = bench("new (رسالة بس)", normalize_arabic, corpus)
+    print(f"\n⚡  {old / new:.0f}x أسرع في المسار الساخن")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Benchmark — المطابقة والمسار الكامل (offline)
+==========================================
+تشغيل corpus (صناعي أو متسجل) على:
+
+1. normalize_arabic لوحدها
+2. KeywordMatcher.match (+ الطريقة القديمة للمقارنة لو عدد الكلمات صغير)
+3. المسار الكامل: نفس خطوات message_watcher ← Pipeline ← AlertDispatcher
+   بـ client و events وهمية وقاعدة SQLite مؤقتة.
+
+بيطبع رسائل/ثانية، percentiles للزمن لكل رسالة، والذاكرة (tracemalloc).
+
+    python bench/bench_pipeline.py --messages 5000 --keywords 140
+    python bench/bench_pipeline.py --keywords 50000 --skip-full
+    python bench/bench_pipeline.py --corpus messages.jsonl
+"""
+
+import os
+import re
+import time
+import asyncio
+import argparse
+import tempfile
+import tracemalloc
+
+from fakes import make_events, synthetic_messages, load_messages, synthetic_keywords, FakeClient
+
+from normalize import normalize_arabic  # noqa: E402
+from matcher import KeywordMatcher      # noqa: E402
+from metrics import metrics             # noqa: E402
+
+# ──────────────────────────── HELPERS ───────────────────────────
+
+def percentiles(samples: list[float]) -> str:
+    ordered = sorted(samples)
+
+    def at(q):
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1e6
+
+    return f"p50 {at(0.5):8.1f} — p95 {at(0.95):8.1f} — p99 {at(0.99):8.1f} µs"
+
+
+def run_stage(name: str, fn, corpus: list):
+    """تشغيل fn على كل رسالة مع قياس كل واحدة لوحدها."""
+    samples = []
+    perf = time.perf_counter
+    start = perf()
+    for item in corpus:
+        t = perf()
+        fn(item)
+        samples.append(perf() - t)
+    total = perf() - start
+    print(f"{name:<24} {len(corpus) / total:10.0f} رسالة/ث  {percentiles(samples)}")
+
+
+def allocations(name: str, fn, corpus: list):
+    """ذاكرة مرور واحد: الـ peak واللي فضل محجوز بعده."""
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    for item in corpus:
+        fn(item)
+    after, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{name:<24} peak {(peak - before) / 1024:8.1f} KB — محجوز بعد المرور {(after - before) / 1024:8.1f} KB")
+
+
+def old_match(text: str, keywords: list[dict]) -> list[str]:
+    """match_keywords الأصلية (تطبيع كل كلمة + substring مع كل رسالة) — للمقارنة."""
+    diacritics = re.compile(r"[\u064B-\u065F\u0670\u0640]")
+    normalized_text = diacritics.sub("", text.lower())
+    matched = []
+    for kw in keywords:
+        normalized_kw = diacritics.sub("", kw["keyword"].lower())
+        if normalized_kw in normalized_text:
+            matched.append(kw["keyword"])
+    return matched
+
+# ──────────────────────────── FULL PATH ─────────────────────────
+
+async def full_path(events: list, keywords: list[dict], workers: int, dedupe: bool):
+    from storage import KeywordStore
+    from pipeline import Pipeline
+    from alerts import AlertDispatcher
+    from entities import EntityCache
+    from dedupe import Deduper
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = KeywordStore(os.path.join(tmp, "bench.db"))
+        await store.load()
+        await store.del_keywords([kw["keyword"] for kw in store.keywords])
+        await store.add_keywords(keywords)
+        matcher = KeywordMatcher(store.keywords)
+
+        client = FakeClient()
+        # من غير rate limit — بنقيس الكود مش حدود تيليجرام
+        dispatcher = AlertDispatcher(client, store, rate_per_minute=1e9, burst=10 ** 9)
+        pipeline = Pipeline(
+            dispatcher, lambda: matcher, EntityCache(), Deduper() if dedupe else None,
+            match_queue_size=len(events) + 1, workers=workers,
+        )
+        metrics.reset()
+        dispatcher.start()
+        pipeline.start()
+
+        start = time.perf_counter()
+        for event in events:
+            # نفس خطوات message_watcher
+            t = time.perf_counter()
+            if store.chat_allowed(event.chat_id):
+                pipeline.submit(event.message)
+            metrics.observe("handler", time.perf_counter() - t)
+            # الـ handler الحقيقي بيرجع للـ event loop بين كل update والتاني
+            await asyncio.sleep(0)
+        await pipeline.match_queue.join()
+        while len(dispatcher):
+            await asyncio.sleep(0.001)
+        total = time.perf_counter() - start
+
+        await pipeline.stop()
+        await dispatcher.stop()
+        await store.close()
+
+    print(
+        f"{'المسار الكامل':<24} {len(events) / total:10.0f} رسالة/ث"
+        f" — متطابقة {pipeline.stats['matched']} — مكررة {pipeline.stats['duplicates']}"
+        f" — اتبعت {len(client.sent)}"
+    )
+    for line in metrics.latency_lines():
+        print(f"    {line.replace('`', '')}")
+
+# ──────────────────────────── MAIN ──────────────────────────────
+
+def main():
+    parser = argparse.ArgumentParser(description="قياس المطابقة والمسار الكامل offline")
+    parser.add_argument("--messages", type=int, default=5000, help="عدد الرسائل الصناعية")
+    parser.add_argument("--keywords", type=int, default=140, help="عدد الكلمات (140 → 50000)")
+    parser.add_argument("--corpus", help="ملف رسائل متسجل (JSONL فيه text أو سطر لكل رسالة)")
+    parser.add_argument("--hit-rate", type=float, default=0.1, help="نسبة الرسائل اللي فيها كلمة")
+    parser.add_argument("--fuzzy", type=int, default=0, choices=(0, 1, 2))
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--no-dedupe", action="store_true")
+    parser.add_argument("--skip-full", action="store_true", help="من غير المسار الكامل")
+    args = parser.parse_args()
+
+    corpus = load_messages(args.corpus) if args.corpus else synthetic_messages(args.messages, args.hit_rate)
+    keywords = synthetic_keywords(args.keywords)
+    print(
+        f"📊  {len(corpus)} رسالة (متوسط {sum(map(len, corpus)) // max(len(corpus), 1)} حرف)"
+        f" — {len(keywords)} كلمة — fuzzy={args.fuzzy}\n"
+    )
+
+    start = time.perf_counter()
+    matcher = KeywordMatcher(keywords, fuzzy=args.fuzzy)
+    elapsed = time.perf_counter() - start
+    # الذاكرة في بناء تاني — tracemalloc بيبطّأ البناء نفسه
+    tracemalloc.start()
+    copy = KeywordMatcher(keywords, fuzzy=args.fuzzy)
+    size, _ = tracemalloc.get_traced_memory()
+    del copy
+    tracemalloc.stop()
+    print(f"بناء المطابق: {elapsed * 1000:.0f} ms — {size / 1024 / 1024:.1f} MB\n")
+
+    run_stage("normalize_arabic", normalize_arabic, corpus)
+    run_stage("KeywordMatcher.match", matcher.match, corpus)
+    if len(keywords) <= 2000:
+        run_stage("match القديمة (loop)", lambda t: old_match(t, keywords), corpus)
+
+    print()
+    allocations("normalize_arabic", normalize_arabic, corpus)
+    allocations("KeywordMatcher.match", matcher.match, corpus)
+
+    if not args.skip_full:
+        print()
+        events = make_events(corpus)
+        asyncio.run(full_path(events, keywords, args.workers, not args.no_dedupe))
+
+
+if __name__ == "__main__":
+    main()
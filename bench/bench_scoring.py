@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Benchmark — توزيع درجات التقييم (offline)
+=========================================
+تشغيل corpus (صناعي أو متسجل) على الكلمات الافتراضية بأوزانها التلقائية وحساب:
+
+- توزيع الدرجات على التطابقات
+- نسبة التنبيهات عالية القيمة (🔥) عند SCORE_HIGH — المفروض تبقى أقلية
+- أقل حد بيخلي النسبة تحت --target (لو محتاج تظبط SCORE_HIGH على corpus حقيقي)
+
+بيرجع exit code 1 لو نسبة الـ 🔥 عدت --max-share — ينفع كفحص قبل تغيير الأوزان.
+
+    python bench/bench_scoring.py --messages 5000
+    python bench/bench_scoring.py --corpus messages.jsonl --high 4
+"""
+
+import sys
+import argparse
+from collections import Counter
+
+from fakes import synthetic_messages, load_messages
+
+import scoring                          # noqa: E402
+from matcher import KeywordMatcher      # noqa: E402
+from storage import DEFAULT_KEYWORDS, KeywordStore  # noqa: E402
+
+
+def default_keywords() -> list[dict]:
+    store = KeywordStore(":memory:")
+    return [
+        store._prepare({"keyword": kw, "is_regex": False, "mode": "phrase", "weight": None, "category": None})
+        for kw in DEFAULT_KEYWORDS
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="توزيع درجات التقييم offline")
+    parser.add_argument("--messages", type=int, default=5000)
+    parser.add_argument("--hit-rate", type=float, default=0.3)
+    parser.add_argument("--corpus", help="JSONL (text) أو نص عادي — بدل الـ corpus الصناعي")
+    parser.add_argument("--high", type=float, default=scoring.DEFAULT_HIGH, help="حد الـ 🔥 (SCORE_HIGH)")
+    parser.add_argument("--target", type=float, default=0.2, help="نسبة الـ 🔥 المطلوبة لاقتراح حد")
+    parser.add_argument("--max-share", type=float, default=0.5, help="أقصى نسبة 🔥 قبل ما الفحص يفشل")
+    args = parser.parse_args()
+
+    texts = load_messages(args.corpus) if args.corpus else synthetic_messages(args.messages, args.hit_rate)
+    keywords = default_keywords()
+    matcher = KeywordMatcher(keywords)
+    found = [(text, matched) for text, matched in ((t, matcher.match(t)) for t in texts) if matched]
+    if not found:
+        print("⚠️  مفيش ولا تطابق في الـ corpus")
+        return 1
+
+    scorer = scoring.Scorer(keywords, high=args.high)
+    scores = [score for score, _ in scorer.score_batch([t for t, _ in found], [m for _, m in found])]
+    print(f"📊 {len(texts)} رسالة — {len(found)} تطابق — {len(keywords)} كلمة\n")
+    print("الدرجات:")
+    for score, count in sorted(Counter(scores).items()):
+        print(f"    {score:5.1f}  {count:6d}  {count / len(scores):6.1%}")
+
+    share = sum(score >= args.high for score in scores) / len(scores)
+    print(f"\n🔥 من {args.high:g}: {share:.1%} من التطابقات")
+    ordered = sorted(set(scores))
+    suggested = next(
+        (h for h in ordered if sum(score >= h for score in scores) / len(scores) <= args.target),
+        None,
+    )
+    if suggested is not None:
+        print(f"أقل حد لـ ≤ {args.target:.0%}: {suggested:g}")
+
+    if share > args.max_share:
+        print(f"❌ نسبة الـ 🔥 أكبر من {args.max_share:.0%} — الحد أو الأوزان محتاجين ضبط")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Benchmark — زمن التشغيل (offline)
+=================================
+تشغيل main() الحقيقي بـ FakeClient (اتصال بتأخير ثابت يمثل الشبكة) في process
+جديد كل مرة، وقياس:
+
+- import main (كل المكتبات والموديولات)
+- مراحل main() من STARTUP: القاعدة ← الـ handlers ← الاتصال ← الحسابات،
+  واللي في الخلفية: بناء المطابق والرسالة الترحيبية
+- أول تنبيه: رسالة فيها كلمة مفتاحية بتوصل أول ما الاتصال يتم
+
+مرتين: أول تشغيل (قاعدة جديدة — migrations + الكلمات الافتراضية) وتشغيل عادي.
+
+    python bench/bench_startup.py --runs 5 --connect-delay 0.3
+    python -X importtime bench/bench_startup.py --runs 1   # تفاصيل الـ imports
+"""
+
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import datetime
+import tempfile
+import subprocess
+from statistics import median
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+PROBE = "bench-startup-probe"
+ORDER = ("import", "db", "handlers", "connect", "accounts", "first_alert", "matcher", "welcome")
+
+# ──────────────────────────── CHILD ─────────────────────────────
+
+async def child(out: str, connect_delay: float):
+    start = time.perf_counter()
+    import main
+    imported = (time.perf_counter() - start) * 1000
+
+    from fakes import FakeChat, FakeMessage, FakeEvent, FakeClient, User
+    from storage import DEFAULT_KEYWORDS
+
+    clients = []
+
+    def fake_client(session, *args, **kwargs):
+        account = FakeClient(connect_delay=connect_delay, user_id=len(clients) + 1)
+        clients.append(account)
+        return account
+
+    main.TelegramClient = fake_client
+    main.SESSIONS = ["bench"]
+    main.HEARTBEAT_FILE = ""
+    boot = time.perf_counter()
+    task = asyncio.create_task(main.main())
+
+    # أول update بيوصل مع الاتصال — نفس اللي بيحصل مع catch_up بعد توقف
+    while not clients or not clients[0].is_connected():
+        await asyncio.sleep(0.001)
+    client = clients[0]
+    message = FakeMessage(
+        1, f"{DEFAULT_KEYWORDS[0]} {PROBE}", FakeChat(-1001, "جروب"),
+        User(id=99, first_name="عضو", last_name=None, username=None),
+    )
+    message.date = datetime.datetime.now()
+    event = FakeEvent(message)
+    event.client = client
+    for _, handler in client.handlers:
+        if handler.__name__ == "message_watcher":
+            await handler(event)
+
+    while not any(PROBE in text for _, text in client.sent):
+        await asyncio.sleep(0.001)
+    first_alert = (time.perf_counter() - boot) * 1000
+    # الشغل اللي في الخلفية
+    deadline = time.perf_counter() + 30
+    while not {"matcher", "welcome"} <= main.STARTUP.keys() and time.perf_counter() < deadline:
+        await asyncio.sleep(0.005)
+
+    task.cancel()
+    try:
+        await task
+    except asyncio.CancelledError:
+        pass
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump({"import": imported, "first_alert": first_alert, **main.STARTUP}, f)
+
+# ──────────────────────────── PARENT ────────────────────────────
+
+def run_once(workdir: str, connect_delay: float) -> dict:
+    out = os.path.join(workdir, "startup.json")
+    env = dict(os.environ, API_ID="1", API_HASH="bench", HEARTBEAT_FILE="", METRICS_FILE="")
+    subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--child", out, "--connect-delay", str(connect_delay)],
+        cwd=workdir, env=env, check=True, stdout=subprocess.DEVNULL,
+    )
+    with open(out, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def report(name: str, results: list[dict]):
+    print(f"{name} ({len(results)} تشغيل — median ms):")
+    for phase in ORDER:
+        values = [r[phase] for r in results if phase in r]
+        if values:
+            print(f"    {phase:<12} {median(values):8.1f}")
+    print()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="قياس زمن التشغيل offline")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--connect-delay", type=float, default=0.3, help="زمن الاتصال الوهمي (ثواني)")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        asyncio.run(child(args.child, args.connect_delay))
+        return
+
+    print(f"⏱  اتصال وهمي {args.connect_delay * 1000:.0f} ms — المراحل من بداية main() (import لوحده)\n")
+    cold = []
+    for _ in range(args.runs):
+        with tempfile.TemporaryDirectory() as tmp:
+            cold.append(run_once(tmp, args.connect_delay))
+    report("أول تشغيل (قاعدة جديدة)", cold)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        run_once(tmp, args.connect_delay)
+        warm = [run_once(tmp, args.connect_delay) for _ in range(args.runs)]
+    report("تشغيل عادي", warm)
+
+
+if __name__ == "__main__":
+    sys.path.insert(0, os.path.dirname(BENCH_DIR))
+    main()
@@ -0,0 +1,191 @@
+"""
+Fakes
+=====
+نسخ وهمية من Telethon (client / event / message) + corpus صناعي — عشان القياسات
+تشتغل offline من غير أي اتصال بتيليجرام.
+"""
+
+import os
+import sys
+import json
+import random
+import asyncio
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from telethon.tl.types import User, InputPeerUser  # noqa: E402
+
+from storage import DEFAULT_KEYWORDS  # noqa: E402
+
+# ──────────────────────────── TELETHON ──────────────────────────
+
+class FakeChat:
+    def __init__(self, chat_id: int, title: str, username: str = None):
+        self.id = chat_id
+        self.title = title
+        self.username = username
+
+
+class FakeMessage:
+    """الحاجات اللي الـ pipeline بيقراها من telethon Message بس."""
+
+    def __init__(self, msg_id: int, text: str, chat: FakeChat, sender: User, cached: bool = True):
+        self.id = msg_id
+        self.raw_text = text
+        self.message = text
+        self.chat_id = chat.id
+        self.sender_id = sender.id
+        # cached=False → زي كيان مش في كاش Telethon (get_chat/get_sender بيروحوا "للشبكة")
+        self.chat = chat if cached else None
+        self.sender = sender if cached else None
+        self._chat = chat
+        self._sender = sender
+
+    async def get_chat(self):
+        await asyncio.sleep(0)
+        return self._chat
+
+    async def get_sender(self):
+        await asyncio.sleep(0)
+        return self._sender
+
+
+class FakeEvent:
+    def __init__(self, message: FakeMessage):
+        self.message = message
+        self.chat_id = message.chat_id
+        self.raw_text = message.raw_text
+        self.is_group = True
+        self.is_channel = False
+        self.is_private = False
+
+
+class FakeClient:
+    """send_message بيسجل بس — مع تأخير اختياري يمثل الشبكة.
+
+    فيه كمان الجزء اللي main() بيستخدمه من TelegramClient (start / get_me /
+    run_until_disconnected ...) عشان bench_startup يشغل البرنامج كله offline.
+    """
+
+    def __init__(self, send_delay: float = 0.0, connect_delay: float = 0.0, user_id: int = 1):
+        self.send_delay = send_delay
+        self.connect_delay = connect_delay
+        self.me = User(id=user_id, first_name=f"حساب {user_id}", last_name=None, username=None)
+        self.sent: list[tuple] = []
+        self.handlers: list = []
+        self.connected = False
+        self.disconnected = asyncio.Event()
+
+    async def send_message(self, target, text, **kwargs):
+        if self.send_delay:
+            await asyncio.sleep(self.send_delay)
+        self.sent.append((target, text))
+
+    def on(self, event):
+        def decorator(fn):
+            self.handlers.append((event, fn))
+            return fn
+        return decorator
+
+    def add_event_handler(self, fn, event=None):
+        self.handlers.append((event, fn))
+
+    # ───────── الاتصال ─────────
+
+    async def connect(self):
+        if self.connect_delay:
+            await asyncio.sleep(self.connect_delay)
+        self.connected = True
+        self.disconnected.clear()
+
+    async def start(self):
+        await self.connect()
+        return self
+
+    def is_connected(self) -> bool:
+        return self.connected
+
+    async def is_user_authorized(self) -> bool:
+        return True
+
+    async def get_me(self, input_peer: bool = False):
+        if input_peer:
+            return InputPeerUser(user_id=self.me.id, access_hash=0)
+        return self.me
+
+    async def catch_up(self):
+        pass
+
+    async def run_until_disconnected(self):
+        await self.disconnected.wait()
+
+    async def disconnect(self):
+        self.connected = False
+        self.disconnected.set()
+
+    async def iter_dialogs(self, *args, **kwargs):
+        return
+        yield
+
+# ──────────────────────────── CORPUS ────────────────────────────
+
+FILLER = (
+    "السلام عليكم يا جماعه حد عنده فكره عن الموضوع ده ولا لا الله يعطيكم العافيه "
+    "صباح الخير مساء النور بكرا ان شاء الله تمام الحمد لله شكرا جزيلا مين فاضي "
+    "الاجتماع الساعه كام الرابط اهو ضروري جدا معلش اتأخرت الطريق زحمه"
+).split()
+DECORATIONS = ("", "ـــ", "ً", "ُ", "!", "؟", "،", ".")
+
+
+def synthetic_messages(count: int, hit_rate: float = 0.1, seed: int = 7) -> list[str]:
+    """رسائل عربية صناعية: hit_rate منها فيها كلمة مفتاحية (بتشكيل/تطويل/ترقيم)."""
+    rnd = random.Random(seed)
+    messages = []
+    for _ in range(count):
+        words = [rnd.choice(FILLER) + rnd.choice(DECORATIONS) for _ in range(rnd.randint(5, 40))]
+        if rnd.random() < hit_rate:
+            words.insert(rnd.randrange(len(words) + 1), rnd.choice(DEFAULT_KEYWORDS))
+        messages.append(" ".join(words))
+    return messages
+
+
+def load_messages(path: str) -> list[str]:
+    """corpus متسجل: JSONL فيه "text" في كل سطر، أو نص عادي (رسالة في كل سطر)."""
+    messages = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            if line.startswith("{"):
+                line = json.loads(line).get("text") or ""
+            if line:
+                messages.append(line)
+    return messages
+
+
+def synthetic_keywords(count: int, seed: int = 11) -> list[dict]:
+    """الكلمات الافتراضية + عبارات صناعية لحد count (لقياس التوسع لـ 50k كلمة)."""
+    rnd = random.Random(seed)
+    keywords = [{"keyword": kw, "is_regex": False} for kw in DEFAULT_KEYWORDS[:count]]
+    seen = {kw["keyword"] for kw in keywords}
+    letters = "ابتثجحخدذرزسشصضطظعغفقكلمنهوي"
+    while len(keywords) < count:
+        phrase = " ".join(
+            "".join(rnd.choice(letters) for _ in range(rnd.randint(3, 7)))
+            for _ in range(rnd.randint(1, 3))
+        )
+        if phrase not in seen:
+            seen.add(phrase)
+            keywords.append({"keyword": phrase, "is_regex": False})
+    return keywords
+
+
+def make_events(messages: list[str], chats: int = 50, cached_ratio: float = 0.9, seed: int = 3) -> list[FakeEvent]:
+    rnd = random.Random(seed)
+    groups = [FakeChat(-1001000000000 - i, f"جروب {i}", f"group{i}" if i % 3 else None) for i in range(chats)]
+    users = [User(id=1000 + i, first_name=f"عضو {i}", last_name=None, username=None) for i in range(chats * 4)]
+    return [
+        FakeEvent(FakeMessage(i + 1, text, rnd.choice(groups), rnd.choice(users), rnd.random() < cached_ratio))
+        for i, text in enumerate(messages)
+    ]
@@ -0,0 +1,180 @@
+"""
+Dedupe
+======
+منع تكرار التنبيه لنفس الطلب المنشور في عشرات الجروبات.
+
+- بصمة (hash) للنص بعد التطبيع — اختيارياً مع رقم المرسل.
+- LRU محدود الحجم وكل بصمة ليها مدة صلاحية.
+- وضع تقريبي اختياري (SimHash على shingles) للرسائل شبه المتطابقة.
+- SeenMessages: نفس الرسالة واصلة من أكتر من حساب (جروب مشترك) — بتتشال قبل المطابقة.
+"""
+
+import time
+import hashlib
+from collections import OrderedDict
+
+from normalize import normalize_arabic
+
+# ──────────────────────────── SIMHASH ───────────────────────────
+
+SIMHASH_BITS = 64
+# shingles حروف (مش كلمات) — أثبت بكتير مع الرسائل القصيرة
+SHINGLE = 4
+
+
+def _hash64(data: str) -> int:
+    return int.from_bytes(hashlib.blake2b(data.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+def simhash(text: str, shingle: int = SHINGLE) -> int:
+    """SimHash 64-bit على shingles من الحروف المتتالية."""
+    grams = [text[i:i + shingle] for i in range(max(1, len(text) - shingle + 1))]
+    weights = [0] * SIMHASH_BITS
+    for gram in grams:
+        h = _hash64(gram)
+        for bit in range(SIMHASH_BITS):
+            weights[bit] += 1 if (h >> bit) & 1 else -1
+    result = 0
+    for bit, w in enumerate(weights):
+        if w > 0:
+            result |= 1 << bit
+    return result
+
+
+def _bands(fp: int, count: int) -> list[tuple[int, int]]:
+    """تقسيم البصمة count جزء. لو الفرق بين بصمتين < count bits لازم يتفقوا في جزء كامل."""
+    width = SIMHASH_BITS // count
+    mask = (1 << width) - 1
+    return [(band, (fp >> (band * width)) & mask) for band in range(count)]
+
+# ──────────────────────────── DEDUPER ───────────────────────────
+
+class Deduper:
+    """LRU محدود للبصمات. check() ترجع التنبيه الأول لو الرسالة مكررة، وإلا None."""
+
+    def __init__(
+        self,
+        max_size: int = 5000,
+        ttl: float = 1800,
+        by_sender: bool = False,
+        near_duplicates: bool = False,
+        max_distance: int = 7,
+    ):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.by_sender = by_sender
+        self.near_duplicates = near_duplicates
+        self.max_distance = max_distance
+        self.band_count = max_distance + 1
+        # key → (expires_at, first_alert, simhash)
+        self.entries: OrderedDict = OrderedDict()
+        # (band, value) → مجموعة keys (للوضع التقريبي)
+        self.band_index: dict[tuple[int, int], set] = {}
+        self.suppressed = 0
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def _key(self, normalized: str, sender_id) -> str:
+        base = f"{sender_id}\x00{normalized}" if self.by_sender else normalized
+        return hashlib.blake2b(base.encode("utf-8"), digest_size=16).hexdigest()
+
+    def _forget(self, key: str):
+        _, _, fp = self.entries.pop(key)
+        if fp is not None:
+            for band in _bands(fp, self.band_count):
+                keys = self.band_index.get(band)
+                if keys is not None:
+                    keys.discard(key)
+                    if not keys:
+                        del self.band_index[band]
+
+    def _expire(self, now: float):
+        # الترتيب حسب expires_at (أي hit بيجدد المدة وينقل للآخر) — نوقف عند أول واحدة صالحة
+        while self.entries:
+            key, (expires_at, _, _) = next(iter(self.entries.items()))
+            if expires_at > now:
+                break
+            self._forget(key)
+
+    def _near(self, fp: int, sender_id) -> str:
+        for band in _bands(fp, self.band_count):
+            for key in self.band_index.get(band, ()):
+                _, alert, other = self.entries[key]
+                if self.by_sender and alert.get("sender_id") != sender_id:
+                    continue
+                if bin(fp ^ other).count("1") <= self.max_distance:
+                    return key
+        return None
+
+    def check(self, text: str, sender_id, alert: dict) -> dict:
+        """لو الرسالة اتشافت قبل كده ترجع التنبيه الأول، وإلا تسجلها بـ alert وترجع None."""
+        now = time.monotonic()
+        self._expire(now)
+
+        normalized = normalize_arabic(text)
+        key = self._key(normalized, sender_id)
+        found = key if key in self.entries else None
+
+        fp = None
+        if self.near_duplicates:
+            fp = simhash(normalized)
+            if found is None:
+                found = self._near(fp, sender_id)
+
+        if found is not None:
+            # تجديد المدة: طالما النسخ لسه بتتنشر نفضل نكتمها
+            _, first, other_fp = self.entries[found]
+            self.entries[found] = (now + self.ttl, first, other_fp)
+            self.entries.move_to_end(found)
+            self.suppressed += 1
+            return first
+
+        self.entries[key] = (now + self.ttl, alert, fp)
+        if fp is not None:
+            for band in _bands(fp, self.band_count):
+                self.band_index.setdefault(band, set()).add(key)
+        while len(self.entries) > self.max_size:
+            self._forget(next(iter(self.entries)))
+        return None
+
+    def release(self, text: str, sender_id, alert: dict):
+        """شيل بصمة سجلتها check() لو التنبيه بتاعها ما اتبعتش — النسخ الجاية تتبلغ عادي."""
+        key = self._key(normalize_arabic(text), sender_id)
+        entry = self.entries.get(key)
+        if entry is not None and entry[1] is alert:
+            self._forget(key)
+
+# ──────────────────────────── ACCOUNTS ──────────────────────────
+
+def message_key(message, is_channel: bool) -> tuple:
+    """مفتاح الرسالة نفسها (مش نصها) — ثابت مهما كان الحساب اللي استلمها.
+
+    في الـ supergroups والقنوات رقم الرسالة واحد لكل الأعضاء. في الجروبات العادية
+    كل حساب ليه ترقيم خاص — فبنستخدم المرسل + الوقت + النص.
+    """
+    if is_channel:
+        return (message.chat_id, message.id)
+    return (message.chat_id, message.sender_id, message.date, message.raw_text)
+
+
+class SeenMessages:
+    """LRU صغير لمفاتيح الرسائل. first() ترجع False لو حساب تاني سبق وسلّم نفس الرسالة."""
+
+    def __init__(self, max_size: int = 20000):
+        self.max_size = max_size
+        self.keys: OrderedDict = OrderedDict()
+        self.suppressed = 0
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def first(self, key: tuple) -> bool:
+        if key in self.keys:
+            self.keys.move_to_end(key)
+            self.suppressed += 1
+            return False
+        self.keys[key] = None
+        if len(self.keys) > self.max_size:
+            self.keys.popitem(last=False)
+        return True
@@ -0,0 +1,183 @@
+"""
+Documents
+=========
+استخراج نص الملفات الصغيرة (txt / pdf) عشان يتفحص مع نص الرسالة — اختياري
+(DOCUMENTS=1). طلبات كتير بتيجي كملف PDF أو txt متحول فيه تفاصيل التكليف.
+
+- الملف بيتحمل في الذاكرة على أجزاء (iter_download) بحد أقصى للحجم — لو الحجم
+  المعلن أو اللي وصل فعلاً عدى الحد بيتساب.
+- قراءة الـ PDF (pypdf — اختياري، بيتعمله import أول ما يجي PDF بس) وفك ترميز
+  الـ txt على worker pool عشان الـ event loop ما يقفش.
+- كاش بـ id الملف: نفس الملف متحول في كذا جروب بيتحمل ويتقري مرة واحدة.
+"""
+
+import io
+import asyncio
+import logging
+import importlib.util
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from telethon.tl.types import MessageMediaDocument
+
+log = logging.getLogger("userbot")
+
+# pypdf اختياري — من غيره ملفات txt بس
+HAS_PYPDF = importlib.util.find_spec("pypdf") is not None
+pypdf = None
+
+KIND_TEXT = "txt"
+KIND_PDF = "pdf"
+# أقصى عدد صفحات بتتقري من أي PDF
+MAX_PAGES = 20
+# حجم كل طلب تحميل (Telethon بيقبل مضاعفات 4KB لحد 512KB)
+REQUEST_SIZE = 64 * 1024
+DOWNLOAD_TIMEOUT = 30
+# ملفات txt العربية من Windows غالباً cp1256 مش UTF-8
+ENCODINGS = ("utf-8-sig", "cp1256")
+
+
+def _load_pypdf():
+    global pypdf
+    if pypdf is None and HAS_PYPDF:
+        import pypdf as module
+        pypdf = module
+        # تحذيرات الملفات البايظة بتتحسب في stats["failed"] — مش محتاجينها في السجل
+        logging.getLogger("pypdf").setLevel(logging.ERROR)
+    return pypdf
+
+# ──────────────────────────── EXTRACT ───────────────────────────
+
+def document_kind(message) -> str:
+    """نوع الملف لو بنعرف نقراه (txt / pdf) — وإلا None."""
+    if not isinstance(message.media, MessageMediaDocument) or message.file is None:
+        return None
+    mime = message.file.mime_type or ""
+    ext = (message.file.ext or "").lower()
+    if mime == "text/plain" or ext == ".txt":
+        return KIND_TEXT
+    if HAS_PYPDF and (mime == "application/pdf" or ext == ".pdf"):
+        return KIND_PDF
+    return None
+
+
+def extract_text(data: bytes, kind: str, max_chars: int) -> str:
+    """نص الملف (أول max_chars حرف). بيشتغل على thread — مفيش أي حاجة من الـ loop."""
+    if kind == KIND_PDF:
+        reader = _load_pypdf().PdfReader(io.BytesIO(data))
+        parts, size = [], 0
+        for page in reader.pages[:MAX_PAGES]:
+            text = page.extract_text() or ""
+            parts.append(text)
+            size += len(text)
+            if size >= max_chars:
+                break
+        return "\n".join(parts)[:max_chars]
+
+    for encoding in ENCODINGS:
+        try:
+            return data.decode(encoding)[:max_chars]
+        except UnicodeDecodeError:
+            continue
+    return data.decode("utf-8", errors="replace")[:max_chars]
+
+# ──────────────────────────── EXTRACTOR ─────────────────────────
+
+class DocumentExtractor:
+    """تحميل + استخراج بحدود، مع كاش LRU بـ id الملف."""
+
+    def __init__(self, max_bytes: int = 512 * 1024, max_chars: int = 20000, workers: int = 2, cache_size: int = 500):
+        self.max_bytes = max_bytes
+        self.max_chars = max_chars
+        self.cache_size = cache_size
+        self.cache: OrderedDict = OrderedDict()     # id الملف → النص
+        self.inflight: dict = {}                    # id الملف → Future (تحميل شغال لنفس الملف)
+        # أقصى عدد تحميلات في نفس الوقت = عدد الـ workers
+        self.slots = asyncio.Semaphore(workers)
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="docs")
+        self.stats = {"extracted": 0, "cached": 0, "too_large": 0, "failed": 0, "bytes": 0}
+
+    def __len__(self) -> int:
+        return len(self.cache)
+
+    def close(self):
+        self.executor.shutdown(wait=False)
+
+    def wanted(self, message) -> bool:
+        """ملف txt/pdf في حدود الحجم؟ (من غير أي طلب شبكة)"""
+        if document_kind(message) is None:
+            return False
+        if (message.file.size or 0) > self.max_bytes:
+            self.stats["too_large"] += 1
+            return False
+        return True
+
+    async def text(self, message) -> str:
+        """نص الملف — من الكاش لو اتقرا قبل كده. ترجع "" لو ما ينفعش يتقري."""
+        doc_id = message.document.id
+        text = self.cache.get(doc_id)
+        if text is not None:
+            self.stats["cached"] += 1
+            self.cache.move_to_end(doc_id)
+            return text
+
+        # نفس الملف متحول في جروبين في نفس اللحظة → تحميل واحد
+        pending = self.inflight.get(doc_id)
+        if pending is not None:
+            return await pending
+
+        future = asyncio.get_running_loop().create_future()
+        self.inflight[doc_id] = future
+        try:
+            text = await self._extract(message)
+            future.set_result(text)
+            return text
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # محدش تاني مستني؟ نعلّم الاستثناء إنه اتشاف عشان asyncio ما يشتكيش
+            future.exception()
+            raise
+        finally:
+            del self.inflight[doc_id]
+
+    async def _extract(self, message) -> str:
+        kind = document_kind(message)
+        async with self.slots:
+            try:
+                data = await asyncio.wait_for(self._download(message), DOWNLOAD_TIMEOUT)
+            except Exception as e:
+                # مشكلة شبكة (أو file reference انتهى) — ما تتخزنش، المرة الجاية تتحمل تاني
+                self.stats["failed"] += 1
+                log.warning(f"⚠️  فشل تحميل الملف {message.file.name or ''}: {e}")
+                return ""
+        if data is None:
+            self.stats["too_large"] += 1
+            text = ""
+        else:
+            self.stats["bytes"] += len(data)
+            loop = asyncio.get_running_loop()
+            try:
+                text = await loop.run_in_executor(self.executor, extract_text, data, kind, self.max_chars)
+                self.stats["extracted"] += 1
+            except Exception as e:
+                # PDF متشفر/بايظ — نخزن "" عشان ما نحملوش تاني
+                self.stats["failed"] += 1
+                log.debug("تعذر قراءة الملف %s: %s", message.file.name, e)
+                text = ""
+
+        self.cache[message.document.id] = text
+        while len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+        return text
+
+    async def _download(self, message) -> bytes:
+        """الملف كله في الذاكرة — None لو عدى max_bytes (الحجم المعلن ممكن يكون غلط)."""
+        data = bytearray()
+        async for chunk in message.client.iter_download(message.document, request_size=REQUEST_SIZE):
+            data += chunk
+            if len(data) > self.max_bytes:
+                return None
+        return bytes(data)
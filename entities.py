@@ -0,0 +1,113 @@
+"""
+Entities
+========
+كاش على مستوى البرنامج لبيانات الجروبات والمرسلين (الاسم/العنوان/اليوزرنيم).
+
+بدل get_chat()/get_sender() لكل تطابق — واللي ممكن يروحوا للشبكة لو الكيان مش في
+كاش Telethon — بنخزن الناتج كـ dict صغير بمدة صلاحية وحد أقصى للحجم.
+"""
+
+import time
+import asyncio
+import logging
+from collections import OrderedDict
+
+from alerts import get_sender_name
+
+log = logging.getLogger("userbot")
+
+# ──────────────────────────── CONVERT ───────────────────────────
+
+def chat_info(chat) -> dict:
+    """بيانات الجروب/القناة اللي محتاجينها للتنبيه."""
+    return {
+        "id": getattr(chat, "id", 0),
+        "title": getattr(chat, "title", "غير معروف"),
+        "username": getattr(chat, "username", None),
+    }
+
+
+def sender_info(sender) -> dict:
+    """بيانات المرسل اللي محتاجينها للتنبيه."""
+    return {
+        "id": getattr(sender, "id", 0) if sender else 0,
+        "name": get_sender_name(sender),
+        "username": getattr(sender, "username", None) if sender else None,
+    }
+
+# ──────────────────────────── CACHE ─────────────────────────────
+
+class EntityCache:
+    """LRU بمدة صلاحية. المفتاح (نوع, id) — قناة ممكن تكون جروب ومرسل في نفس الوقت."""
+
+    def __init__(self, ttl: float = 3600, max_size: int = 5000):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.entries: OrderedDict = OrderedDict()    # key → (expires_at, info)
+        self.inflight: dict = {}                     # key → Future (طلب شغال لنفس الكيان)
+        self.stats = {"hits": 0, "misses": 0, "fetches": 0, "errors": 0}
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def peek(self, key: tuple) -> dict:
+        """قراءة من الكاش بس (بدون شبكة). ترجع None لو مش موجود أو انتهت صلاحيته."""
+        entry = self.entries.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            return None
+        return entry[1]
+
+    def _put(self, key, info: dict):
+        self.entries[key] = (time.monotonic() + self.ttl, info)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+    async def _resolve(self, key, cached, fetch, convert) -> dict:
+        info = self.peek(key)
+        if info is not None:
+            self.stats["hits"] += 1
+            self.entries.move_to_end(key)
+            return info
+        self.stats["misses"] += 1
+
+        # Telethon غالباً بيكون جاب الكيان مع التحديث نفسه — من غير شبكة
+        if cached is not None:
+            info = convert(cached)
+            self._put(key, info)
+            return info
+
+        # لو في worker تاني بيجيب نفس الكيان دلوقتي نستنى نفس الطلب
+        pending = self.inflight.get(key)
+        if pending is not None:
+            return await pending
+
+        future = asyncio.get_running_loop().create_future()
+        self.inflight[key] = future
+        try:
+            self.stats["fetches"] += 1
+            info = convert(await fetch())
+            self._put(key, info)
+            future.set_result(info)
+            return info
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            self.stats["errors"] += 1
+            future.set_exception(e)
+            # محدش تاني مستني؟ نعلّم الاستثناء إنه اتشاف عشان asyncio ما يشتكيش
+            future.exception()
+            raise
+        finally:
+            del self.inflight[key]
+
+    async def chat(self, message) -> dict:
+        """بيانات الجروب اللي فيه الرسالة."""
+        return await self._resolve(("chat", message.chat_id), message.chat, message.get_chat, chat_info)
+
+    async def sender(self, message) -> dict:
+        """بيانات مرسل الرسالة."""
+        if message.sender_id is None:
+            return sender_info(None)
+        return await self._resolve(("user", message.sender_id), message.sender, message.get_sender, sender_info)
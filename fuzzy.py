@@ -0,0 +1,126 @@
+"""
+Fuzzy
+=====
+مطابقة تتسامح مع الأخطاء الإملائية (1–2 حرف لكل كلمة) — قاموس حذف على طريقة SymSpell.
+
+- وقت البناء: كل كلمة في مفردات الكلمات المفتاحية بيتولد منها كل الصيغ بحذف حتى d حروف،
+  ويتسجلوا في dict: صيغة → الكلمات الأصلية.
+- وقت الفحص: نفس الحذف على كلمة الرسالة، وكل صيغة بتعمل lookup واحد في الـ dict،
+  والمرشحين بيتأكدوا بـ edit distance محدود. مفيش مرور على المفردات كلها أبداً.
+- المسافة المسموحة على حسب طول الكلمة — الكلمات القصيرة لازم تكون مطابقة تماماً.
+"""
+
+# أقل طول لكل مسافة: أقل من 4 حروف = مطابقة تامة، 4–7 = حرف واحد، 8+ = حرفين
+MIN_LENGTH = {1: 4, 2: 8}
+# كاش لنتيجة كل كلمة رسالة — الكلمات بتتكرر كتير بين الرسائل
+CACHE_SIZE = 20000
+
+
+def allowed_distance(token: str, max_distance: int) -> int:
+    """أقصى عدد أخطاء مسموح لكلمة بالطول ده."""
+    distance = 0
+    for d in range(1, max_distance + 1):
+        if len(token) >= MIN_LENGTH[d]:
+            distance = d
+    return distance
+
+
+def deletes(token: str, distance: int) -> set[str]:
+    """كل الصيغ الناتجة من حذف حتى distance حروف (من غير الكلمة نفسها)."""
+    result = set()
+    frontier = {token}
+    for _ in range(distance):
+        nxt = set()
+        for word in frontier:
+            for i in range(len(word)):
+                variant = word[:i] + word[i + 1:]
+                if variant not in result:
+                    nxt.add(variant)
+        result.update(nxt)
+        frontier = nxt
+    return result
+
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    """Damerau-Levenshtein (OSA) — بيوقف بدري ويرجع limit+1 لو المسافة أكبر من limit."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    prev2 = None
+    prev = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        cur = [i] + [0] * len(b)
+        row_min = i
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            value = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + cost)
+            # تبديل حرفين متجاورين = خطأ واحد
+            if prev2 is not None and i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                value = min(value, prev2[j - 2] + 1)
+            cur[j] = value
+            if value < row_min:
+                row_min = value
+        if row_min > limit:
+            return limit + 1
+        prev2, prev = prev, cur
+    return prev[-1]
+
+# ──────────────────────────── INDEX ─────────────────────────────
+
+class FuzzyIndex:
+    """قاموس حذف لمفردات الكلمات المفتاحية. lookup() ترجع الكلمات القريبة من كلمة الرسالة."""
+
+    def __init__(self, vocabulary, max_distance: int = 1):
+        if max_distance not in MIN_LENGTH:
+            raise ValueError(f"مسافة fuzzy غير مدعومة: {max_distance}")
+        self.max_distance = max_distance
+        self.limits: dict[str, int] = {}
+        self.deletions: dict[str, list[str]] = {}
+        self.cache: dict[str, tuple] = {}
+
+        for word in set(vocabulary):
+            limit = allowed_distance(word, max_distance)
+            if not limit:
+                continue
+            self.limits[word] = limit
+            for variant in deletes(word, limit):
+                self.deletions.setdefault(variant, []).append(word)
+
+    def __len__(self) -> int:
+        return len(self.limits)
+
+    def lookup(self, token: str) -> tuple:
+        """كلمات المفردات اللي على بعد مسموح من token (من غير token نفسه)."""
+        found = self.cache.get(token)
+        if found is not None:
+            return found
+
+        # حذف من الناحيتين — عشان أي تعديل (إضافة/حذف/تغيير) يتلاقى في صيغة مشتركة
+        result = set()
+        token_limit = allowed_distance(token, self.max_distance)
+        if token_limit:
+            candidates = set()
+            for variant in deletes(token, token_limit) | {token}:
+                words = self.deletions.get(variant)
+                if words:
+                    candidates.update(words)
+                if variant in self.limits:
+                    candidates.add(variant)
+            candidates.discard(token)
+            for word in candidates:
+                # الحد الأقل بين الكلمتين — كلمة رسالة قصيرة ما تتمطش لكلمة طويلة
+                limit = min(self.limits[word], token_limit)
+                if edit_distance(token, word, limit) <= limit:
+                    result.add(word)
+
+        found = tuple(result)
+        if len(self.cache) >= CACHE_SIZE:
+            self.cache.clear()
+        self.cache[token] = found
+        return found
+
+    def expand(self, tokens: set[str]) -> set[str]:
+        """tokens الرسالة + كل كلمات المفردات القريبة منها."""
+        expanded = set(tokens)
+        for token in tokens:
+            expanded.update(self.lookup(token))
+        return expanded
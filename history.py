@@ -0,0 +1,131 @@
+"""
+History
+=======
+سجل كل التنبيهات في القاعدة (alert_history + فهرس FTS5) عشان البحث بعدين بـ /find.
+
+- record() بتضيف للذاكرة بس (من غير await) — التنبيه ما بيستناش القاعدة.
+- task في الخلفية بتكتب الدفعة كلها في معاملة واحدة كل FLUSH_INTERVAL ثانية
+  أو لما الدفعة توصل BATCH_SIZE.
+- الاحتفاظ بالأيام: مرة كل ساعة بيتحذف كل يوم أقدم من المدة (مدى واحد على فهرس الوقت).
+"""
+
+import time
+import asyncio
+import logging
+
+from normalize import normalize_arabic
+from storage import Database
+
+log = logging.getLogger("userbot")
+
+BATCH_SIZE = 50
+FLUSH_INTERVAL = 5
+PRUNE_INTERVAL = 3600
+DAY = 86400
+
+# ──────────────────────────── WRITER ────────────────────────────
+
+class HistoryWriter:
+    """كتابة السجل على دفعات + حذف الأيام القديمة."""
+
+    def __init__(self, store, retention_days: int = 30):
+        self.store = store
+        self.retention_days = retention_days
+        self.buffer: list[tuple] = []
+        self.flush_now = asyncio.Event()
+        self.task: asyncio.Task = None
+        self.last_prune = 0.0
+        self.stats = {"recorded": 0, "flushes": 0, "pruned": 0, "errors": 0}
+
+    def start(self):
+        self.task = asyncio.create_task(self._run(), name="history")
+
+    async def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
+            self.task = None
+        # آخر دفعة قبل القفل
+        await self.flush()
+
+    def record(self, alert: dict):
+        """إضافة تنبيه للسجل (بدون await)."""
+        self.buffer.append((
+            time.time(),
+            alert.get("chat_id"),
+            alert.get("chat_title"),
+            alert.get("sender_id"),
+            alert.get("sender_name"),
+            alert.get("msg_id"),
+            alert.get("link"),
+            ", ".join(alert["matched"]),
+            normalize_arabic(alert["text"]),
+        ))
+        if len(self.buffer) >= BATCH_SIZE:
+            self.flush_now.set()
+
+    async def flush(self):
+        if not self.buffer:
+            return
+        rows, self.buffer = self.buffer, []
+        try:
+            await self.store.execute(Database.add_history, rows)
+        except Exception as e:
+            self.stats["errors"] += 1
+            log.error(f"❌  فشل حفظ السجل ({len(rows)} تنبيه): {e}")
+            return
+        self.stats["recorded"] += len(rows)
+        self.stats["flushes"] += 1
+
+    async def prune(self):
+        # حذف أيام كاملة — الحد على بداية اليوم عشان كل يوم يتمسح مرة واحدة
+        cutoff = (time.time() // DAY - self.retention_days) * DAY
+        pruned = await self.store.execute(Database.prune_history, cutoff)
+        self.stats["pruned"] += pruned
+        if pruned:
+            log.info(f"🧹  تم حذف {pruned} تنبيه أقدم من {self.retention_days} يوم من السجل.")
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self.flush_now.wait(), FLUSH_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            self.flush_now.clear()
+            await self.flush()
+            if self.retention_days and time.monotonic() - self.last_prune >= PRUNE_INTERVAL:
+                self.last_prune = time.monotonic()
+                try:
+                    await self.prune()
+                except Exception as e:
+                    self.stats["errors"] += 1
+                    log.error(f"❌  فشل تنظيف السجل: {e}")
+
+# ──────────────────────────── SEARCH ────────────────────────────
+
+async def search(store, query: str, page: int = 1, per_page: int = 5) -> tuple[int, list[dict]]:
+    """بحث في السجل بالنص المطبّع. ترجع (العدد الكلي, نتائج الصفحة)."""
+    terms = normalize_arabic(query).split()
+    if not terms:
+        return 0, []
+    return await store.execute(Database.search_history, terms, per_page, (page - 1) * per_page)
+
+
+def format_results(query: str, total: int, page: int, per_page: int, rows: list[dict]) -> str:
+    """نص markdown لصفحة نتائج البحث."""
+    if not rows:
+        return f"🔎 مفيش نتائج لـ `{query}`." if page == 1 else "🔎 مفيش نتائج تانية."
+    pages = (total + per_page - 1) // per_page
+    lines = [f"🔎 **نتائج `{query}`** — {total} تنبيه (صفحة {page}/{pages})", ""]
+    for row in rows:
+        when = time.strftime("%Y-%m-%d %H:%M", time.localtime(row["created_at"]))
+        snippet = row["text"][:150] + ("…" if len(row["text"]) > 150 else "")
+        lines.append(f"⏰ {when} — 🏷 {row['chat_title'] or row['chat_id']}")
+        lines.append(f"👤 {row['sender_name'] or row['sender_id']} — 🎯 `{row['matched']}`")
+        lines.append(f"> {snippet}")
+        if row["link"]:
+            lines.append(f"[ذهاب للرسالة]({row['link']})")
+        lines.append("")
+    if page < pages:
+        lines.append("`/more` — الصفحة التالية")
+    return "\n".join(lines)
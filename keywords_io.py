@@ -0,0 +1,144 @@
+"""
+Keywords I/O
+============
+تصدير واستيراد الكلمات كلها كملف (JSONL أو CSV) بدل + / - سطر سطر — مع
+النوع (regex / أي ترتيب) والوزن والفئة والجروبات المربوطة.
+
+JSONL — كلمة في كل سطر:
+    {"keyword": "شقة للبيع", "regex": false, "mode": "words", "weight": 2, "category": "عقارات", "chats": [-100123]}
+
+CSV — نفس الحقول كأعمدة (الجروبات مفصولة بمسافة):
+    keyword,regex,mode,weight,category,chats
+
+الحقول كلها اختيارية ماعدا keyword. الملف بيتفحص كله الأول (regex خطر / وزن
+غلط / ...) وأي سطر فيه مشكلة بيتساب مع سببه — الباقي بيتستورد في معاملة واحدة.
+"""
+
+import io
+import csv
+import json
+import math
+import logging
+
+from regex_guard import check_pattern
+from storage import MODE_PHRASE, MODE_WORDS
+
+log = logging.getLogger("userbot")
+
+FORMAT_JSONL = "jsonl"
+FORMAT_CSV = "csv"
+FORMATS = (FORMAT_JSONL, FORMAT_CSV)
+COLUMNS = ("keyword", "regex", "mode", "weight", "category", "chats")
+# أكبر ملف بيتقبل في /import
+MAX_IMPORT_BYTES = 5 * 1024 * 1024
+
+# ──────────────────────────── EXPORT ────────────────────────────
+
+def to_record(kw: dict) -> dict:
+    """كلمة من KeywordStore → سطر في الملف (من غير الحقول الفاضية)."""
+    record = {"keyword": kw["keyword"]}
+    if kw["is_regex"]:
+        record["regex"] = True
+    elif kw.get("mode", MODE_PHRASE) != MODE_PHRASE:
+        record["mode"] = kw["mode"]
+    if kw.get("weight") is not None:
+        record["weight"] = kw["weight"]
+    if kw.get("category"):
+        record["category"] = kw["category"]
+    if kw.get("chats"):
+        record["chats"] = sorted(kw["chats"])
+    return record
+
+
+def export_keywords(keywords: list[dict], fmt: str = FORMAT_JSONL) -> bytes:
+    records = [to_record(kw) for kw in keywords]
+    if fmt == FORMAT_CSV:
+        out = io.StringIO()
+        writer = csv.writer(out)
+        writer.writerow(COLUMNS)
+        for r in records:
+            writer.writerow([
+                r["keyword"], "1" if r.get("regex") else "", r.get("mode", ""),
+                f"{r['weight']:g}" if "weight" in r else "", r.get("category", ""),
+                " ".join(map(str, r.get("chats", []))),
+            ])
+        # BOM عشان Excel يفتح العربي صح
+        return out.getvalue().encode("utf-8-sig")
+    return "".join(json.dumps(r, ensure_ascii=False) + "\n" for r in records).encode("utf-8")
+
+# ──────────────────────────── IMPORT ────────────────────────────
+
+def detect_format(file_name: str) -> str:
+    return FORMAT_CSV if (file_name or "").lower().endswith(".csv") else FORMAT_JSONL
+
+
+def _flag(value) -> bool:
+    if isinstance(value, str):
+        return value.strip().lower() in ("1", "true", "yes", "regex", "r")
+    return bool(value)
+
+
+def from_record(record: dict) -> dict:
+    """سطر من الملف → عنصر لـ KeywordStore.import_keywords. ValueError لو فيه مشكلة."""
+    keyword = str(record.get("keyword") or "").strip()
+    if not keyword:
+        raise ValueError("من غير keyword")
+    is_regex = _flag(record.get("regex"))
+    mode = str(record.get("mode") or MODE_PHRASE).strip().lower()
+    if mode not in (MODE_PHRASE, MODE_WORDS):
+        raise ValueError(f"mode غير معروف: {mode}")
+    if is_regex:
+        reason = check_pattern(keyword)
+        if reason:
+            raise ValueError(reason)
+        mode = MODE_PHRASE
+
+    weight = record.get("weight")
+    if weight in (None, ""):
+        weight = None
+    else:
+        weight = float(weight)
+        # nan/inf بيعدّوا من مقارنة < 0 — وبيبوظوا الدرجة وترتيب التنبيهات
+        if not math.isfinite(weight) or weight < 0:
+            raise ValueError("الوزن لازم يكون رقم موجب")
+
+    chats = record.get("chats") or []
+    if isinstance(chats, str):
+        chats = chats.replace(",", " ").split()
+    return {
+        "keyword": keyword,
+        "is_regex": is_regex,
+        "mode": mode,
+        "weight": weight,
+        "category": str(record.get("category") or "").strip() or None,
+        "chats": sorted({int(c) for c in chats}),
+    }
+
+
+def parse_keywords(data: bytes, fmt: str) -> tuple[list[dict], list[str]]:
+    """الملف كله → (العناصر السليمة, مشاكل "سطر N: السبب"). آخر تكرار لنفس الكلمة هو اللي بيتاخد."""
+    text = data.decode("utf-8-sig")
+    if fmt == FORMAT_CSV:
+        # رقم السطر = رقم الصف + 1 (الـ header)
+        records = enumerate(csv.DictReader(io.StringIO(text)), 2)
+    else:
+        records = ((n, line) for n, line in enumerate(text.splitlines(), 1) if line.strip())
+
+    items: dict[str, dict] = {}
+    errors = []
+    for n, record in records:
+        try:
+            if isinstance(record, str):
+                try:
+                    record = json.loads(record)
+                except json.JSONDecodeError:
+                    raise ValueError("JSON غير صالح") from None
+                if not isinstance(record, dict):
+                    raise ValueError("السطر لازم يكون object")
+            item = from_record(record)
+        except (ValueError, TypeError) as e:
+            errors.append(f"سطر {n}: {e}")
+            continue
+        items.pop(item["keyword"], None)
+        items[item["keyword"]] = item
+    return list(items.values()), errors
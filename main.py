@@ -7,22 +7,45 @@ Telegram Userbot — Keyword Monitor
 """
 
 import os
-import re
 import sys
-import sqlite3
+import io
+import json
+import time
+import math
 import logging
 import asyncio
 import subprocess
 import shutil
-from datetime import datetime
+import gc
+import functools
+import atexit
+import signal
+import queue
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 
 from dotenv import load_dotenv
-from telethon import TelegramClient, events, errors
+from telethon import TelegramClient, events
 from telethon.tl.types import (
     PeerUser, PeerChannel, Channel, Chat, User,
     MessageMediaDocument, MessageMediaPhoto,
 )
 
+import normalize
+from matcher import KeywordMatcher
+from regex_guard import RegexGuard, check_pattern
+from storage import Database, KeywordStore, MODE_PHRASE, MODE_WORDS, RULE_ALLOW, RULE_DENY
+from pipeline import Pipeline
+import scoring
+from alerts import AlertDispatcher
+from dedupe import Deduper, SeenMessages, message_key
+from entities import EntityCache
+import keywords_io
+from documents import DocumentExtractor, HAS_PYPDF
+import history
+from backfill import Backfill
+from supervisor import Supervisor, SessionRevoked
+from metrics import metrics
+
 # ──────────────────────────── CONFIG ────────────────────────────
 
 load_dotenv()
@@ -30,7 +53,9 @@ load_dotenv()
 API_ID = os.getenv("API_ID")
 API_HASH = os.getenv("API_HASH")
 SESSION_NAME = "userbot_session"
-DB_FILE = "keywords.db"
+# أكتر من حساب في نفس البرنامج: أسماء ملفات الجلسات مفصولة بفاصلة
+# الأول هو الأساسي (الأوامر والتنبيهات) — الباقي بيراقب جروباته بس
+SESSIONS = [name.strip() for name in os.getenv("SESSIONS", SESSION_NAME).split(",") if name.strip()]
 LOG_FILE = "bot.log"
 
 if not API_ID or not API_HASH:
@@ -39,304 +64,117 @@ if not API_ID or not API_HASH:
 
 API_ID = int(API_ID)
 
+# ─── قائمة الكلمات ───
+# عدد الكلمات في كل صفحة من # و /list (رسالة تيليجرام حدها 4096 حرف)
+LIST_PAGE_SIZE = int(os.getenv("LIST_PAGE_SIZE", "50"))
+
+# ─── التطبيع ───
+# توحيد الحروف (أ/إ/آ → ا ، ة → ه ، ى → ي) قبل المطابقة
+NORMALIZE_LETTERS = os.getenv("NORMALIZE_LETTERS", "1") == "1"
+# المطابقة التقريبية: عدد الأخطاء المسموحة لكل كلمة (0 = مقفولة) — تتغير بـ /fuzzy
+FUZZY_DISTANCE = min(max(int(os.getenv("FUZZY_DISTANCE", "0")), 0), 2)
+# مهلة كل نمط regex لكل رسالة (ms) وعدد التجاوزات قبل قفله تلقائياً
+REGEX_BUDGET_MS = int(os.getenv("REGEX_BUDGET_MS", "50"))
+REGEX_STRIKES = int(os.getenv("REGEX_STRIKES", "3"))
+
+# ─── Pipeline ───
+MATCH_QUEUE_SIZE = int(os.getenv("MATCH_QUEUE_SIZE", "1000"))
+MATCH_WORKERS = int(os.getenv("MATCH_WORKERS", "2"))
+QUEUE_POLICY = os.getenv("QUEUE_POLICY", "drop_oldest")  # drop_oldest | drop_new
+# أقصى عدد رسائل يسحبها الـ worker مرة واحدة لما يكون في رسائل مستنية
+MATCH_BATCH = int(os.getenv("MATCH_BATCH", "32"))
+
+# ─── تقييم التنبيهات ───
+# درجة = مجموع أوزان الكلمات المتطابقة — الحدود تتغير بـ /score
+SCORING = os.getenv("SCORING", "1") == "1"
+SCORE_THRESHOLD = float(os.getenv("SCORE_THRESHOLD", "0"))   # أقل درجة للتنبيه (0 = الكل)
+SCORE_HIGH = float(os.getenv("SCORE_HIGH", "4"))             # من هنا التنبيه بيتبعت قبل الباقي
+
+# ─── إرسال التنبيهات ───
+ALERT_RATE_PER_MINUTE = float(os.getenv("ALERT_RATE_PER_MINUTE", "20"))
+ALERT_BURST = int(os.getenv("ALERT_BURST", "5"))
+
+# ─── منع التكرار ───
+DEDUPE = os.getenv("DEDUPE", "1") == "1"
+DEDUPE_SIZE = int(os.getenv("DEDUPE_SIZE", "5000"))
+DEDUPE_TTL = int(os.getenv("DEDUPE_TTL", "1800"))
+DEDUPE_BY_SENDER = os.getenv("DEDUPE_BY_SENDER", "0") == "1"
+DEDUPE_NEAR = os.getenv("DEDUPE_NEAR", "0") == "1"
+
+# ─── كاش الجروبات والمرسلين ───
+ENTITY_TTL = int(os.getenv("ENTITY_TTL", "3600"))
+ENTITY_CACHE_SIZE = int(os.getenv("ENTITY_CACHE_SIZE", "5000"))
+
+# القيم الافتراضية لـ /digest on
+DIGEST_WINDOW = int(os.getenv("DIGEST_WINDOW", "300"))
+DIGEST_MAX = int(os.getenv("DIGEST_MAX", "20"))
+
+# ─── نص الملفات ───
+# فحص نص ملفات txt/pdf الصغيرة مع الرسالة (pdf محتاج pip install pypdf) — مقفول افتراضياً
+DOCUMENTS = os.getenv("DOCUMENTS", "0") == "1"
+DOCUMENT_MAX_KB = int(os.getenv("DOCUMENT_MAX_KB", "512"))         # أكبر ملف بيتحمل
+DOCUMENT_MAX_CHARS = int(os.getenv("DOCUMENT_MAX_CHARS", "20000"))  # أقصى نص بيتفحص من كل ملف
+DOCUMENT_WORKERS = int(os.getenv("DOCUMENT_WORKERS", "2"))          # تحميلات/قراءات في نفس الوقت
+DOCUMENT_CACHE = int(os.getenv("DOCUMENT_CACHE", "500"))            # عدد الملفات المحفوظ نصها
+
+# ─── سجل التنبيهات ───
+HISTORY = os.getenv("HISTORY", "1") == "1"
+HISTORY_DAYS = int(os.getenv("HISTORY_DAYS", "30"))
+HISTORY_PAGE_SIZE = int(os.getenv("HISTORY_PAGE_SIZE", "5"))
+
+# ─── استرجاع الرسائل الفايتة ───
+# python main.py --backfill → يفحص الرسائل اللي فاتت وقت ما البوت كان واقف عند التشغيل
+BACKFILL_ON_START = "--backfill" in sys.argv or os.getenv("BACKFILL_ON_START", "0") == "1"
+BACKFILL_CONCURRENCY = int(os.getenv("BACKFILL_CONCURRENCY", "3"))
+BACKFILL_LIMIT = int(os.getenv("BACKFILL_LIMIT", "2000"))
+
+# ─── المقاييس ───
+# ملف Prometheus text اختياري بيتحدث كل METRICS_INTERVAL ثانية (فاضي = مقفول)
+METRICS_FILE = os.getenv("METRICS_FILE", "")
+METRICS_INTERVAL = int(os.getenv("METRICS_INTERVAL", "60"))
+
+# ─── الاتصال ───
+# ملف بيتحدث كل HEARTBEAT_INTERVAL ثانية طول ما البرنامج شغال (فاضي = مقفول)
+HEARTBEAT_FILE = os.getenv("HEARTBEAT_FILE", "heartbeat.json")
+HEARTBEAT_INTERVAL = int(os.getenv("HEARTBEAT_INTERVAL", "30"))
+# أقصى انتظار بين محاولات إعادة الاتصال (ثواني)
+RECONNECT_MAX_DELAY = int(os.getenv("RECONNECT_MAX_DELAY", "60"))
+
+# كود الخروج لما الجلسة تتلغي — run_termux.sh ما يعيدش التشغيل
+EXIT_SESSION_REVOKED = 2
+# SIGTERM (الـ watchdog في run_termux.sh) — غير 0 عشان السكربت يعيد التشغيل
+EXIT_TERMINATED = 128 + signal.SIGTERM
+# اتقفل بـ SIGTERM؟ (main() بتتلغي ونرجع الكود ده بعد القفل النضيف)
+TERMINATED = {"signal": False}
+
 # ──────────────────────────── LOGGING ───────────────────────────
 
 DEBUG_MODE = os.getenv("DEBUG_MODE", "0") == "1"
 LOG_LEVEL = logging.DEBUG if DEBUG_MODE else logging.INFO
 
-logging.basicConfig(
-    level=LOG_LEVEL,
-    format="%(asctime)s [%(levelname)s] %(message)s",
-    handlers=[
-        logging.FileHandler(LOG_FILE, encoding="utf-8"),
-        logging.StreamHandler(sys.stdout),
-    ],
-)
+# حجم bot.log قبل ما يتلف لملف جديد، وعدد النسخ القديمة المحفوظة
+LOG_MAX_BYTES = int(os.getenv("LOG_MAX_MB", "5")) * 1024 * 1024
+LOG_BACKUPS = int(os.getenv("LOG_BACKUPS", "3"))
+
+# الـ event loop بيحط السجل في طابور بس — الكتابة للملف والشاشة على thread منفصل
+_formatter = logging.Formatter("%(asctime)s [%(levelname)s] %(message)s")
+_file_handler = RotatingFileHandler(LOG_FILE, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUPS, encoding="utf-8")
+_console_handler = logging.StreamHandler(sys.stdout)
+for _handler in (_file_handler, _console_handler):
+    _handler.setFormatter(_formatter)
+
+_log_queue = queue.SimpleQueue()
+log_listener = QueueListener(_log_queue, _file_handler, _console_handler)
+log_listener.start()
+# أي سجل لسه في الطابور بيتكتب قبل الخروج
+atexit.register(log_listener.stop)
+
+_queue_handler = QueueHandler(_log_queue)
+# QueueHandler بيدمج الـ args في الرسالة بس — التنسيق الكامل (الوقت/المستوى) في الـ listener
+_queue_handler.setFormatter(logging.Formatter("%(message)s"))
+logging.basicConfig(level=LOG_LEVEL, handlers=[_queue_handler])
 log = logging.getLogger("userbot")
 
-# ──────────────────────────── HELPERS ───────────────────────────
-
-def normalize_arabic(text: str) -> str:
-    """إزالة التشكيل والحركات والمسافات الزائدة من النص العربي لتحسين المطابقة."""
-    # إزالة الحركات العربية
-    arabic_diacritics = re.compile(r"[\u064B-\u065F\u0670\u0640]")
-    text = arabic_diacritics.sub("", text)
-    # توحيد المسافات
-    text = re.sub(r"\s+", " ", text)
-    # إزالة علامات الترقيم الشائعة
-    text = text.replace("؟", "").replace("!", "").replace(".", "").replace("،", "")
-    return text.strip()
-
-
-def match_keywords(text: str, keywords: list[dict]) -> list[str]:
-    """فحص النص مقابل الكلمات بمطابقة قوية جداً."""
-    matched = []
-    normalized_text = normalize_arabic(text.lower())
-    
-    for kw in keywords:
-        try:
-            normalized_kw = normalize_arabic(kw["keyword"].lower())
-            if kw["is_regex"]:
-                if re.search(normalized_kw, normalized_text, re.IGNORECASE):
-                    matched.append(kw["keyword"])
-            else:
-                # مطابقة قوية: التحقق من وجود كل كلمات العبارة المفتاحية
-                kw_words = normalized_kw.split()
-                text_words = normalized_text.split()
-                
-                # نفس العبارة كاملة
-                if normalized_kw in normalized_text:
-                    matched.append(kw["keyword"])
-                # أو كل الكلمات موجودة (بأي ترتيب)
-                elif all(any(word in text_word or text_word in word 
-                            for text_word in text_words) 
-                        for word in kw_words):
-                    matched.append(kw["keyword"])
-        except Exception as e:
-            log.warning(f"⚠️  خطأ في فحص الكلمة {kw.get('keyword', '?')}: {e}")
-    return matched
-
-
-def build_message_link(chat, msg_id: int) -> str:
-    """بناء رابط الرسالة."""
-    if hasattr(chat, "username") and chat.username:
-        return f"https://t.me/{chat.username}/{msg_id}"
-    if hasattr(chat, "id"):
-        # supergroup/channel خاص — internal id
-        internal_id = chat.id
-        return f"https://t.me/c/{internal_id}/{msg_id}"
-
-# ──────────────────────────── DEFAULT KEYWORDS ──────────────────
-
-DEFAULT_KEYWORDS = [
-    "تعروفون احد يسوي",
-    "تعرفون احد يحل",
-    "تعرفون احد يطلع",
-    "تعرفون حد يسوي",
-    "تعرفون حد يساعندي",
-    "تعرفون حد يحل",
-    "تعرفون شخص يسوي",
-    "تعرفون شخص يحل",
-    "تعرفون شخص يطلع",
-    "تعرفون ناس يسون",
-    "تعرفون ناس تحل",
-    "تعرفون ناس يحلون",
-    "تعرفون ناس تطلع اعذار",
-    "تعرفون ناس تطلع سكليف",
-    "تعرفون ناس يطلعون اعذار",
-    "تعرفون ناس يطلعون سكليف",
-    "ابي احد يحل",
-    "ابي احد يسوي",
-    "ابي احد يساعدني",
-    "ابي احد يطلع",
-    "ابي احد يلخص",
-    "ابي مساعده",
-    "ابي مساعدة",
-    "ابي احد يصمم",
-    "عندكم احد يحل",
-    "عندكم احد يسوي",
-    "عندكم احد يطلع",
-    "ابغى احد يحل",
-    "ابغى احد يسوي",
-    "ابغى احد يطلع",
-    "ابغى احد يساعدني",
-    "احد يحل واجب",
-    "احد يسوي واجب",
-    "احد يطلع سكليف",
-    "احد يطلع اعذار",
-    "ابغا احد يحل",
-    "ابغا احد يسوي",
-    "ابغا احد يطلع",
-    "يحل كويز",
-    "من يحل واجب",
-    "من يسوي لي واجب",
-    "من يسوي سكليف",
-    "من يسوي تلخيص",
-    "من يسوي بروزنتيشن",
-    "من يسوي بوربوينت",
-    "من يسوي تصميم",
-    "من وين اجيب سكليف",
-    "كيف اجيب سكليف",
-    "كيف اخذ سكليف",
-    "كيف اجيب عذر",
-    "ابغى عذر",
-    "ابغا حد يحل واجب",
-    "ابي احد يحل لي واجب",
-    "فيه احد يقدر يسوي عرض",
-    "تعرفون احد يسوي برفريزنق",
-    "تعرفون احد يطلع سكليف",
-    "يساعدني",
-    "السلام عليكم فيه احد يحل",
-    "السلام عليكم فيه احد يسوي",
-    "السلام عليكم فيه احد يطلع",
-    "فيه احد يحل يساعدني",
-    "احد يعرف مضمون يسوي اعذار",
-    "تعرفون احد يسوي",
-    "احتاج مساعده",
-    "احتاج مساعدة",
-    "ابغى مساعده",
-    "ابغى مساعدة",
-    "حد يعرف حد يحل",
-    "حد يعرف حد يسوي",
-    "حد يعرف حد يطلع",
-    "حد يعرف حد يساعدني",
-    "بنات اللي يسون سكسليقات ثقه ولا ابي سكليف",
-    "ابي سكليف على تاريخ قديم في احد يسوي",
-    "احد يسوي عروض تقديميه",
-    "احد يسوي سكليف",
-    "احد يسوي بحث",
-    "احد يسوي عذر",
-    "احد يسوي تقرير",
-    "ابي عذر",
-    "ابغا عذر",
-    "احتاج عذر",
-    "احتاج اعذار",
-    "مين يحل كويز",
-    "مين يحل واجب",
-    "مين يحل واجبات",
-    "مين يسوي واجب",
-    "مين يسوي بحث",
-    "مين يسوي تقرير",
-    "مين يسوي عروض",
-    "مين يسوي سكليف",
-    "مين يطلع عذر",
-    "مين يطلع اعذار",
-    "مين يطلع سكليف",
-    "مين يطلع اجازة مرضية",
-    "فيه احد يطلع سكليف",
-    "فيه احد يطلع اعذار",
-    "فيه احد يطلع اجازة مرضية",
-    "فيه احد يسوي واجب",
-    "فيه احد يسوي واجبات",
-    "فيه احد يسوي بحوث",
-    "فيه احد يسوي بحث",
-    "ابي رقم احد يسوي سكليف ثقه",
-    "ابي رقم احد يسوي بحث",
-    "ابي رقم احد يسوي واجبات",
-    "ابي رقم احد يسوي اجازة مرضية",
-    "ابي رقم احد يسوي عرض",
-    "ابي رقم احد يسوي عروض",
-    "ابي احد يسوي لي سكليف",
-    "ابي احد يسوي لي تقرير",
-    "ابي احد يسوي لي بحث",
-    "تعرفون ناس يحلون واجبات",
-    "تعرفون ناس يسون بحوث",
-    "تعرفون ناس يسون عروض",
-    "تعرفون ناس يسون اجازات مرضية",
-    "ياخوان ابي حد يحل كويز فيزياء",
-    "ابي حد يحل كويز",
-    "السلام عليكم بغيت واحد يسوي لي ميرشنت",
-    "بغيت واحد يسوي لي ميرشنت",
-    "بغيت واحد يسوي لي واجب",
-    "احد يعرف شخص يسوي خريطه ذهنيه",
-    "احد يعرف شخص يسوي سكليف",
-    "مين يعرف يحل انقليزي",
-    "مين يعرف يحل واجب",
-    "مين يعرف يسوي بحث",
-    "ابي دكتور يحل لي",
-    "ابي دكتور يسوي لي",
-    "ابي دكتور يطلع لي",
-    "من يعرف واحد يسوي",
-]
-
-# ──────────────────────────── DATABASE ──────────────────────────
-
-def init_db():
-    """إنشاء قاعدة البيانات والجدول إذا لم يكن موجوداً."""
-    conn = sqlite3.connect(DB_FILE)
-    conn.execute(
-        """
-        CREATE TABLE IF NOT EXISTS keywords (
-            id       INTEGER PRIMARY KEY AUTOINCREMENT,
-            keyword  TEXT    NOT NULL UNIQUE,
-            is_regex INTEGER NOT NULL DEFAULT 0
-        )
-        """
-    )
-    conn.execute(
-        """
-        CREATE TABLE IF NOT EXISTS config (
-            key   TEXT PRIMARY KEY,
-            value TEXT
-        )
-        """
-    )
-    conn.commit()
-    conn.close()
-    # إضافة الكلمات الافتراضية لو القاعدة فاضية
-    seed_defaults()
-
-
-def seed_defaults():
-    """إضافة الكلمات الافتراضية إذا كانت القاعدة فاضية."""
-    conn = sqlite3.connect(DB_FILE)
-    count = conn.execute("SELECT COUNT(*) FROM keywords").fetchone()[0]
-    if count == 0:
-        log.info(f"📥  إضافة {len(DEFAULT_KEYWORDS)} كلمة مفتاحية افتراضية...")
-        for kw in DEFAULT_KEYWORDS:
-            try:
-                conn.execute(
-                    "INSERT INTO keywords (keyword, is_regex) VALUES (?, 0)",
-                    (kw,),
-                )
-            except sqlite3.IntegrityError:
-                pass
-        conn.commit()
-        log.info("✅  تمت إضافة الكلمات الافتراضية بنجاح.")
-    conn.close()
-
-
-def get_keywords() -> list[dict]:
-    """إرجاع كل الكلمات المفتاحية."""
-    conn = sqlite3.connect(DB_FILE)
-    rows = conn.execute("SELECT keyword, is_regex FROM keywords").fetchall()
-    conn.close()
-    return [{"keyword": r[0], "is_regex": bool(r[1])} for r in rows]
-
-
-def add_keyword(keyword: str, is_regex: bool = False) -> bool:
-    """إضافة كلمة مفتاحية. ترجع True لو نجحت."""
-    conn = sqlite3.connect(DB_FILE)
-    try:
-        conn.execute(
-            "INSERT INTO keywords (keyword, is_regex) VALUES (?, ?)",
-            (keyword, int(is_regex)),
-        )
-        conn.commit()
-        return True
-    except sqlite3.IntegrityError:
-        return False
-    finally:
-        conn.close()
-
-
-def del_keyword(keyword: str) -> bool:
-    """حذف كلمة مفتاحية. ترجع True لو تم الحذف."""
-    conn = sqlite3.connect(DB_FILE)
-    cur = conn.execute("DELETE FROM keywords WHERE keyword = ?", (keyword,))
-    conn.commit()
-    deleted = cur.rowcount > 0
-    conn.close()
-    return deleted
-
-
-def set_config(key: str, value: str):
-    """تعيين إعداد في قاعدة البيانات."""
-    conn = sqlite3.connect(DB_FILE)
-    conn.execute("INSERT OR REPLACE INTO config (key, value) VALUES (?, ?)", (key, value))
-    conn.commit()
-    conn.close()
-
-
-def get_config(key: str) -> str:
-    """جلب إعداد من قاعدة البيانات."""
-    conn = sqlite3.connect(DB_FILE)
-    cur = conn.execute("SELECT value FROM config WHERE key = ?", (key,))
-    row = cur.fetchone()
-    conn.close()
-    return row[0] if row else None
-
-
 # ──────────────────────────── CLIPBOARD (TERMUX) ────────────────
 
 def copy_to_clipboard(text: str):
@@ -355,105 +193,234 @@ def copy_to_clipboard(text: str):
     else:
         log.debug("termux-clipboard-set غير متوفر — تم تخطي النسخ.")
 
-# ──────────────────────────── HELPERS ───────────────────────────
+# ──────────────────────────── CHAT IDS ──────────────────────────
 
-def normalize_arabic(text: str) -> str:
-    """إزالة التشكيل والحركات من النص العربي لتحسين المطابقة."""
-    # إزالة الحركات العربية
-    arabic_diacritics = re.compile(
-        r"[\u064B-\u065F\u0670\u0640]"
-    )
-    return arabic_diacritics.sub("", text)
+def parse_chat_ids(args: list[str]) -> list[int]:
+    """أرقام الجروبات من نص الأمر. ترجع None لو في رقم مش صحيح."""
+    try:
+        return [int(arg) for arg in args]
+    except ValueError:
+        return None
 
+# ──────────────────────────── BOT ───────────────────────────────
 
-def match_keywords(text: str, keywords: list[dict]) -> list[str]:
-    """فحص النص مقابل الكلمات. ترجع قائمة بالكلمات المتطابقة."""
-    matched = []
-    # تطبيع النص
-    normalized_text = normalize_arabic(text.lower())
-    
-    for kw in keywords:
-        try:
-            normalized_kw = normalize_arabic(kw["keyword"].lower())
-            if kw["is_regex"]:
-                if re.search(normalized_kw, normalized_text, re.IGNORECASE):
-                    matched.append(kw["keyword"])
-            else:
-                if normalized_kw in normalized_text:
-                    matched.append(kw["keyword"])
-        except re.error:
-            log.warning(f"⚠️  تعبير regex غير صالح: {kw['keyword']}")
-    return matched
-
-
-def build_message_link(chat, msg_id: int) -> str:
-    """بناء رابط الرسالة."""
-    if hasattr(chat, "username") and chat.username:
-        return f"https://t.me/{chat.username}/{msg_id}"
-    if hasattr(chat, "id"):
-        # supergroup/channel خاص — internal id
-        internal_id = chat.id
-        return f"https://t.me/c/{internal_id}/{msg_id}"
-    return ""
-
-
-def get_sender_name(sender) -> str:
-    """الحصول على اسم المرسل."""
-    if sender is None:
-        return "مجهول"
-    if isinstance(sender, User):
-        parts = []
-        if sender.first_name:
-            parts.append(sender.first_name)
-        if sender.last_name:
-            parts.append(sender.last_name)
-        return " ".join(parts) if parts else "بدون اسم"
-    if hasattr(sender, "title"):
-        return sender.title
-    return "مجهول"
+# زمن كل مرحلة في التشغيل (ms من بداية main) — بيتسجل في السجل و bench/bench_startup.py بيقراه
+STARTUP: dict[str, float] = {}
 
-# ──────────────────────────── BOT ───────────────────────────────
 
 async def main():
-    init_db()
+    boot = time.perf_counter()
 
-    client = TelegramClient(SESSION_NAME, API_ID, API_HASH)
-    client.flood_sleep_threshold = 60
+    def mark(phase: str):
+        STARTUP[phase] = (time.perf_counter() - boot) * 1000
+
+    # SIGTERM بيلغي main() — نفس مسار القفل (disconnect + حفظ الجلسة + تفريغ السجل)
+    main_task = asyncio.current_task()
+
+    def terminate():
+        log.warning("🛑  وصل SIGTERM — جاري القفل...")
+        TERMINATED["signal"] = True
+        main_task.cancel()
 
-    await client.start()
-    me = await client.get_me()
-    owner_id = me.id
-    
-    # ═══════════ رسالة ترحيبية ═══════════
-    welcome_banner = (
-        "\n" + "═" * 60 + "\n"
-        "🤖  **Telegram Userbot — Monitor Bot**\n\n"
-        "✨  تم التطوير بواسطة: **المهندس / طه أيمن**\n"
-        "📱  Developer: Eng. Taha Ayman\n\n"
-        f"👤  المستخدم: {me.first_name}\n"
-        f"🆔  ID: {owner_id}\n"
-        f"🔑  الكلمات المفتاحية: {len(get_keywords())}\n"
-        "\n" + "═" * 60 + "\n"
-    )
-    print(welcome_banner)
-    log.info(f"✅  تم تسجيل الدخول: {me.first_name} (ID: {owner_id})")
-    log.info("🚀  تم التطوير بواسطة المهندس / طه أيمن")
-    
-    # إرسال رسالة ترحيب للـ Saved Messages
     try:
-        await client.send_message(
-            "me",
-            f"🤖 **البوت شغال الآن!**\n\n"
-            f"✨ تم التطوير بواسطة: **المهندس / طه أيمن**\n"
-            f"🔑 الكلمات المفتاحية: {len(get_keywords())}\n\n"
-            f"اكتب `/help` للمساعدة"
-        )
-    except:
+        asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, terminate)
+    except NotImplementedError:
+        # Windows
         pass
 
+    normalize.configure(unify_letters=NORMALIZE_LETTERS)
+    store = KeywordStore()
+    await store.load()
+    # أول تشغيل بس — قبل الاتصال عشان أول رسالة تلاقي الكلمات (معاملة واحدة، ms قليلة)
+    await store.seed_defaults()
+    mark("db")
+
+    clients = []
+    for session in SESSIONS:
+        # catch_up: التحديثات اللي فاتت من آخر pts/qts محفوظ في ملف الجلسة
+        account = TelegramClient(session, API_ID, API_HASH, catch_up=True)
+        account.flood_sleep_threshold = 60
+        clients.append(account)
+    client = clients[0]
+    # أرقام حساباتنا — بتتملى مع تسجيل دخول كل حساب
+    account_ids: set = set()
+
     # حالة المراقبة
     monitoring = {"active": True}
 
+    # أنماط regex اللي اتقفلت لأنها بطيئة — محفوظة عشان ما تتقفلش تاني بعد كل تشغيل
+    # ممكن يتنادى من thread (بناء المطابق في warm_up) — الحفظ دايماً بيتجدول على الـ loop
+    def save_disabled_regex(_keyword=None):
+        loop.call_soon_threadsafe(schedule_disabled_regex)
+
+    def schedule_disabled_regex():
+        value = json.dumps(sorted(regex_guard.disabled), ensure_ascii=False)
+        background.add(asyncio.create_task(store.set_config("regex_disabled", value)))
+        background.difference_update({t for t in background if t.done()})
+
+    background: set = set()
+    loop = asyncio.get_running_loop()
+    regex_guard = RegexGuard(
+        budget=REGEX_BUDGET_MS / 1000,
+        strikes=REGEX_STRIKES,
+        disabled=json.loads(store.get_config("regex_disabled") or "[]"),
+        on_disable=save_disabled_regex,
+    )
+
+    # المطابق المُجمَّع — يُعاد بناؤه فقط لما الكلمات (/add أو /del) أو /fuzzy أو الأنماط المقفولة يتغيروا.
+    # البناء (ثانية أو أكتر مع عشرات الآلاف من الكلمات) على thread، والرسائل بتتفحص
+    # بالمطابق القديم لحد ما الجديد يخلص ويتبدل مرة واحدة.
+    state = {"matcher": None, "version": None, "building": None}
+
+    def fuzzy_distance() -> int:
+        value = store.get_config("fuzzy")
+        return int(value) if value else FUZZY_DISTANCE
+
+    def matcher_version() -> tuple:
+        return (store.version, fuzzy_distance(), len(regex_guard.disabled))
+
+    def install_matcher(matcher: KeywordMatcher, version: tuple):
+        state["matcher"], state["version"] = matcher, version
+        log.info(f"🔁  تم بناء المطابق ({len(matcher)} كلمة، fuzzy={version[1]}).")
+
+    async def build_matcher() -> KeywordMatcher:
+        # لو الكلمات اتغيرت تاني وإحنا بنبني — نبني تاني بالنسخة الأحدث
+        while True:
+            version = matcher_version()
+            if state["version"] == version:
+                return state["matcher"]
+            matcher = await loop.run_in_executor(
+                None, functools.partial(KeywordMatcher, store.keywords, fuzzy=version[1], guard=regex_guard)
+            )
+            install_matcher(matcher, version)
+
+    def current_matcher() -> KeywordMatcher:
+        version = matcher_version()
+        if state["version"] != version:
+            if state["matcher"] is None:
+                # أول رسالة قبل ما warm_up يخلص — مفيش قديم نفحص بيه
+                install_matcher(KeywordMatcher(store.keywords, fuzzy=version[1], guard=regex_guard), version)
+            elif state["building"] is None or state["building"].done():
+                state["building"] = asyncio.create_task(build_matcher(), name="matcher-build")
+        return state["matcher"]
+
+    # التقييم — يُعاد بناؤه مع الكلمات (أوزان/فئات) أو الحدود أو نموذج فئات جديد
+    scores = {"scorer": None, "version": None, "model": None}
+
+    def score_limits() -> tuple[float, float]:
+        threshold = store.get_config("score_threshold")
+        high = store.get_config("score_high")
+        return (
+            float(threshold) if threshold else SCORE_THRESHOLD,
+            float(high) if high else SCORE_HIGH,
+        )
+
+    def current_scorer() -> scoring.Scorer:
+        limits = score_limits()
+        version = (store.version, store.weights_version, id(scores["model"]), limits)
+        if scores["version"] != version:
+            scores["scorer"] = scoring.Scorer(store.keywords, scores["model"], *limits)
+            scores["version"] = version
+        return scores["scorer"]
+
+    async def train_scorer() -> scoring.CategoryModel:
+        # القراءة على thread القاعدة والتدريب على thread تاني — الـ event loop فاضي
+        rows = await store.execute(Database.history_samples, scoring.TRAIN_LIMIT)
+        model = await asyncio.get_running_loop().run_in_executor(None, scoring.train, rows, store.keywords)
+        scores["model"] = model
+        if model is not None:
+            log.info(f"🧠  نموذج الفئات: {len(model)} فئة من {model.samples} تنبيه.")
+        return model
+
+    dispatcher = AlertDispatcher(client, store, ALERT_RATE_PER_MINUTE, ALERT_BURST)
+    await dispatcher.load()
+
+    deduper = Deduper(
+        max_size=DEDUPE_SIZE,
+        ttl=DEDUPE_TTL,
+        by_sender=DEDUPE_BY_SENDER,
+        near_duplicates=DEDUPE_NEAR,
+    ) if DEDUPE else None
+
+    entities = EntityCache(ttl=ENTITY_TTL, max_size=ENTITY_CACHE_SIZE)
+
+    documents = None
+    if DOCUMENTS:
+        documents = DocumentExtractor(
+            max_bytes=DOCUMENT_MAX_KB * 1024,
+            max_chars=DOCUMENT_MAX_CHARS,
+            workers=DOCUMENT_WORKERS,
+            cache_size=DOCUMENT_CACHE,
+        )
+        if not HAS_PYPDF:
+            log.info("📎  نص الملفات: txt بس — لقراءة PDF: pip install pypdf")
+
+    # الجروبات المشتركة بين الحسابات: الرسالة بتتفحص مرة واحدة بس
+    seen_messages = SeenMessages() if len(clients) > 1 else None
+
+    alert_history = history.HistoryWriter(store, retention_days=HISTORY_DAYS) if HISTORY else None
+    # آخر بحث عشان /more
+    last_search = {"query": None, "page": 0}
+
+    pipeline = Pipeline(
+        dispatcher, current_matcher, entities, deduper, alert_history,
+        match_queue_size=MATCH_QUEUE_SIZE,
+        workers=MATCH_WORKERS,
+        policy=QUEUE_POLICY,
+        get_scorer=current_scorer if SCORING else None,
+        batch_size=MATCH_BATCH,
+        documents=documents,
+        document_workers=DOCUMENT_WORKERS,
+    )
+
+    def admit(message, is_channel: bool) -> bool:
+        """الرسالة تدخل المطابقة؟ نفس البوابة للرسائل الـ live وللـ backfill."""
+        if not monitoring["active"]:
+            log.debug("⏸ المراقبة متوقفة — تم تجاهل الرسالة")
+            return False
+        if seen_messages is not None:
+            # رسالة كتبها حساب من حساباتنا بتوصل "incoming" للباقيين
+            if message.sender_id in account_ids:
+                return False
+            if not seen_messages.first(message_key(message, is_channel)):
+                return False
+        return True
+
+    backfill = Backfill(
+        client, store, pipeline,
+        concurrency=BACKFILL_CONCURRENCY, limit=BACKFILL_LIMIT, admit=admit,
+    )
+    await backfill.load()
+    # قبل الـ handlers — /status بيقرا supervisor.stats من أول رسالة
+    supervisor = Supervisor(
+        clients,
+        heartbeat_file=HEARTBEAT_FILE or None,
+        interval=HEARTBEAT_INTERVAL,
+        max_delay=RECONNECT_MAX_DELAY,
+    )
+
+    # العدادات بتتقري من stats بتاع كل مكون وقت العرض بس
+    metrics.register("pipeline", lambda: pipeline.stats)
+    metrics.register("alerts", lambda: dispatcher.stats)
+    metrics.register("entities", lambda: entities.stats)
+    metrics.register("backfill", lambda: backfill.stats)
+    if seen_messages is not None:
+        metrics.register("accounts", lambda: {"count": len(clients), "shared": seen_messages.suppressed})
+    if deduper is not None:
+        metrics.register("dedupe", lambda: {"suppressed": deduper.suppressed, "size": len(deduper)})
+    if alert_history is not None:
+        metrics.register("history", lambda: alert_history.stats)
+    if documents is not None:
+        metrics.register("documents", lambda: {**documents.stats, "cache": len(documents)})
+    metrics.register("connection", lambda: supervisor.stats)
+
+    def regex_status() -> str:
+        disabled = sorted(regex_guard.disabled)
+        if not disabled:
+            return "regex مقفول: لا يوجد"
+        names = "، ".join(f"`{kw}`" for kw in disabled[:10])
+        return f"⛔ regex مقفول ({len(disabled)}): {names} — `/regex reset` لإعادة التشغيل"
+
     # ───────── أوامر Saved Messages ─────────
 
     @client.on(events.NewMessage(
@@ -463,7 +430,7 @@ async def main():
     ))
     async def command_handler(event):
         text = event.raw_text.strip()
-        log.info(f"⚡ DEBUG: Command detected: {text} | Chat: {event.chat_id} | Private: {event.is_private}")
+        log.debug("⚡ Command detected: %s | Chat: %s | Private: %s", text, event.chat_id, event.is_private)
                      
         if not text:
             return
@@ -472,12 +439,11 @@ async def main():
         lower_text = text.lower()
 
         # أوامر الإدارة (إضافة/حذف) تشتغل بس في الخاص (Saved Messages)
-        # ماعدا /setlog و /status ممكن يشتغل في القنوات
+        # ماعدا /setlog و /status و /allow /deny /unlist ممكن يشتغلوا في القنوات
         if not event.is_private:
-            if not (lower_text.startswith("/setlog") or lower_text.startswith("/status")):
+            if not lower_text.startswith(("/setlog", "/status", "/allow", "/deny", "/unlist")):
                  return # تجاهل أي رسالة أخرى في القنوات
         
-        log.debug(f"Command received: {text} in {event.chat_id}")
 
         # ── إضافة (+ keyword) ──
         if text.startswith("+") or lower_text.startswith("/add"):
@@ -488,30 +454,38 @@ async def main():
                  return
             
             lines = [l.strip() for l in raw_content.split('\n') if l.strip()]
-            added = []
-            exist = []
+            items = []
+            rejected = []
             
             for line in lines:
                 is_regex = False
+                mode = MODE_PHRASE
                 kw = line
                 if line.startswith("r:"):
                     is_regex = True
                     kw = line[2:].strip()
-                    try:
-                        re.compile(kw)
-                    except:
-                        continue # Skip invalid regex
-                
-                if add_keyword(kw, is_regex):
-                    added.append(kw)
-                else:
-                    exist.append(kw)
+                    reason = check_pattern(kw)
+                    if reason:
+                        rejected.append(f"`{kw}` — {reason}")
+                        continue
+                elif line.startswith("w:"):
+                    # كل كلمات العبارة بأي ترتيب
+                    mode = MODE_WORDS
+                    kw = line[2:].strip()
+                    if not kw:
+                        continue
+                items.append({"keyword": kw, "is_regex": is_regex, "mode": mode})
+
+            # كل الأسطر في معاملة واحدة
+            added, exist = await store.add_keywords(items)
             
             msg = []
             if added:
                 msg.append(f"✅ **تمت الإضافة ({len(added)}):**\n" + "\n".join([f"- `{k}`" for k in added]))
             if exist:
                 msg.append(f"⚠️ **موجودة مسبقاً ({len(exist)}):**\n" + "\n".join([f"- `{k}`" for k in exist]))
+            if rejected:
+                msg.append(f"❌ **regex مرفوض ({len(rejected)}):**\n" + "\n".join([f"- {r}" for r in rejected]))
             
             await event.reply("\n\n".join(msg))
             log.info(f"➕ إضافات جديدة: {added}")
@@ -524,19 +498,18 @@ async def main():
                  return
 
             lines = [l.strip() for l in raw_content.split('\n') if l.strip()]
-            deleted = []
-            not_found = []
-
-            for line in lines:
-                 # إزالة r: لو موجود
-                 kw_to_del = line
-                 if kw_to_del.startswith("r:"):
-                     kw_to_del = kw_to_del[2:].strip()
-                 
-                 if del_keyword(kw_to_del):
-                     deleted.append(line)
-                 else:
-                     not_found.append(line)
+            # إزالة r: / w: لو موجود
+            pairs = [(line, line[2:].strip() if line.startswith(("r:", "w:")) else line) for line in lines]
+
+            # كل الأسطر في معاملة واحدة
+            deleted_kws, _ = await store.del_keywords([kw for _, kw in pairs])
+            deleted_set = set(deleted_kws)
+            # نمط اتحذف واتضاف تاني يبدأ على نظافة
+            if deleted_set & regex_guard.disabled:
+                regex_guard.disabled -= deleted_set
+                save_disabled_regex()
+            deleted = [line for line, kw in pairs if kw in deleted_set]
+            not_found = [line for line, kw in pairs if kw not in deleted_set]
             
             msg = []
             if deleted:
@@ -548,17 +521,94 @@ async def main():
             log.info(f"➖ محذوفات: {deleted}")
 
         # ── عرض (#) ──
-        elif text == "#" or lower_text == "/list":
-            kws = get_keywords()
+        elif text == "#" or lower_text.split()[0] == "/list":
+            kws = store.keywords
             if not kws:
                 await event.reply("📭  لا توجد كلمات مفتاحية حالياً.")
             else:
+                # صفحات — القائمة كلها في رسالة واحدة بتعدي حد تيليجرام مع آلاف الكلمات
+                pages = (len(kws) + LIST_PAGE_SIZE - 1) // LIST_PAGE_SIZE
+                args = lower_text.split()[1:]
+                page = int(args[0]) if args and args[0].isdigit() else 1
+                page = min(max(page, 1), pages)
+                first = (page - 1) * LIST_PAGE_SIZE
                 lines = []
-                for i, kw in enumerate(kws, 1):
-                    tag = " 🔤" if not kw["is_regex"] else " 🔣 regex"
+                for i, kw in enumerate(kws[first:first + LIST_PAGE_SIZE], first + 1):
+                    if kw["is_regex"]:
+                        tag = " 🔣 regex"
+                    elif kw.get("mode") == MODE_WORDS:
+                        tag = " 🔀 أي ترتيب"
+                    else:
+                        tag = " 🔤"
+                    if kw.get("chats"):
+                        tag += f" 📍{len(kw['chats'])}"
+                    if kw.get("weight") is not None:
+                        tag += f" ⚖️{kw['weight']:g}"
+                    if kw.get("category"):
+                        tag += f" 📂{kw['category']}"
                     lines.append(f"  {i}. `{kw['keyword']}`{tag}")
                 header = f"📋  **الكلمات المفتاحية ({len(kws)}):**\n"
-                await event.reply(header + "\n".join(lines))
+                footer = ""
+                if pages > 1:
+                    footer = f"\n\n📄 صفحة {page}/{pages}"
+                    if page < pages:
+                        footer += f" — `/list {page + 1}` للي بعدها"
+                await event.reply(header + "\n".join(lines) + footer)
+
+        # ── /export (كل الكلمات كملف) ──
+        elif lower_text.startswith("/export"):
+            fmt = keywords_io.FORMAT_CSV if "csv" in lower_text.split()[1:] else keywords_io.FORMAT_JSONL
+            data = keywords_io.export_keywords(store.keywords, fmt)
+            file = io.BytesIO(data)
+            file.name = f"keywords.{fmt}"
+            await client.send_file(
+                "me", file, force_document=True,
+                caption=f"📤 {len(store.keywords)} كلمة — ابعت الملف بـ `/import` عشان ترجعه",
+            )
+            log.info(f"📤 تصدير {len(store.keywords)} كلمة ({fmt})")
+
+        # ── /import (ملف كلمات في Saved Messages) ──
+        elif lower_text.startswith("/import"):
+            replace = "sync" in lower_text.split()[1:]
+            # الأمر كـ caption للملف نفسه أو reply على الملف
+            message = event.message if event.message.file else await event.get_reply_message()
+            if message is None or message.file is None:
+                await event.reply(
+                    "⚠️  الاستخدام: ابعت ملف `.jsonl` أو `.csv` وفي الـ caption `/import`"
+                    " (أو رد على الملف بـ `/import`) — `/import sync` يحذف كمان أي كلمة مش في الملف"
+                )
+                return
+            if (message.file.size or 0) > keywords_io.MAX_IMPORT_BYTES:
+                await event.reply("⚠️  الملف أكبر من 5MB.")
+                return
+            data = await client.download_media(message, file=bytes)
+            try:
+                items, problems = keywords_io.parse_keywords(data, keywords_io.detect_format(message.file.name))
+            except UnicodeDecodeError:
+                await event.reply("⚠️  الملف لازم يكون UTF-8.")
+                return
+            if not items:
+                await event.reply("⚠️  مفيش ولا كلمة سليمة في الملف." + "".join(f"\n- {e}" for e in problems[:10]))
+                return
+
+            # معاملة واحدة + بناء المطابق مرة واحدة
+            added, updated, deleted = await store.import_keywords(items, replace)
+            # أنماط regex اتشالت أو اتغيرت تبدأ على نظافة
+            stale = regex_guard.disabled - {kw["keyword"] for kw in store.keywords if kw["is_regex"]}
+            if stale:
+                regex_guard.disabled -= stale
+                save_disabled_regex()
+
+            msg = f"📥 **تم الاستيراد:** ➕ {added} جديدة — ✏️ {updated} اتحدثت"
+            if replace:
+                msg += f" — 🗑 {deleted} اتحذفت"
+            msg += f"\n🔑 الكلمات دلوقتي: {len(store.keywords)}"
+            if problems:
+                msg += f"\n\n❌ **سطور اتسابت ({len(problems)}):**\n" + "\n".join(f"- {e}" for e in problems[:10])
+                if len(problems) > 10:
+                    msg += f"\n… و {len(problems) - 10} كمان"
+            await event.reply(msg)
+            log.info(f"📥 استيراد: {added} جديدة، {updated} اتحدثت، {deleted} اتحذفت، {len(problems)} مرفوضة")
 
         # ── /on ──
         elif lower_text == "/on":
@@ -577,29 +627,280 @@ async def main():
             help_text = (
                 "📖  **أوامر البوت (Eng. Taha Ayman):**\n\n"
                 "`+ كلمة` — إضافة كلمة (أو كلمات في أسطر)\n"
+                "`+ w:كلمة كلمة` — كل الكلمات بأي ترتيب\n"
+                "`+ r:نمط` — تعبير regex\n"
                 "`- كلمة` — حذف كلمة (أو كلمات)\n"
-                "`#` — عرض قائمة الكلمات\n"
+                "`#` — عرض قائمة الكلمات (`/list 2` للصفحة التانية)\n"
+                "`/export [csv]` — كل الكلمات كملف\n"
+                "`/import [sync]` — استيراد ملف كلمات (caption للملف)\n"
                 "`/on` — تفعيل المراقبة\n"
                 "`/off` — إيقاف المراقبة\n"
                 "`/status` — الحالة\n"
-                "`/setlog` — تعيين القناة للتنبيهات\n\n"
+                "`/setlog` — تعيين القناة للتنبيهات\n"
+                "`/digest on|off` — وضع الملخص (رسالة واحدة لعدة تنبيهات)\n"
+                "`/fuzzy on [1|2]|off` — تجاهل الأخطاء الإملائية\n"
+                "`/regex reset` — تشغيل أنماط regex المقفولة تاني\n"
+                "`/allow` `/deny` `/unlist` — فلترة الجروبات (جوه الجروب أو بالـ id)\n"
+                "`/scope كلمة | id id` — الكلمة تشتغل في جروبات معينة بس\n"
+                "`/chats` — عرض فلترة الجروبات\n"
+                "`/find كلمة` — البحث في التنبيهات القديمة (`/more` للمزيد)\n"
+                "`/backfill` — فحص الرسائل اللي فاتت وقت ما البوت كان واقف\n"
+                "`/stats` — المقاييس: السرعة والزمن وأكتر الكلمات\n"
+                "`/weight كلمة | وزن | فئة` — أهمية الكلمة وفئتها\n"
+                "`/score` — حدود التقييم ونموذج الفئات\n\n"
                 f"📊  **الحالة:** {'🟢 مفعّل' if monitoring['active'] else '🔴 متوقف'}\n"
-                f"🔑  **الكلمات:** {len(get_keywords())}"
+                f"🔑  **الكلمات:** {len(store.keywords)}"
             )
             await event.reply(help_text)
 
+        # ── /allow /deny /unlist (فلترة الجروبات) ──
+        elif lower_text.split()[0] in ("/allow", "/deny", "/unlist"):
+            command, *args = lower_text.split()
+            # جوه الجروب من غير أرقام = الجروب الحالي
+            chat_ids = parse_chat_ids(args) if args else ([event.chat_id] if not event.is_private else None)
+            if not chat_ids:
+                await event.reply(
+                    f"⚠️  الاستخدام: `{command} -100123456789` أو ابعت `{command}` جوه الجروب نفسه"
+                )
+                return
+            rule = {"/allow": RULE_ALLOW, "/deny": RULE_DENY, "/unlist": None}[command]
+            await store.set_chat_rules(chat_ids, rule)
+            ids = "، ".join(f"`{c}`" for c in chat_ids)
+            replies = {
+                RULE_ALLOW: f"✅ تمت إضافة {ids} لقائمة السماح — الجروبات التانية هتتجاهل.",
+                RULE_DENY: f"🚫 تم حظر {ids} — رسائله مش هتتفحص.",
+                None: f"↩️ تمت إزالة {ids} من القوائم.",
+            }
+            await event.reply(replies[rule])
+            log.info(f"🗂 قاعدة جروبات {rule}: {chat_ids}")
+
+        # ── /chats (عرض قواعد الجروبات) ──
+        elif lower_text == "/chats":
+            allowed = sorted(store.allowed_chats)
+            denied = sorted(store.denied_chats)
+            scoped = [kw for kw in store.keywords if kw.get("chats")]
+            lines = [
+                "🗂  **فلترة الجروبات:**\n",
+                f"✅ مسموحة ({len(allowed)}): " + ("، ".join(f"`{c}`" for c in allowed) or "الكل"),
+                f"🚫 محظورة ({len(denied)}): " + ("، ".join(f"`{c}`" for c in denied) or "لا يوجد"),
+            ]
+            if scoped:
+                lines.append(f"\n📍 **كلمات مربوطة بجروبات ({len(scoped)}):**")
+                for kw in scoped:
+                    chats = "، ".join(f"`{c}`" for c in sorted(kw["chats"]))
+                    lines.append(f"- `{kw['keyword']}` ← {chats}")
+            await event.reply("\n".join(lines))
+
+        # ── /scope (ربط كلمة بجروبات) ──
+        elif lower_text.startswith("/scope") or lower_text.startswith("/unscope"):
+            unscope = lower_text.startswith("/unscope")
+            body = text[len("/unscope"):] if unscope else text[len("/scope"):]
+            keyword, _, ids = body.partition("|")
+            keyword = keyword.strip()
+            chat_ids = [] if unscope else parse_chat_ids(ids.split())
+            if not keyword or chat_ids is None or (not unscope and not chat_ids):
+                await event.reply(
+                    "⚠️  الاستخدام: `/scope كلمة | -100123 -100456` أو `/unscope كلمة`"
+                )
+                return
+            if not await store.set_scope(keyword, chat_ids):
+                await event.reply(f"⚠️ الكلمة `{keyword}` غير موجودة.")
+                return
+            if chat_ids:
+                await event.reply(f"📍 الكلمة `{keyword}` هتتفحص بس في {len(chat_ids)} جروب.")
+            else:
+                await event.reply(f"🌐 الكلمة `{keyword}` هتتفحص في كل الجروبات.")
+            log.info(f"📍 نطاق الكلمة {keyword}: {chat_ids or 'الكل'}")
+
+        # ── /find /more (البحث في سجل التنبيهات) ──
+        elif lower_text.startswith("/find") or lower_text == "/more":
+            if alert_history is None:
+                await event.reply("⚠️ سجل التنبيهات مقفول (HISTORY=0).")
+                return
+            if lower_text == "/more":
+                if not last_search["query"]:
+                    await event.reply("⚠️ ابحث الأول بـ `/find كلمة`.")
+                    return
+                query, page = last_search["query"], last_search["page"] + 1
+            else:
+                query, page = text[len("/find"):].strip(), 1
+                if not query:
+                    await event.reply("⚠️  الاستخدام: `/find كلمة` ثم `/more` للصفحة التالية")
+                    return
+            # التنبيهات اللي لسه في الذاكرة تدخل في البحث
+            await alert_history.flush()
+            total, rows = await history.search(store, query, page, HISTORY_PAGE_SIZE)
+            last_search.update(query=query, page=page)
+            await event.reply(
+                history.format_results(query, total, page, HISTORY_PAGE_SIZE, rows),
+                link_preview=False,
+            )
+
+        # ── /backfill (استرجاع الرسائل الفايتة) ──
+        elif lower_text == "/backfill":
+            if not len(backfill):
+                await event.reply("✅ مفيش رسائل فايتة — البوت شاف كل حاجة.")
+                return
+            running = backfill.running is not None and not backfill.running.done()
+            await event.reply(
+                "⏪ الاسترجاع شغال بالفعل..." if running
+                else f"⏪ جاري فحص الرسائل الفايتة في {len(backfill)} جروب..."
+            )
+            if running:
+                return
+            result = await backfill.run()
+            await event.reply(
+                f"✅ انتهى الاسترجاع: {result['messages']} رسالة من {result['chats']} جروب"
+                f" — FloodWait: {result['flood_waits']} — أخطاء: {result['errors']}"
+            )
+
+        # ── /stats (المقاييس) ──
+        elif lower_text == "/stats reset":
+            metrics.reset()
+            await event.reply("♻️ تم تصفير المقاييس.")
+
+        elif lower_text == "/stats":
+            uptime = int(time.time() - metrics.started)
+            counters = metrics.counters()
+            lines = [f"📈 **المقاييس** (آخر {uptime // 3600}س {uptime % 3600 // 60}د):\n"]
+            for group, values in counters.items():
+                lines.append(f"**{group}:** " + " — ".join(f"{k} {v}" for k, v in values.items()))
+            latency = metrics.latency_lines()
+            if latency:
+                lines.append("\n⏱ **الزمن:**")
+                lines += latency
+            top = metrics.keyword_hits.most_common(10)
+            if top:
+                lines.append("\n🎯 **أكتر الكلمات:** " + "، ".join(f"`{kw}` {n}" for kw, n in top))
+            chats = metrics.chat_hits.most_common(5)
+            if chats:
+                names = []
+                for chat_id, n in chats:
+                    cached = entities.peek(("chat", chat_id))
+                    names.append(f"{cached['title'] if cached else chat_id} {n}")
+                lines.append("🏷 **أكتر الجروبات:** " + "، ".join(names))
+            dead = metrics.dead_keywords([kw["keyword"] for kw in store.keywords])
+            if dead:
+                sample = "، ".join(f"`{kw}`" for kw in dead[:15])
+                more = f" و{len(dead) - 15} كمان" if len(dead) > 15 else ""
+                lines.append(f"\n💤 **كلمات ما اتطابقتش ({len(dead)}):** {sample}{more}")
+            await event.reply("\n".join(lines)[:4000])
+
+        # ── /weight (وزن وفئة كلمة) ──
+        elif lower_text.startswith("/weight"):
+            keyword, _, rest = text[len("/weight"):].partition("|")
+            keyword = keyword.strip()
+            weight_text, _, category = (part.strip() for part in rest.partition("|"))
+            try:
+                # auto = الوزن من طول العبارة
+                weight = None if weight_text.lower() in ("", "auto") else float(weight_text)
+            except ValueError:
+                weight = None
+                keyword = ""
+            if not keyword or (weight is not None and (not math.isfinite(weight) or weight < 0)):
+                await event.reply(
+                    "⚠️  الاستخدام: `/weight كلمة | 2.5 | فئة` — `auto` للوزن التلقائي، ومن غير فئة لإلغائها"
+                )
+                return
+            if not await store.set_weight(keyword, weight, category or None):
+                await event.reply(f"⚠️ الكلمة `{keyword}` غير موجودة.")
+                return
+            kw = next(kw for kw in store.keywords if kw["keyword"] == keyword)
+            shown = f"{scoring.keyword_weight(kw):g}" + (" (تلقائي)" if weight is None else "")
+            await event.reply(
+                f"⚖️ الكلمة `{keyword}`: الوزن {shown}"
+                + (f" — الفئة 📂 {category}" if category else " — بدون فئة")
+            )
+            log.info(f"⚖️ وزن الكلمة {keyword}: {weight} ({category or '-'})")
+
+        # ── /score (حدود التقييم ونموذج الفئات) ──
+        elif lower_text.startswith("/score"):
+            args = lower_text.split()[1:]
+            if args and args[0] == "train":
+                await event.reply("🧠 جاري تدريب نموذج الفئات من سجل التنبيهات...")
+                model = await train_scorer()
+                if model is None:
+                    await event.reply(
+                        f"⚠️ مفيش بيانات كفاية — محتاج {scoring.MIN_SAMPLES} تنبيه على الأقل"
+                        " لكلمات ليها فئة (فئتين مختلفتين أو أكتر)."
+                    )
+                else:
+                    await event.reply(
+                        f"✅ النموذج جاهز: {len(model)} فئة ({'، '.join(model.categories)})"
+                        f" من {model.samples} تنبيه."
+                    )
+            elif len(args) == 2 and args[0] in ("min", "high"):
+                try:
+                    value = float(args[1])
+                except ValueError:
+                    await event.reply("⚠️  الاستخدام: `/score min 1.5` أو `/score high 4`")
+                    return
+                key = "score_threshold" if args[0] == "min" else "score_high"
+                await store.set_config(key, str(value))
+                await event.reply(
+                    f"📉 أقل درجة للتنبيه: {value:g}" if args[0] == "min"
+                    else f"🔥 التنبيهات من درجة {value:g} بتتبعت قبل الباقي"
+                )
+                log.info(f"⚖️ {key} = {value}")
+            else:
+                threshold, high = score_limits()
+                model = scores["model"]
+                model_text = (
+                    f"{len(model)} فئة من {model.samples} تنبيه" + (" (numpy)" if scoring.HAS_NUMPY else "")
+                    if model is not None else "مش متدرب"
+                )
+                await event.reply(
+                    f"⚖️ **التقييم:** {'🟢 مفعّل' if SCORING else '🔴 مقفول (SCORING=0)'}\n"
+                    f"📉 أقل درجة: {threshold:g} — 🔥 عالية القيمة من: {high:g}\n"
+                    f"🧠 نموذج الفئات: {model_text}\n"
+                    f"تحت الحد: {pipeline.stats['below_threshold']} — عالية القيمة: {pipeline.stats['leads']}\n\n"
+                    "`/score min رقم` — أقل درجة\n"
+                    "`/score high رقم` — حد التنبيهات المهمة\n"
+                    "`/score train` — إعادة تدريب نموذج الفئات"
+                )
+
+        # ── /regex (الأنماط المقفولة) ──
+        elif lower_text == "/regex reset":
+            count = len(regex_guard.disabled)
+            regex_guard.reset()
+            save_disabled_regex()
+            await event.reply(f"♻️ تم تشغيل {count} نمط regex مقفول تاني.")
+            log.info(f"♻️ إعادة تشغيل أنماط regex ({count}).")
+
         # ── /status ──
         elif lower_text == "/status":
-            kw_count = len(get_keywords())
-            log_channel = get_config("log_channel")
+            kw_count = len(store.keywords)
+            log_channel = store.get_config("log_channel")
             channel_status = f"📢 قناة: `{log_channel}`" if log_channel else "📁 Saved Messages"
             
             status = "🟢 مفعّل" if monitoring["active"] else "🔴 متوقف"
+            depth = pipeline.depth()
+            stats = pipeline.stats
+            accounts = f"الحسابات: {len(clients)} — إعادة اتصال: {supervisor.stats['reconnects']}"
+            if seen_messages is not None:
+                accounts += f" — رسائل مشتركة اتفحصت مرة واحدة: {seen_messages.suppressed}"
+            files = ""
+            if documents is not None:
+                files = (
+                    f"الملفات: اتقرت {documents.stats['extracted']} — من الكاش {documents.stats['cached']}"
+                    f" — أكبر من الحد {documents.stats['too_large']} — فشلت {documents.stats['failed']}"
+                    f" — مستنية تحميل {depth['document']} — اتفحص الـ caption بس {stats['documents_skipped']}\n"
+                )
             status_text = (
                 f"📊 **حالة البوت:**\n\n"
                 f"المراقبة: {status}\n"
                 f"التنبيهات: {channel_status}\n"
-                f"عدد الكلمات: {kw_count}\n\n"
+                f"عدد الكلمات: {kw_count}\n"
+                f"{accounts}\n"
+                f"الطوابير: مطابقة {depth['match']} (أقصى {stats['match_depth_max']})"
+                f" — تنبيهات معلّقة {depth['alert']}\n"
+                f"مستلمة: {stats['received']} — متطابقة: {stats['matched']}"
+                f" — مكررة: {stats['duplicates']}"
+                f" — مُرسلة: {dispatcher.stats['sent']} — مُسقطة: {stats['dropped']}"
+                f" — FloodWait: {dispatcher.stats['flood_waits']}"
+                f" — فشلت نهائياً: {dispatcher.stats['dead']}\n"
+                f"{files}"
+                f"{regex_status()}\n"
                 f"✨ المطور: المهندس / طه أيمن"
             )
             await event.reply(status_text)
@@ -613,132 +914,173 @@ async def main():
             
             # حفظ ID القناة
             chat_id = str(event.chat_id)
-            set_config("log_channel", chat_id)
+            await store.set_config("log_channel", chat_id)
             await event.reply(f"✅ تم تعيين هذه القناة ({chat_id}) لاستلام التنبيهات!")
             log.info(f"📢 تم تحويل التنبيهات إلى القناة: {chat_id}")
 
         # ── /unsetlog (الرجوع للخاص) ──
         elif lower_text == "/unsetlog":
-            set_config("log_channel", "")
+            await store.set_config("log_channel", "")
             await event.reply("✅ رجعت التنبيهات على **Saved Messages**.")
             log.info("📁 عادت التنبيهات إلى Saved Messages.")
 
-    # ───────── مراقبة الرسائل ─────────
-
-    @client.on(events.NewMessage(
-        incoming=True,
-        func=lambda e: e.is_group or e.is_channel,
-    ))
-    async def message_watcher(event):
-        # تسجيل كل رسالة واردة (debug)
-        try:
-            chat_info = await event.get_chat()
-            chat_name = getattr(chat_info, "title", "Unknown")
-            log.debug(f"📨 رسالة واردة من: {chat_name}")
-        except:
-            pass
+        # ── /digest (وضع الملخص) ──
+        elif lower_text.startswith("/digest"):
+            args = lower_text.split()[1:]
+            if args and args[0] == "off":
+                await store.set_config("digest_window", "0")
+                await event.reply("🔔 تم إيقاف وضع الملخص — كل تنبيه هيتبعت لوحده.")
+                log.info("🔔 وضع الملخص مقفول.")
+            elif args and args[0] == "on":
+                try:
+                    window = int(args[1]) if len(args) > 1 else DIGEST_WINDOW
+                    count = int(args[2]) if len(args) > 2 else DIGEST_MAX
+                except ValueError:
+                    await event.reply("⚠️  الاستخدام: `/digest on [ثواني] [عدد]` أو `/digest off`")
+                    return
+                await store.set_config("digest_window", str(max(window, 1)))
+                await store.set_config("digest_max", str(max(count, 1)))
+                await event.reply(
+                    f"📬 تم تفعيل وضع الملخص: رسالة واحدة كل {window} ثانية أو كل {count} تنبيه."
+                )
+                log.info(f"📬 وضع الملخص مفعّل ({window}s / {count}).")
+            else:
+                window, count = dispatcher.digest_settings()
+                state_text = f"🟢 كل {int(window)} ثانية أو {count} تنبيه" if window > 0 else "🔴 مقفول"
+                await event.reply(
+                    f"📬 **وضع الملخص:** {state_text}\n\n"
+                    "`/digest on [ثواني] [عدد]` — تفعيل\n"
+                    "`/digest off` — إيقاف"
+                )
 
-        if not monitoring["active"]:
-            log.debug("⏸ المراقبة متوقفة — تم تجاهل الرسالة")
-            return
+        # ── /fuzzy (المطابقة التقريبية) ──
+        elif lower_text.startswith("/fuzzy"):
+            args = lower_text.split()[1:]
+            if args and args[0] == "off":
+                await store.set_config("fuzzy", "0")
+                await event.reply("🎯 تم إيقاف المطابقة التقريبية — المطابقة بالحرف.")
+                log.info("🎯 المطابقة التقريبية مقفولة.")
+            elif args and args[0] == "on":
+                distance = args[1] if len(args) > 1 else "1"
+                if distance not in ("1", "2"):
+                    await event.reply("⚠️  الاستخدام: `/fuzzy on [1|2]` أو `/fuzzy off`")
+                    return
+                await store.set_config("fuzzy", distance)
+                await event.reply(
+                    f"🪄 تم تفعيل المطابقة التقريبية: حتى {distance} خطأ لكل كلمة"
+                    " (الكلمات الأقل من 4 حروف لازم تكون مطابقة)."
+                )
+                log.info(f"🪄 المطابقة التقريبية مفعّلة ({distance}).")
+            else:
+                distance = fuzzy_distance()
+                state_text = f"🟢 حتى {distance} خطأ لكل كلمة" if distance else "🔴 مقفولة"
+                await event.reply(
+                    f"🪄 **المطابقة التقريبية:** {state_text}\n\n"
+                    "`/fuzzy on [1|2]` — تفعيل\n"
+                    "`/fuzzy off` — إيقاف"
+                )
 
-        # استخراج النص
-        text = event.raw_text or ""
-        # دعم caption للميديا
-        if not text and event.message and event.message.message:
-            text = event.message.message
-        if not text:
-            log.debug("⏭ رسالة بدون نص — تم التجاهل")
-            return
+    # ───────── مراقبة الرسائل ─────────
 
-        # فحص الكلمات
-        keywords = get_keywords()
-        if not keywords:
-            log.warning("⚠️ لا توجد كلمات مفتاحية — لن يتم الفحص")
-            return
+    def watched(e) -> bool:
+        # الجروبات المحظورة (أو اللي برا قائمة السماح) بتتشال هنا — set lookup قبل أي شغل
+        return (e.is_group or e.is_channel) and store.chat_allowed(e.chat_id)
 
-        log.debug(f"🔍 فحص الرسالة مقابل {len(keywords)} كلمة...")
-        matched = match_keywords(text, keywords)
-        if not matched:
-            log.debug("❌ لا يوجد تطابق")
-            return
+    async def message_watcher(event):
+        start = time.perf_counter()
+        # تسجيل كل رسالة واردة (debug فقط — من غير أي طلب شبكة لو الـ debug مقفول)
+        if log.isEnabledFor(logging.DEBUG):
+            try:
+                chat_info = await entities.chat(event.message)
+                log.debug("📨 رسالة واردة من: %s", chat_info["title"])
+            except Exception:
+                pass
 
-        log.info(f"✅ تطابق! الكلمات: {', '.join(matched)}")
+        # آخر رسالة اتشافت في الجروب — الـ backfill بيبدأ منها بعد أي توقف
+        # (الحساب الأساسي بس: أرقام رسائل الجروبات العادية مختلفة من حساب للتاني)
+        if event.client is client:
+            backfill.seen(event.chat_id, event.message.id)
 
-        # جمع المعلومات
-        try:
-            chat = await event.get_chat()
-            sender = await event.get_sender()
-        except Exception as e:
-            log.error(f"خطأ في جلب معلومات الرسالة: {e}")
+        if not admit(event.message, event.is_channel):
             return
 
-        chat_title = getattr(chat, "title", "غير معروف")
-        sender_name = get_sender_name(sender)
-        sender_id = getattr(sender, "id", 0) if sender else 0
-        now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        msg_id = event.message.id
-
-        # بناء رابط الرسالة
-        msg_link = build_message_link(chat, msg_id)
-
-        # بناء التنبيه
-        alert_lines = [
-            "🔴 **تنبيه جديد _(Monitor Bot)_**",
-            "",
-            f"📨 **الرسالة:**",
-            f"> {text}",
-            "",
-            f"👤 **المرسل:** {sender_name}",
-            f"🏷 **المجموعة:** {chat_title}",
-            f"⏰ **الوقت:** {now}",
-            "",
-            f"🎯 `{'`, `'.join(matched)}`",
-            "",
-            "ــــــــــــــــــــــــــــــــــــــــــــــــ",
-            "🚀 **خيارات التواصل السريع:**",
-            f"1️⃣ [اضغط هنا للمراسلة (رابط 1)](tg://user?id={sender_id})",
-            f"2️⃣ [اضغط هنا للمراسلة (رابط 2)](tg://openmessage?user_id={sender_id})",
-        ]
-        
-        # إضافة رابط بروفايل لو فيه يوزرنيم
-        if sender and hasattr(sender, 'username') and sender.username:
-            alert_lines.append(f"3️⃣ [رابط المعرف (@{sender.username})](https://t.me/{sender.username})")
-        
-        if msg_link:
-             alert_lines.append(f"3️⃣ [ذهاب للرسالة في الجروب]({msg_link})")
+        # باقي الشغل (مطابقة/جلب معلومات/إرسال) في الـ pipeline
+        pipeline.submit(event.message)
+        metrics.observe("handler", time.perf_counter() - start)
 
-        alert_lines.append("")
-        alert_lines.append("👨‍💻 تم التطوير بواسطة: **المهندس / طه أيمن**")
+    # كل حساب ليه builder منفصل (Telethon بيعمل resolve للـ builder على client واحد)
+    for account in clients:
+        account.add_event_handler(message_watcher, events.NewMessage(incoming=True, func=watched))
 
-        alert_text = "\n".join(alert_lines)
+    # ───────── تشغيل ─────────
 
-        # إرسال للـ Saved Messages أو القناة المحددة
-        target_chat = get_config("log_channel") or "me"
+    async def start_accounts():
+        # حسابات المراقبة الإضافية — نفس الكلمات والمطابق والـ dispatcher
+        for session, account in zip(SESSIONS[1:], clients[1:]):
+            await account.start()
+            other = await account.get_me()
+            if other.id in account_ids:
+                log.warning(f"⚠️  الجلسة {session} لنفس حساب تاني — تم تجاهلها.")
+                clients.remove(account)
+                await account.disconnect()
+                continue
+            account_ids.add(other.id)
+            log.info(f"👥  حساب مراقبة إضافي: {other.first_name} (ID: {other.id})")
+
+    async def announce():
+        # ═══════════ رسالة ترحيبية ═══════════ (في الخلفية — الرسائل بتتعالج من غير ما تستناها)
+        me = await client.get_me()
+        welcome_banner = (
+            "\n" + "═" * 60 + "\n"
+            "🤖  **Telegram Userbot — Monitor Bot**\n\n"
+            "✨  تم التطوير بواسطة: **المهندس / طه أيمن**\n"
+            "📱  Developer: Eng. Taha Ayman\n\n"
+            f"👤  المستخدم: {me.first_name}\n"
+            f"🆔  ID: {me.id}\n"
+            f"👥  الحسابات: {len(clients)}\n"
+            f"🔑  الكلمات المفتاحية: {len(store.keywords)}\n"
+            "\n" + "═" * 60 + "\n"
+        )
+        print(welcome_banner)
+        log.info(f"✅  تم تسجيل الدخول: {me.first_name} (ID: {me.id})")
+        log.info("🚀  تم التطوير بواسطة المهندس / طه أيمن")
+
+        # إرسال رسالة ترحيب للـ Saved Messages
         try:
-            # إذا كان الهدف هو قناة، تأكد من أنها رقم (int)
-            if target_chat != "me":
-                try:
-                    target_chat = int(target_chat)
-                except:
-                    pass
-            
-            await client.send_message(target_chat, alert_text, parse_mode="md")
-            log.info(
-                f"🔔  تنبيه — [{chat_title}] من {sender_name} "
-                f"(الكلمات: {', '.join(matched)})"
+            await client.send_message(
+                "me",
+                f"🤖 **البوت شغال الآن!**\n\n"
+                f"✨ تم التطوير بواسطة: **المهندس / طه أيمن**\n"
+                f"🔑 الكلمات المفتاحية: {len(store.keywords)}\n\n"
+                f"اكتب `/help` للمساعدة"
             )
-        except errors.FloodWaitError as e:
-            log.warning(f"⏳  FloodWait: انتظار {e.seconds} ثانية...")
-            await asyncio.sleep(e.seconds)
-            await client.send_message("me", alert_text)
-        except Exception as e:
-            log.error(f"❌  خطأ في إرسال التنبيه: {e}")
-
-        # (تم تعطيل النسخ التلقائي بناءً على طلب المستخدم)
-        # copy_to_clipboard(alert_text)
-
-    # ───────── تشغيل ─────────
+        except Exception:
+            pass
+        mark("welcome")
+
+    async def warm_up():
+        # worker الـ regex (من غير مكتبة regex) بيتشغل على thread — أول رسالة ما تستناهوش
+        regex_guard.start()
+        # بناء المطابق في الخلفية — بدل ما أول رسالة تستنى بناءه
+        state["building"] = asyncio.create_task(build_matcher(), name="matcher-build")
+        await state["building"]
+        # الكلمات والمطابق والكاش عايشين طول البرنامج — بره فحص الـ GC الدوري
+        gc.freeze()
+        mark("matcher")
+
+    # الطوابير جاهزة قبل الاتصال — الـ dispatcher بس بيستنى الاتصال عشان يبعت
+    pipeline.start()
+    if alert_history is not None:
+        alert_history.start()
+    backfill.start()
+    mark("handlers")
+
+    # الاتصال بعد تسجيل الـ handlers — أي تحديث (حتى اللي جاي من catch_up) بيتعالج من أول لحظة
+    await client.start()
+    # من الكاش — start() جاب بيانات الحساب بالفعل
+    account_ids.add((await client.get_me(input_peer=True)).user_id)
+    dispatcher.start()
+    mark("connect")
 
     log.info("🚀  البوت يعمل الآن... اكتب /help في Saved Messages.")
     print("=" * 50)
@@ -746,14 +1088,56 @@ async def main():
     print("📱  اكتب /help في Saved Messages للمساعدة")
     print("=" * 50)
 
-    await client.run_until_disconnected()
+    for job in (announce(), warm_up()):
+        background.add(asyncio.create_task(job))
+    await start_accounts()
+    mark("accounts")
+
+    exporter = None
+    if METRICS_FILE:
+        exporter = asyncio.create_task(metrics.export_loop(METRICS_FILE, METRICS_INTERVAL), name="metrics")
+    if BACKFILL_ON_START:
+        backfill.run()
+    if SCORING and HISTORY:
+        background.add(asyncio.create_task(train_scorer(), name="scoring-train"))
+    log.info("⏱  التشغيل: " + " — ".join(f"{phase} {ms:.0f}" for phase, ms in STARTUP.items()) + " ms")
+    try:
+        # إعادة الاتصال جوه البرنامج — من غير ما نبدأ من الأول
+        await supervisor.run()
+    finally:
+        await backfill.stop()
+        await pipeline.stop()
+        if alert_history is not None:
+            await alert_history.stop()
+        await dispatcher.stop()
+        if documents is not None:
+            documents.close()
+        regex_guard.close()
+        if exporter is not None:
+            exporter.cancel()
+            metrics.write_prometheus(METRICS_FILE)
+        # disconnect بيحفظ حالة التحديثات في ملف الجلسة
+        for account in clients:
+            await account.disconnect()
+        await store.close()
 
 
 if __name__ == "__main__":
+    # run_termux.sh بيشغلنا في الخلفية (&) — bash بيخلي SIGINT متجاهَل للـ jobs دي،
+    # فـ Ctrl+C و kill -INT ما كانوش بيوصلوا. نرجع الـ handler الافتراضي (KeyboardInterrupt)
+    signal.signal(signal.SIGINT, signal.default_int_handler)
     try:
         asyncio.run(main())
     except KeyboardInterrupt:
         log.info("👋  تم إيقاف البوت.")
+    except asyncio.CancelledError:
+        if not TERMINATED["signal"]:
+            raise
+        log.info("👋  تم إيقاف البوت (SIGTERM).")
+        sys.exit(EXIT_TERMINATED)
+    except SessionRevoked:
+        log.error("❌  الجلسة اتلغت — امسح ملف الجلسة وسجل دخول من جديد.")
+        sys.exit(EXIT_SESSION_REVOKED)
     except Exception as e:
         log.error(f"💥  خطأ غير متوقع: {e}", exc_info=True)
         sys.exit(1)
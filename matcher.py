@@ -0,0 +1,294 @@
+"""
+Keyword Matcher
+===============
+محرك مطابقة مُجمَّع: يُبنى مرة واحدة من قائمة الكلمات ويُعاد بناؤه فقط لما القائمة تتغير.
+
+- العبارات العادية كلها في automaton واحد (Aho-Corasick) — مرور واحد على النص.
+- الـ regex كلها في alternation واحد يستخدم كفلتر سريع قبل فحص كل نمط على حدة،
+  وكل نمط ليه مهلة (RegexGuard) — اللي يتأخر كذا مرة بيتشال من المطابق.
+- وضع "كل الكلمات بأي ترتيب" (mode=words): فهرس معكوس token → كلمات مفتاحية.
+  الرسالة بتتقسم مرة واحدة، وبنفحص بس الكلمات اللي الـ token النادر بتاعها موجود.
+- وضع fuzzy اختياري: كلمات الرسالة بتتوسع بكلمات المفردات القريبة منها (fuzzy.py).
+  العبارات العادية بتدخل نفس الفهرس المعكوس كفلتر، وبعدين بتتأكد إن كلماتها
+  متتالية وبنفس الترتيب — الأخطاء الإملائية ما بتغيرش معنى "عبارة".
+"""
+
+import re
+import logging
+from collections import deque
+
+from fuzzy import FuzzyIndex
+from normalize import normalize_arabic, normalize_keyword
+from regex_guard import RegexGuard, compile_pattern
+from storage import MODE_WORDS
+
+log = logging.getLogger("userbot")
+
+# ──────────────────────────── AHO-CORASICK ──────────────────────
+
+class AhoCorasick:
+    """automaton لمطابقة عدة عبارات في مرور واحد على النص."""
+
+    def __init__(self, patterns: list[tuple[str, int]]):
+        # goto[state] = {char: next_state} — out[state] = أرقام الكلمات المنتهية هنا
+        self.goto: list[dict] = [{}]
+        self.fail: list[int] = [0]
+        self.out: list[tuple] = [()]
+
+        for pattern, payload in patterns:
+            state = 0
+            for ch in pattern:
+                nxt = self.goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(self.goto)
+                    self.goto[state][ch] = nxt
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.out.append(())
+                state = nxt
+            self.out[state] += (payload,)
+
+        # بناء روابط الفشل بالعرض (BFS)
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self.goto[state].items():
+                queue.append(nxt)
+                f = self.fail[state]
+                while f and ch not in self.goto[f]:
+                    f = self.fail[f]
+                self.fail[nxt] = self.goto[f].get(ch, 0)
+                self.out[nxt] += self.out[self.fail[nxt]]
+
+    def search(self, text: str) -> set[int]:
+        """إرجاع أرقام كل العبارات الموجودة في النص."""
+        goto, fail, out = self.goto, self.fail, self.out
+        found = set()
+        state = 0
+        for ch in text:
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if out[state]:
+                found.update(out[state])
+        return found
+
+# ──────────────────────────── TOKENS ────────────────────────────
+
+# سوابق عربية شائعة (الأطول الأول): "والشقة" / "بالشقه" / "وللبيع" تطابق "شقه" و"بيع"
+PREFIXES = ("وال", "بال", "فال", "كال", "لل", "ال", "و", "ب", "ل", "ف", "ك")
+# في الكلمة المفتاحية نشيل "ال" وأخواتها بس — حرف واحد ممكن يكون من أصل الكلمة (ولد، بنت)
+ARTICLES = ("وال", "بال", "فال", "كال", "لل", "ال")
+MIN_STEM = 2
+
+
+def keyword_tokens(normalized: str) -> list[str]:
+    """tokens كلمة مفتاحية مطبّعة من غير أداة التعريف."""
+    tokens = []
+    for token in normalized.split():
+        for prefix in ARTICLES:
+            if token.startswith(prefix) and len(token) - len(prefix) >= MIN_STEM:
+                token = token[len(prefix):]
+                break
+        tokens.append(token)
+    return tokens
+
+
+def tokenize(normalized: str) -> set[str]:
+    """tokens نص مطبّع + كل صيغها من غير السوابق الشائعة."""
+    tokens = set(normalized.split())
+    pending = list(tokens)
+    while pending:
+        token = pending.pop()
+        for prefix in PREFIXES:
+            if token.startswith(prefix) and len(token) - len(prefix) >= MIN_STEM:
+                stem = token[len(prefix):]
+                if stem not in tokens:
+                    tokens.add(stem)
+                    pending.append(stem)
+    return tokens
+
+
+class TokenIndex:
+    """فهرس معكوس للكلمات المفتاحية من نوع words.
+
+    كل كلمة بتتسجل تحت token واحد بس (الأندر بين كل الكلمات) — فالرسالة بتفحص
+    عدد قليل من المرشحين مهما كان عدد الكلمات، وكل مرشح بيتأكد بـ subset check.
+    """
+
+    def __init__(self, entries: list[tuple[int, list[str]]]):
+        freq: dict[str, int] = {}
+        for _, tokens in entries:
+            for token in set(tokens):
+                freq[token] = freq.get(token, 0) + 1
+
+        self.index: dict[str, list[tuple[int, frozenset]]] = {}
+        for i, tokens in entries:
+            anchor = min(tokens, key=lambda t: (freq[t], -len(t)))
+            self.index.setdefault(anchor, []).append((i, frozenset(tokens)))
+
+    def search(self, tokens: set[str]) -> set[int]:
+        """أرقام الكلمات اللي كل الـ tokens بتاعتها موجودة في الرسالة."""
+        found = set()
+        index = self.index
+        for token in tokens:
+            candidates = index.get(token)
+            if candidates:
+                for i, needed in candidates:
+                    if needed <= tokens:
+                        found.add(i)
+        return found
+
+# ──────────────────────────── MATCHER ───────────────────────────
+
+# backreference رقمي أو بالاسم — يتكسر لو النمط اتحط جوه alternation
+_BACKREF = re.compile(r"\\[1-9]|\(\?P=")
+
+
+class KeywordMatcher:
+    """مطابق مُجمَّع لقائمة كلمات ثابتة. يُبنى من نفس القائمة اللي بترجعها get_keywords()."""
+
+    def __init__(self, keywords: list[dict], fuzzy: int = 0, guard: RegexGuard = None):
+        self.keywords = [kw["keyword"] for kw in keywords]
+        self.guard = guard if guard is not None else RegexGuard()
+        # كلمات مربوطة بجروبات معينة: رقم الكلمة → مجموعة chat_id
+        self.scopes: dict[int, frozenset] = {
+            i: kw["chats"] for i, kw in enumerate(keywords) if kw.get("chats")
+        }
+        self.always: list[int] = []           # عبارات فاضية بعد التطبيع — تطابق أي نص
+        # (رقم الكلمة, النمط المطبّع, النمط المترجم)
+        self.regexes: list[tuple[int, str, object]] = []
+        # عبارات عادية في وضع fuzzy: رقم الكلمة → tokens بالترتيب
+        self.phrases: dict[int, tuple] = {}
+        literals: list[tuple[str, int]] = []
+        words: list[tuple[int, list[str]]] = []
+
+        for i, kw in enumerate(keywords):
+            # KeywordStore بيطبّع الكلمات مرة وقت التحميل — غير كده نطبّعها هنا
+            normalized_kw = kw.get("normalized") or normalize_keyword(kw)
+            if kw["is_regex"]:
+                if not self.guard.allowed(kw["keyword"], normalized_kw):
+                    continue
+                try:
+                    pattern = compile_pattern(normalized_kw)
+                except re.error:
+                    log.warning(f"⚠️  تعبير regex غير صالح: {kw['keyword']}")
+                    continue
+                self.regexes.append((i, normalized_kw, pattern))
+            elif normalized_kw:
+                # العبارة كما هي بتطابق في الحالتين — words بيضيف "بأي ترتيب"
+                literals.append((normalized_kw, i))
+                if kw.get("mode") == MODE_WORDS:
+                    words.append((i, keyword_tokens(normalized_kw)))
+                elif fuzzy:
+                    # الفهرس فلتر بس — الترتيب بيتأكد في _in_order
+                    tokens = keyword_tokens(normalized_kw)
+                    words.append((i, tokens))
+                    self.phrases[i] = tuple(tokens)
+            else:
+                self.always.append(i)
+
+        self.automaton = AhoCorasick(literals) if literals else None
+        self.token_index = TokenIndex(words) if words else None
+        self.fuzzy = None
+        if fuzzy and words:
+            self.fuzzy = FuzzyIndex((t for _, tokens in words for t in tokens), fuzzy)
+
+        self.prefilter = None
+        self._build_prefilter()
+
+    def _build_prefilter(self):
+        """فلتر regex موحد: لو مفيش تطابق للـ alternation مفيش داعي نفحص الأنماط واحد واحد."""
+        self.prefilter = None
+        parts = [normalized for _, normalized, _ in self.regexes]
+        if len(parts) < 2 or any(_BACKREF.search(p) for p in parts):
+            return
+        try:
+            self.prefilter = compile_pattern("|".join(f"(?:{p})" for p in parts))
+        except re.error:
+            # مثلاً inline flags في نص النمط — نرجع للفحص الفردي
+            self.prefilter = None
+
+    def _search_regexes(self, text: str, hits: set):
+        guard = self.guard
+        if self.prefilter is not None:
+            found, elapsed = guard.timed(self.prefilter, text)
+            if elapsed > guard.budget:
+                # الفلتر الموحد نفسه بطيء — نفحص فردي عشان نعرف مين السبب
+                log.warning(f"🐢  فلتر regex الموحد بطيء ({elapsed * 1000:.0f}ms) — اتلغى")
+                self.prefilter = None
+            elif not found:
+                return
+
+        disabled = []
+        for entry in self.regexes:
+            i, _, pattern = entry
+            found, slow = guard.search(self.keywords[i], pattern, text)
+            if found:
+                hits.add(i)
+            if slow:
+                disabled.append(entry)
+        if disabled:
+            self.regexes = [entry for entry in self.regexes if entry not in disabled]
+            self._build_prefilter()
+
+    def __len__(self) -> int:
+        return len(self.keywords)
+
+    def _positions(self, normalized_text: str) -> list[set]:
+        """لكل كلمة في الرسالة بالترتيب: صيغها (من غير السوابق) + الكلمات القريبة منها."""
+        expand = self.fuzzy.expand if self.fuzzy is not None else (lambda tokens: tokens)
+        return [expand(tokenize(word)) for word in normalized_text.split()]
+
+    @staticmethod
+    def _in_order(tokens: tuple, positions: list[set]) -> bool:
+        """tokens العبارة موجودة في كلمات متتالية وبنفس الترتيب؟"""
+        n = len(tokens)
+        return any(
+            all(tokens[j] in positions[start + j] for j in range(n))
+            for start in range(len(positions) - n + 1)
+        )
+
+    @property
+    def blocking(self) -> bool:
+        """match() ممكن تستنى (regex في process منفصل)؟ — يبقى تتنادى على thread."""
+        return bool(self.regexes) and self.guard.blocking
+
+    def match(self, text: str, chat_id: int = None) -> list[str]:
+        """فحص النص. ترجع الكلمات المتطابقة بنفس ترتيب القائمة الأصلية.
+
+        لو chat_id اتبعت، الكلمات المربوطة بجروبات تانية بتتشال من النتيجة.
+        """
+        normalized_text = normalize_arabic(text)
+        hits = set(self.always)
+
+        if self.automaton is not None:
+            hits.update(self.automaton.search(normalized_text))
+
+        if self.token_index is not None:
+            tokens = tokenize(normalized_text)
+            if self.fuzzy is not None:
+                tokens = self.fuzzy.expand(tokens)
+            found = self.token_index.search(tokens)
+            ordered = found & self.phrases.keys() if self.phrases else ()
+            if ordered:
+                positions = self._positions(normalized_text)
+                found -= {i for i in ordered if not self._in_order(self.phrases[i], positions)}
+            hits.update(found)
+
+        if self.regexes:
+            self._search_regexes(normalized_text, hits)
+
+        if self.scopes and chat_id is not None:
+            scopes = self.scopes
+            hits = {i for i in hits if i not in scopes or chat_id in scopes[i]}
+
+        return [self.keywords[i] for i in sorted(hits)]
+
+
+def match_keywords(text: str, keywords: list[dict], fuzzy: int = 0) -> list[str]:
+    """فحص النص مقابل الكلمات. ترجع قائمة بالكلمات المتطابقة.
+
+    للاستخدام المتكرر ابنِ KeywordMatcher مرة واحدة واستخدم .match().
+    """
+    return KeywordMatcher(keywords, fuzzy).match(text)
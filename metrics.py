@@ -0,0 +1,151 @@
+"""
+Metrics
+=======
+قياسات وقت التشغيل في الذاكرة — من غير أي مكتبة خارجية:
+
+- histograms للزمن ببuckets ثابتة (لوغاريتمية): observe() = bisect + زيادة عداد،
+  و p50/p95/p99 بتتحسب بس وقت العرض.
+- العدادات نفسها موجودة في stats بتاع كل مكون (pipeline / dispatcher / ...) —
+  بتتسجل هنا كـ collectors وبتتقري وقت العرض بس، فمفيش عد مرتين.
+- عدد مرات تطابق كل كلمة وكل جروب — يبين الكلمات اللي ما بتجيبش حاجة.
+- تصدير اختياري لملف Prometheus text (node_exporter textfile collector مثلاً).
+"""
+
+import os
+import time
+import asyncio
+import logging
+from bisect import bisect_left
+from collections import Counter
+
+log = logging.getLogger("userbot")
+
+# حدود الـ buckets: من 1µs لـ ~100s، كل bucket أكبر من اللي قبله بـ 2^(1/4) (~19%)
+BUCKETS = [1e-6 * 2 ** (i / 4) for i in range(4 * 27)]
+QUANTILES = (0.5, 0.95, 0.99)
+
+# ──────────────────────────── HISTOGRAM ─────────────────────────
+
+class Histogram:
+    """توزيع أزمنة ببuckets ثابتة — الذاكرة ثابتة مهما كان عدد القياسات."""
+
+    __slots__ = ("counts", "count", "total", "max")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds: float):
+        self.counts[bisect_left(BUCKETS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def quantile(self, q: float) -> float:
+        """تقدير (الحد الأعلى للـ bucket) — الخطأ أقل من عرض bucket واحد."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, c in enumerate(self.counts):
+            seen += c
+            if seen >= rank:
+                return min(BUCKETS[i], self.max) if i < len(BUCKETS) else self.max
+        return self.max
+
+# ──────────────────────────── REGISTRY ──────────────────────────
+
+class Metrics:
+    def __init__(self):
+        self.started = time.time()
+        self.histograms: dict[str, Histogram] = {}
+        self.collectors: dict[str, object] = {}      # اسم → دالة بترجع dict عدادات
+        self.keyword_hits: Counter = Counter()
+        self.chat_hits: Counter = Counter()
+
+    def observe(self, name: str, seconds: float):
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            histogram = self.histograms[name] = Histogram()
+        histogram.observe(seconds)
+
+    def register(self, name: str, collect):
+        """تسجيل مصدر عدادات: collect() ترجع dict اسم → رقم."""
+        self.collectors[name] = collect
+
+    def hit(self, keywords: list[str], chat_id: int):
+        self.keyword_hits.update(keywords)
+        self.chat_hits[chat_id] += 1
+
+    def counters(self) -> dict[str, dict]:
+        return {name: dict(collect()) for name, collect in self.collectors.items()}
+
+    def reset(self):
+        self.started = time.time()
+        self.histograms.clear()
+        self.keyword_hits.clear()
+        self.chat_hits.clear()
+
+    # ───────── عرض ─────────
+
+    def latency_lines(self) -> list[str]:
+        lines = []
+        for name, h in sorted(self.histograms.items()):
+            p50, p95, p99 = (h.quantile(q) * 1000 for q in QUANTILES)
+            lines.append(
+                f"`{name}`: {h.count} — p50 {p50:.2f} / p95 {p95:.2f} / p99 {p99:.2f}"
+                f" / max {h.max * 1000:.1f} ms"
+            )
+        return lines
+
+    def dead_keywords(self, keywords: list[str]) -> list[str]:
+        """كلمات ما اتطابقتش ولا مرة من وقت التشغيل (أو آخر reset)."""
+        return [kw for kw in keywords if not self.keyword_hits.get(kw)]
+
+    # ───────── Prometheus ─────────
+
+    def prometheus(self) -> str:
+        def label(value) -> str:
+            return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+        lines = [f"userbot_start_time_seconds {self.started:.0f}"]
+        for group, values in self.counters().items():
+            for key, value in values.items():
+                lines.append(f"userbot_{group}_{key} {value}")
+
+        lines.append("# TYPE userbot_latency_seconds summary")
+        for name, h in sorted(self.histograms.items()):
+            for q in QUANTILES:
+                lines.append(f'userbot_latency_seconds{{op="{name}",quantile="{q}"}} {h.quantile(q):.6f}')
+            lines.append(f'userbot_latency_seconds_count{{op="{name}"}} {h.count}')
+            lines.append(f'userbot_latency_seconds_sum{{op="{name}"}} {h.total:.6f}')
+
+        lines.append("# TYPE userbot_keyword_hits_total counter")
+        for kw, count in self.keyword_hits.items():
+            lines.append(f'userbot_keyword_hits_total{{keyword="{label(kw)}"}} {count}')
+        lines.append("# TYPE userbot_chat_hits_total counter")
+        for chat_id, count in self.chat_hits.items():
+            lines.append(f'userbot_chat_hits_total{{chat_id="{chat_id}"}} {count}')
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path: str):
+        # كتابة في ملف مؤقت ثم rename — اللي بيقرا الملف ما يشوفش نص ناقص
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(self.prometheus())
+        os.replace(tmp, path)
+
+    async def export_loop(self, path: str, interval: float = 60):
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await asyncio.get_running_loop().run_in_executor(None, self.write_prometheus, path)
+            except Exception as e:
+                log.warning(f"⚠️  فشل كتابة ملف المقاييس: {e}")
+
+
+# registry واحد للبرنامج كله — زي log
+metrics = Metrics()
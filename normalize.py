@@ -0,0 +1,98 @@
+"""
+Normalize
+=========
+تطبيع النص العربي قبل المطابقة — جداول استبدال مجهزة ومترجمة مرة واحدة وقت التحميل:
+
+- إزالة التشكيل والتطويل والحروف الخفية (RTL marks / ZWJ).
+- علامات الترقيم → مسافة، ثم توحيد المسافات.
+- توحيد الحروف (اختياري): أ/إ/آ/ٱ → ا ، ة → ه ، ى → ي.
+
+نفس التطبيع بيتعمل على الكلمات المفتاحية مرة واحدة وقت التحميل وعلى كل رسالة.
+
+ملاحظة أداء: str.translate بجدول dict لحروف عربية (خارج Latin-1) بياخد المسار البطيء
+في CPython (lookup في dict لكل حرف) — أبطأ ~2.5x من character class مترجمة في re +
+str.replace للحروف المفردة. القياس في bench/bench_normalize.py.
+"""
+
+import re
+
+# التشكيل (فتحة/ضمة/كسرة/تنوين/شدة/سكون...) + الألف الخنجرية + التطويل
+DIACRITICS = [chr(c) for c in range(0x064B, 0x0660)] + ["\u0670", "\u0640"]
+
+# حروف خفية بتيجي كتير في النصوص العربية المنسوخة
+INVISIBLE = ["\u200c", "\u200d", "\u200e", "\u200f", "\u061c", "\ufeff"]
+
+# علامات ترقيم الجُمل بس — رموز زي + و # ممكن تكون جزء من كلمة مفتاحية
+PUNCTUATION = list(".,!?؟،؛:;\"'«»()[]{}…")
+
+LETTERS = {
+    "أ": "ا", "إ": "ا", "آ": "ا", "ٱ": "ا",
+    "ة": "ه",
+    "ى": "ي",
+}
+
+# ──────────────────────────── TABLES ────────────────────────────
+
+def build_table(unify_letters: bool = True, strip_punctuation: bool = True) -> dict:
+    """جدول الاستبدال الكامل: حرف → بديله ("" = حذف)."""
+    table = {ch: "" for ch in DIACRITICS + INVISIBLE}
+    if strip_punctuation:
+        table.update({ch: " " for ch in PUNCTUATION})
+    if unify_letters:
+        table.update(LETTERS)
+    return table
+
+
+def compile_table(table: dict) -> tuple:
+    """ترجمة الجدول لـ (regex الحذف, regex الترقيم, استبدالات الحروف)."""
+    drop = "".join(ch for ch, rep in table.items() if rep == "")
+    space = "".join(ch for ch, rep in table.items() if rep == " ")
+    letters = tuple((ch, rep) for ch, rep in table.items() if rep not in ("", " "))
+    return (
+        # من غير "+" — أسرع في re لأن أغلب الحالات حرف واحد، والمسافات بتتوحد بعدين
+        re.compile(f"[{re.escape(drop)}]") if drop else None,
+        re.compile(f"[{re.escape(space)}]") if space else None,
+        letters,
+    )
+
+
+_text = compile_table(build_table())
+# أنماط regex: من غير لمس الترقيم أو المسافات عشان ما نكسرش الـ syntax
+_pattern = compile_table(build_table(strip_punctuation=False))
+
+
+def configure(unify_letters: bool = True):
+    """تغيير إعدادات التطبيع (قبل تحميل الكلمات)."""
+    global _text, _pattern
+    _text = compile_table(build_table(unify_letters=unify_letters))
+    _pattern = compile_table(build_table(unify_letters=unify_letters, strip_punctuation=False))
+
+
+def _apply(text: str, compiled: tuple) -> str:
+    drop, space, letters = compiled
+    if drop is not None:
+        text = drop.sub("", text)
+    if space is not None:
+        text = space.sub(" ", text)
+    # str.replace لحرف واحد = بحث C سريع، وبيرجع نفس النص لو الحرف مش موجود
+    for src, dst in letters:
+        text = text.replace(src, dst)
+    return text
+
+# ──────────────────────────── NORMALIZE ─────────────────────────
+
+def normalize_arabic(text: str) -> str:
+    """تطبيع نص للمطابقة: حروف صغيرة + جدول الاستبدال + توحيد المسافات."""
+    return " ".join(_apply(text.lower(), _text).split())
+
+
+def normalize_pattern(pattern: str) -> str:
+    """تطبيع نمط regex: التشكيل والحروف بس، الترقيم والمسافات زي ما هي."""
+    return _apply(pattern.lower(), _pattern)
+
+
+def normalize_keyword(kw: dict) -> str:
+    """الصيغة المطبّعة لكلمة مفتاحية (dict من KeywordStore)."""
+    if kw["is_regex"]:
+        return normalize_pattern(kw["keyword"])
+    return normalize_arabic(kw["keyword"])
@@ -0,0 +1,359 @@
+"""
+Pipeline
+========
+مسار معالجة الرسائل على مراحل بدل ما كل رسالة تعمل كل حاجة جوه الـ handler:
+
+    intake → match queue (محدودة) → N match workers → تقييم → dedupe → AlertDispatcher (طابور محفوظ) → إرسال
+                                                                         ↘ سجل التنبيهات (دفعات)
+
+الـ handler بيحط الرسالة في الطابور ويرجع فوراً. لو الطابور اتملى بنطبق سياسة
+إسقاط (shed) بدل ما نكدس coroutines بلا حدود. التنبيهات نفسها ما بتتشالش أبداً —
+بتتحفظ في طابور الـ dispatcher لحد ما تتبعت.
+
+كل worker بيسحب دفعة (لحد batch_size) لو في رسائل مستنية — التقييم (scoring.py)
+بيتعمل على تطابقات الدفعة مرة واحدة، والأعلى درجة بيتبعت الأول.
+
+مع DOCUMENTS=1 الرسائل اللي فيها ملف txt/pdf صغير بتتنقل لطابور ملفات منفصل
+(document workers) — الملف بيتحمل ويتقري (documents.py) وبعدين الرسالة بتتطابق
+بنصه مع الـ caption. باقي الدفعة بيتطابق فوراً من غير ما يستنى أي تحميل.
+"""
+
+import time
+import asyncio
+import logging
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+from alerts import build_message_link
+from metrics import metrics
+
+log = logging.getLogger("userbot")
+
+# سياسات الإسقاط لما الطابور يتملى
+DROP_OLDEST = "drop_oldest"   # نشيل أقدم رسالة ونحط الجديدة (الأحدث أهم)
+DROP_NEW = "drop_new"         # نرفض الرسالة الجديدة
+POLICIES = (DROP_OLDEST, DROP_NEW)
+# نص التنبيه لو الكلمة اتلقت في ملف من غير caption — أول الملف بس
+DOCUMENT_EXCERPT = 500
+
+# ──────────────────────────── PIPELINE ──────────────────────────
+
+class Pipeline:
+    """طابور محدود + workers للمطابقة، والتنبيهات بتروح للـ AlertDispatcher."""
+
+    def __init__(
+        self,
+        dispatcher,
+        get_matcher,
+        entities,
+        deduper=None,
+        history=None,
+        match_queue_size: int = 1000,
+        workers: int = 2,
+        policy: str = DROP_OLDEST,
+        get_scorer=None,
+        batch_size: int = 32,
+        documents=None,
+        document_workers: int = 2,
+    ):
+        if policy not in POLICIES:
+            raise ValueError(f"سياسة طابور غير معروفة: {policy}")
+        self.dispatcher = dispatcher
+        self.get_matcher = get_matcher
+        self.entities = entities
+        self.deduper = deduper
+        self.history = history
+        self.get_scorer = get_scorer
+        self.batch_size = batch_size
+        self.documents = documents
+        self.document_workers = document_workers if documents is not None else 0
+        self.workers = workers
+        self.policy = policy
+        self.match_queue: asyncio.Queue = asyncio.Queue(match_queue_size)
+        self.document_queue: asyncio.Queue = asyncio.Queue(match_queue_size)
+        self.tasks: list[asyncio.Task] = []
+        # مطابقة فيها انتظار (regex في process منفصل) — thread واحد عشان المطابق مش thread-safe
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="match")
+        self.stats = {
+            "received": 0,          # رسائل دخلت الطابور
+            "dropped": 0,           # رسائل اتشالت بسبب امتلاء طابور المطابقة
+            "documents_skipped": 0, # ملفات ما استنيناش تحميلها (طابور الملفات مليان) — الـ caption بس
+            "matched": 0,
+            "duplicates": 0,        # تطابقات اتكتمت لأنها نسخة من رسالة اتبلغ عنها
+            "below_threshold": 0,   # تطابقات درجتها أقل من الحد
+            "leads": 0,             # تنبيهات عالية القيمة (اتبعتت قبل الباقي)
+            "errors": 0,
+            "match_depth_max": 0,
+        }
+
+    # ───────── تشغيل / إيقاف ─────────
+
+    def start(self):
+        for i in range(self.workers):
+            self.tasks.append(asyncio.create_task(self._match_worker(), name=f"match-{i}"))
+        for i in range(self.document_workers):
+            self.tasks.append(asyncio.create_task(self._document_worker(), name=f"document-{i}"))
+        log.info(
+            f"🧵  Pipeline: {self.workers} worker — طابور المطابقة {self.match_queue.maxsize}"
+            f" ({self.policy})"
+        )
+
+    async def stop(self):
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.tasks.clear()
+        self.executor.shutdown(wait=False)
+
+    # ───────── intake ─────────
+
+    def submit(self, message) -> bool:
+        """إدخال رسالة للطابور (بدون await). ترجع False لو اتشالت."""
+        queue = self.match_queue
+        item = (time.perf_counter(), message)
+        try:
+            queue.put_nowait(item)
+        except asyncio.QueueFull:
+            self.stats["dropped"] += 1
+            if self.policy == DROP_NEW:
+                return False
+            # DROP_OLDEST: نشيل الأقدم ونحط الجديد مكانه
+            queue.get_nowait()
+            queue.task_done()
+            queue.put_nowait(item)
+        self.stats["received"] += 1
+        depth = queue.qsize()
+        if depth > self.stats["match_depth_max"]:
+            self.stats["match_depth_max"] = depth
+        return True
+
+    async def put(self, message):
+        """إدخال رسالة مع انتظار لو الطابور مليان (للـ backfill — مفيش إسقاط)."""
+        await self.match_queue.put((time.perf_counter(), message))
+        self.stats["received"] += 1
+
+    def depth(self) -> dict:
+        return {
+            "match": self.match_queue.qsize(),
+            "document": self.document_queue.qsize(),
+            "alert": len(self.dispatcher),
+        }
+
+    # ───────── match workers ─────────
+
+    async def _match_worker(self):
+        queue = self.match_queue
+        while True:
+            batch = [await queue.get()]
+            # في رسائل مستنية؟ نسحب دفعة — التقييم بيتعمل عليها مرة واحدة
+            while len(batch) < self.batch_size and not queue.empty():
+                batch.append(queue.get_nowait())
+            taken = len(batch)
+            try:
+                if self.documents is not None:
+                    batch = self._defer_documents(batch)
+                await self._process_batch(batch)
+            finally:
+                for _ in range(taken):
+                    queue.task_done()
+
+    def _defer_documents(self, batch: list[tuple]) -> list[tuple]:
+        """الرسائل اللي فيها ملف بتروح لطابور الملفات — ترجع الباقي يتطابق فوراً."""
+        now = []
+        for item in batch:
+            if self.documents.wanted(item[1]):
+                try:
+                    self.document_queue.put_nowait(item)
+                    continue
+                except asyncio.QueueFull:
+                    # تحميلات كتير مستنية — نفحص الـ caption بس بدل ما نأخر الرسالة
+                    self.stats["documents_skipped"] += 1
+            now.append(item)
+        return now
+
+    async def _document_worker(self):
+        """تحميل وقراءة الملف بره مسار المطابقة، وبعدين مطابقة الرسالة بنصه."""
+        queue = self.document_queue
+        while True:
+            _, message = await queue.get()
+            try:
+                start = time.perf_counter()
+                try:
+                    text = await self.documents.text(message)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    log.debug("تعذر قراءة الملف: %s", e)
+                    text = ""
+                metrics.observe("document", time.perf_counter() - start)
+                # queue_wait من هنا — زمن التحميل متسجل في "document"
+                await self._process_batch([(time.perf_counter(), message)], {id(message): text} if text else None)
+            finally:
+                queue.task_done()
+
+    async def _process_batch(self, batch: list[tuple], documents: dict = None):
+        """مطابقة + تقييم + تسليم. documents = id(الرسالة) → نص الملف المرفق."""
+        perf = time.perf_counter
+        documents = documents or {}
+        matcher = self.get_matcher()
+        if matcher and matcher.blocking:
+            # أنماط regex من غير مكتبة regex: البحث بيستنى process تاني — بره الـ loop
+            loop = asyncio.get_running_loop()
+            found = await loop.run_in_executor(self.executor, self._match_batch, batch, documents, matcher)
+        else:
+            found = self._match_batch(batch, documents, matcher)
+
+        if found and self.get_scorer is not None:
+            found = self._score(found)
+
+        for message, alert, elapsed in found:
+            start = perf()
+            try:
+                await self._deliver(message, alert)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.stats["errors"] += 1
+                log.error(f"❌  خطأ في معالجة الرسالة: {e}", exc_info=True)
+            finally:
+                metrics.observe("process", elapsed + perf() - start)
+
+    def _match_batch(self, batch: list[tuple], documents: dict, matcher) -> list[tuple]:
+        """مطابقة الدفعة. ترجع [(message, alert, زمن المطابقة)] للي اتطابق بس."""
+        perf = time.perf_counter
+        found = []
+        for queued_at, message in batch:
+            start = perf()
+            metrics.observe("queue_wait", start - queued_at)
+            try:
+                alert = self._match(message, matcher, documents.get(id(message)))
+            except Exception as e:
+                self.stats["errors"] += 1
+                log.error(f"❌  خطأ في معالجة الرسالة: {e}", exc_info=True)
+                alert = None
+            elapsed = perf() - start
+            if alert is None:
+                metrics.observe("process", elapsed)
+            else:
+                found.append((message, alert, elapsed))
+        return found
+
+    def _match(self, message, matcher, document: str = None) -> dict:
+        """مطابقة رسالة واحدة. ترجع التنبيه (من غير بيانات الجروب/المرسل) أو None.
+
+        document = نص الملف المرفق لو اتقرا (بيتفحص مع الـ caption).
+        """
+        # استخراج النص
+        text = message.raw_text or ""
+        # دعم caption للميديا
+        if not text and message.message:
+            text = message.message
+        if not text and not document:
+            log.debug("⏭ رسالة بدون نص — تم التجاهل")
+            return None
+
+        # فحص الكلمات
+        if not matcher:
+            log.warning("⚠️ لا توجد كلمات مفتاحية — لن يتم الفحص")
+            return None
+
+        log.debug("🔍 فحص الرسالة مقابل %d كلمة...", len(matcher))
+        start = time.perf_counter()
+        matched = matcher.match(f"{text}\n{document}" if document else text, message.chat_id)
+        metrics.observe("match", time.perf_counter() - start)
+        if not matched:
+            log.debug("❌ لا يوجد تطابق")
+            return None
+
+        self.stats["matched"] += 1
+        metrics.hit(matched, message.chat_id)
+        log.info("✅ تطابق! الكلمات: %s", ", ".join(matched))
+
+        alert = {
+            "text": text or document[:DOCUMENT_EXCERPT],
+            "matched": matched,
+            "chat_id": message.chat_id,
+            "sender_id": message.sender_id or 0,
+            "msg_id": message.id,
+        }
+        if document:
+            alert["document"] = message.file.name or "ملف"
+        return alert
+
+    def _score(self, found: list[tuple]) -> list[tuple]:
+        """درجة وفئة لتطابقات الدفعة كلها مرة واحدة — بيشيل اللي تحت الحد ويرتب الباقي."""
+        scorer = self.get_scorer()
+        start = time.perf_counter()
+        results = scorer.score_batch(
+            [alert["text"] for _, alert, _ in found],
+            [alert["matched"] for _, alert, _ in found],
+        )
+        metrics.observe("score", (time.perf_counter() - start) / len(found))
+
+        kept = []
+        for item, (score, category) in zip(found, results):
+            alert = item[1]
+            if score < scorer.threshold:
+                self.stats["below_threshold"] += 1
+                log.debug("📉 درجة %.1f أقل من الحد — تم التجاهل", score)
+                continue
+            alert["score"] = round(score, 2)
+            alert["category"] = category
+            if score >= scorer.high:
+                alert["lead"] = True
+                self.stats["leads"] += 1
+            kept.append(item)
+        kept.sort(key=lambda item: item[1]["score"], reverse=True)
+        return kept
+
+    async def _deliver(self, message, alert: dict):
+        text = alert["text"]
+        # كتم النسخ المكررة قبل أي طلب شبكة — والعدد يتضاف للتنبيه الأول
+        if self.deduper is not None:
+            first = self.deduper.check(text, alert["sender_id"], alert)
+            if first is not None:
+                self.stats["duplicates"] += 1
+                first["duplicates"] = first.get("duplicates", 0) + 1
+                cached = self.entities.peek(("chat", message.chat_id))
+                title = cached["title"] if cached else None
+                chats = first.setdefault("duplicate_chats", [])
+                if title and title not in chats and len(chats) < 5:
+                    chats.append(title)
+                log.debug("🔁 رسالة مكررة — اتضافت للتنبيه الأول (%d)", first["duplicates"])
+                return
+
+        # البصمة اتسجلت في check() عشان النسخ اللي توصل دلوقتي تتضاف للتنبيه ده —
+        # لو ما وصلش للـ dispatcher لازم تتشال، وإلا النسخ الجاية تتكتم على تنبيه ما اتبعتش
+        sender_id = alert["sender_id"]
+        enqueued = False
+        try:
+            enqueued = await self._enqueue(message, alert)
+        finally:
+            if not enqueued and self.deduper is not None:
+                self.deduper.release(text, sender_id, alert)
+
+    async def _enqueue(self, message, alert: dict) -> bool:
+        """بيانات الجروب/المرسل + الطابور. ترجع False لو الكيانات ما اتجابتش."""
+        # جمع المعلومات (من كاش الكيانات — الشبكة بس لو مش موجود)
+        start = time.perf_counter()
+        try:
+            chat = await self.entities.chat(message)
+            sender = await self.entities.sender(message)
+            metrics.observe("entities", time.perf_counter() - start)
+        except Exception as e:
+            log.error(f"خطأ في جلب معلومات الرسالة: {e}")
+            return False
+
+        alert.update({
+            "chat_title": chat["title"],
+            "sender_id": sender["id"],
+            "sender_name": sender["name"],
+            "sender_username": sender["username"],
+            "link": build_message_link(chat, message.id),
+            "time": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        })
+        # السجل بيتكتب على دفعات في الخلفية — مفيش انتظار هنا
+        if self.history is not None:
+            self.history.record(alert)
+        await self.dispatcher.enqueue(alert)
+        return True
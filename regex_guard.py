@@ -0,0 +1,374 @@
+"""
+Regex Guard
+===========
+حماية من كلمات regex التقيلة — نمط واحد زي (a+)+$ ممكن يوقف الـ event loop كله.
+
+- كاش للأنماط المترجمة (بالنص المطبّع) — إعادة بناء المطابق ما بتترجمش تاني.
+- فحص وقت الإضافة على شجرة النمط نفسها (sre_parse): quantifier جوه quantifier
+  حتى لو بين مجموعات متداخلة ((a+))+ ، أو بدائل بتبدأ بنفس الحرف جوه مجموعة
+  متكررة (a|aa)+ — الأنماط دي بتترفض.
+- مهلة لكل نمط: لو مكتبة regex متسطبة بنستخدم timeout= بتاعها (بيوقف البحث فعلاً)،
+  وإلا البحث بيتعمل في process منفصل (RegexSandbox) بيتقتل لو عدى المهلة —
+  re العادية ما بتتوقفش من جوه. البحث ده blocking (pipe)، فالمطابق بيتنادى على
+  thread (Pipeline) مش على الـ event loop. النمط اللي يعدي المهلة كذا مرة
+  بيتقفل تلقائياً.
+"""
+
+import os
+import re
+import sys
+import json
+import math
+import time
+import select
+import logging
+import threading
+import subprocess
+from functools import lru_cache
+
+try:
+    from re import _parser as _sre, _constants as _sc   # Python 3.11+
+except ImportError:
+    import sre_parse as _sre, sre_constants as _sc
+
+try:
+    import regex as _engine  # اختياري — بيدعم timeout حقيقي
+except ImportError:
+    _engine = None
+
+log = logging.getLogger("userbot")
+
+HAS_TIMEOUT = _engine is not None
+
+_REPEATS = (_sc.MAX_REPEAT, _sc.MIN_REPEAT)
+# الحروف اللي كل category بيقبلها (للمقارنة مع حرف صريح)
+_CATEGORIES = {
+    _sc.CATEGORY_DIGIT: re.compile(r"\d"),
+    _sc.CATEGORY_WORD: re.compile(r"\w"),
+    _sc.CATEGORY_SPACE: re.compile(r"\s"),
+}
+_DIGIT_WORD = {_sc.CATEGORY_DIGIT, _sc.CATEGORY_WORD}
+# أقصى مدى [a-z] بيتفك لحروف — أكبر من كده بيتعامل كأي حرف
+_MAX_RANGE = 256
+
+# ──────────────────────────── COMPILE ───────────────────────────
+
+@lru_cache(maxsize=1024)
+def compile_pattern(pattern: str):
+    """ترجمة نمط مطبّع مرة واحدة (re.error لو غير صالح)."""
+    if _engine is not None:
+        try:
+            return _engine.compile(pattern, _engine.IGNORECASE | _engine.V0)
+        except _engine.error as e:
+            raise re.error(str(e)) from None
+    return re.compile(pattern, re.IGNORECASE)
+
+
+def is_dangerous(pattern: str) -> bool:
+    """نمط ممكن يعمل catastrophic backtracking: (a+)+ ، ((ab)*)+ ، (a|aa)+$ ، (\\w*\\s?)*"""
+    try:
+        tree = _sre.parse(pattern)
+    except re.error:
+        return False
+    return _nested(tree, False)
+
+
+def _variable(av) -> bool:
+    """تكرار بعدد مش ثابت (+ * {2,} {1,3}) — {3} ثابت ومش خطر."""
+    low, high, _ = av
+    return high != low and high > 1
+
+
+def _nested(items, repeated: bool) -> bool:
+    """في التكرار ده (أو جوه مجموعاته) تكرار تاني، أو بدائل متداخلة؟"""
+    for op, av in items:
+        if op in _REPEATS:
+            if _variable(av):
+                if repeated or _ambiguous(av[2]) or _nested(av[2], True):
+                    return True
+            elif _nested(av[2], repeated):
+                return True
+        elif op is _sc.SUBPATTERN:
+            if _nested(av[-1], repeated):
+                return True
+        elif op is _sc.BRANCH:
+            if any(_nested(alt, repeated) for alt in av[1]):
+                return True
+        elif op in (_sc.ASSERT, _sc.ASSERT_NOT):
+            if _nested(av[1], repeated):
+                return True
+    return False
+
+
+def _ambiguous(items) -> bool:
+    """بدائل جوه جسم التكرار ممكن تبدأ بنفس الحرف: (a|aa) ، (\\d|\\w)."""
+    for op, av in items:
+        if op is _sc.SUBPATTERN:
+            if _ambiguous(av[-1]):
+                return True
+        elif op is _sc.BRANCH:
+            firsts = [_first(alt) for alt in av[1]]
+            for i, a in enumerate(firsts):
+                if any(_overlap(a, b) for b in firsts[i + 1:]):
+                    return True
+    return False
+
+
+def _first(items):
+    """الحروف اللي الجزء ده ممكن يبدأ بيها: (حروف صريحة, categories) — None = أي حرف."""
+    for op, av in items:
+        if op is _sc.AT:
+            continue
+        if op is _sc.LITERAL:
+            return {chr(av).lower()}, set()
+        if op is _sc.IN:
+            chars, cats = set(), set()
+            for kind, value in av:
+                if kind is _sc.LITERAL:
+                    chars.add(chr(value).lower())
+                elif kind is _sc.RANGE and value[1] - value[0] < _MAX_RANGE:
+                    chars.update(chr(c).lower() for c in range(value[0], value[1] + 1))
+                elif kind is _sc.CATEGORY and value in _CATEGORIES:
+                    cats.add(value)
+                else:
+                    return None
+            return chars, cats
+        if op is _sc.SUBPATTERN:
+            return _first(av[-1])
+        if op is _sc.BRANCH:
+            chars, cats = set(), set()
+            for alt in av[1]:
+                first = _first(alt)
+                if first is None:
+                    return None
+                chars |= first[0]
+                cats |= first[1]
+            return chars, cats
+        if op in _REPEATS and av[0] > 0:
+            return _first(av[2])
+        return None
+    # فاضي — ممكن يتطابق مع لا شيء
+    return None
+
+
+def _overlap(a, b) -> bool:
+    if a is None or b is None:
+        return True
+    chars_a, cats_a = a
+    chars_b, cats_b = b
+    if chars_a & chars_b:
+        return True
+    # \d جزء من \w
+    if any(x is y or {x, y} == _DIGIT_WORD for x in cats_a for y in cats_b):
+        return True
+    return any(_CATEGORIES[cat].match(c) for cat in cats_a for c in chars_b) or \
+        any(_CATEGORIES[cat].match(c) for cat in cats_b for c in chars_a)
+
+
+def check_pattern(pattern: str) -> str:
+    """فحص نمط قبل إضافته. ترجع سبب الرفض أو None لو سليم."""
+    try:
+        re.compile(pattern)
+    except re.error as e:
+        return f"غير صالح: {e}"
+    if is_dangerous(pattern) and not HAS_TIMEOUT:
+        return "quantifier متداخل أو بدائل متداخلة جوه تكرار — ممكن يوقف البوت (اكتبه من غير تداخل)"
+    return None
+
+# ──────────────────────────── SANDBOX ───────────────────────────
+
+class RegexSandbox:
+    """re.search في process منفصل — لو عدى المهلة الـ process بيتقتل ويتعمل غيره.
+
+    بيتعمل بس لما regex مش متسطبة. الـ worker بيشتغل بـ python regex_guard.py
+    (مش multiprocessing) عشان ما يعيدش تحميل main.py في الـ process الجديد.
+    فيه worker احتياطي جاهز دايماً (بيتشغل في الخلفية): بعد أي قتل بياخد مكانه
+    فوراً. لو مفيش احتياطي جاهز (قتل ورا قتل) البحث بيستنى تشغيل worker جديد جوه
+    مهلته — الوقت ده بيتحسب على النمط زي أي بطء.
+    """
+
+    def __init__(self):
+        self.proc = None
+        self.spare = None
+        self.spawning = False
+        self.closed = False
+        self.lock = threading.RLock()
+        self.stats = {"searches": 0, "killed": 0, "spawned": 0}
+
+    @staticmethod
+    def _spawn():
+        proc = subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), "--worker"],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, bufsize=0,
+        )
+        # الـ worker بيبعت سطر أول ما يجهز
+        os.read(proc.stdout.fileno(), 2)
+        return proc
+
+    def start(self):
+        """تجهيز worker احتياطي في الخلفية (من غير ما حد يستناه)."""
+        with self.lock:
+            if self.closed or self.spawning or self.spare is not None:
+                return
+            self.spawning = True
+        threading.Thread(target=self._prepare_spare, name="regex-sandbox", daemon=True).start()
+
+    def _prepare_spare(self):
+        try:
+            proc = self._spawn()
+        except OSError as e:
+            log.warning(f"⚠️  تعذر تشغيل worker الـ regex: {e}")
+            proc = None
+        with self.lock:
+            self.spawning = False
+            if proc is None:
+                return
+            if self.spare is None and not self.closed:
+                self.spare = proc
+            else:
+                proc.kill()
+                proc.wait()
+
+    def ensure(self):
+        """worker شغال: الحالي، أو الاحتياطي، أو واحد جديد (blocking)."""
+        with self.lock:
+            if self.proc is not None and self.proc.poll() is None:
+                return
+            if self.spare is not None and self.spare.poll() is None:
+                self.proc, self.spare = self.spare, None
+            else:
+                self.proc = self._spawn()
+            self.stats["spawned"] += 1
+        self.start()
+
+    def search(self, compiled, text: str, timeout: float) -> bool:
+        """هل النمط موجود في النص؟ TimeoutError لو عدى المهلة أو الـ worker وقع (وبيتقتل)."""
+        with self.lock:
+            try:
+                self.ensure()
+                request = json.dumps([compiled.pattern, compiled.flags, text], ensure_ascii=False)
+                self.proc.stdin.write(request.encode("utf-8") + b"\n")
+                self.stats["searches"] += 1
+                ready, _, _ = select.select([self.proc.stdout], [], [], timeout)
+                reply = os.read(self.proc.stdout.fileno(), 2) if ready else b""
+            except (OSError, EOFError):
+                # الـ worker مات (BrokenPipe) — نفس معاملة المهلة
+                reply = b""
+            if reply not in (b"1\n", b"0\n"):
+                self.stats["killed"] += 1
+                self._kill()
+                raise TimeoutError
+            return reply == b"1\n"
+
+    def _kill(self):
+        if self.proc is not None:
+            self.proc.kill()
+            self.proc.wait()
+            self.proc = None
+
+    def close(self):
+        with self.lock:
+            self.closed = True
+            self._kill()
+            if self.spare is not None:
+                self.spare.kill()
+                self.spare.wait()
+                self.spare = None
+
+
+def _worker():
+    """حلقة الـ worker: سطر JSON [نمط, flags, نص] → 1 أو 0."""
+    out = sys.stdout.buffer
+    search = lru_cache(maxsize=1024)(lambda pattern, flags: re.compile(pattern, flags).search)
+    try:
+        out.write(b"R\n")
+        out.flush()
+        for line in sys.stdin.buffer:
+            pattern, flags, text = json.loads(line)
+            out.write(b"1\n" if search(pattern, flags)(text) else b"0\n")
+            out.flush()
+    except (BrokenPipeError, KeyboardInterrupt):
+        # البرنامج الأساسي قفل أو قتلنا
+        pass
+
+# ──────────────────────────── GUARD ─────────────────────────────
+
+class RegexGuard:
+    """مهلة لكل نمط + قفل تلقائي بعد strikes تجاوزات. مشترك بين كل نسخ المطابق."""
+
+    def __init__(self, budget: float = 0.05, strikes: int = 3, disabled=(), on_disable=None):
+        self.budget = budget
+        self.strikes = strikes
+        self.on_disable = on_disable
+        self.slow: dict[str, int] = {}        # keyword → عدد مرات تجاوز المهلة
+        self.disabled: set[str] = set(disabled)
+        # من غير regex: البحث في process بيتقتل عند المهلة (start() بيشغله في الخلفية)
+        self.sandbox = None if HAS_TIMEOUT else RegexSandbox()
+
+    @property
+    def blocking(self) -> bool:
+        """البحث بيستنى process تاني؟ (يبقى لازم يتنادى بره الـ event loop)"""
+        return self.sandbox is not None
+
+    def start(self):
+        if self.sandbox is not None:
+            self.sandbox.start()
+
+    def allowed(self, keyword: str, pattern: str) -> bool:
+        """هل النمط ينفع يتفحص؟ بدون timeout بنقفل الأنماط الخطرة من البداية."""
+        if keyword in self.disabled:
+            return False
+        if not HAS_TIMEOUT and is_dangerous(pattern):
+            log.warning(f"⚠️  نمط regex خطر (تكرار متداخل) — اتقفل: {keyword}")
+            self.disable(keyword)
+            return False
+        return True
+
+    def timed(self, compiled, text: str) -> tuple:
+        """بحث بمهلة. ترجع (النتيجة, الوقت بالثواني) — النتيجة None لو المهلة خلصت."""
+        start = time.perf_counter()
+        try:
+            if HAS_TIMEOUT:
+                found = compiled.search(text, timeout=self.budget)
+            else:
+                found = self.sandbox.search(compiled, text, self.budget)
+        except TimeoutError:
+            # المهلة خلصت (أو الـ worker وقع) — بيتحسب تجاوز حتى لو الوقت المقاس أقل
+            return None, max(time.perf_counter() - start, math.nextafter(self.budget, math.inf))
+        return found, time.perf_counter() - start
+
+    def search(self, keyword: str, compiled, text: str) -> tuple:
+        """بحث بمهلة مع تسجيل التجاوز. ترجع (النتيجة, اتقفل؟)."""
+        found, elapsed = self.timed(compiled, text)
+        if elapsed <= self.budget:
+            return found, False
+        return found, self.strike(keyword, elapsed)
+
+    def strike(self, keyword: str, elapsed: float) -> bool:
+        count = self.slow.get(keyword, 0) + 1
+        self.slow[keyword] = count
+        log.warning(f"🐢  نمط regex بطيء ({elapsed * 1000:.0f}ms) [{count}/{self.strikes}]: {keyword}")
+        if count >= self.strikes:
+            self.disable(keyword)
+            return True
+        return False
+
+    def disable(self, keyword: str):
+        if keyword in self.disabled:
+            return
+        self.disabled.add(keyword)
+        log.warning(f"⛔  تم قفل نمط regex: {keyword}")
+        if self.on_disable is not None:
+            self.on_disable(keyword)
+
+    def reset(self):
+        self.slow.clear()
+        self.disabled.clear()
+
+    def close(self):
+        if self.sandbox is not None:
+            self.sandbox.close()
+
+
+if __name__ == "__main__" and sys.argv[1:] == ["--worker"]:
+    _worker()
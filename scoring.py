@@ -0,0 +1,182 @@
+"""
+Scoring
+=======
+درجة وفئة لكل تنبيه بدل ما أي كلمة متطابقة = تنبيه بنفس الأهمية.
+
+- الدرجة = وزن أتقل كلمة متطابقة + نص وزن الباقي (كلمات كتير متداخلة زي
+  "ابي مساعده" و"ابي مساعدة" ما تنفخش الدرجة). الوزن بيتحدد بـ /weight، ولو مش
+  محدد بيبقى عدد كلمات العبارة (لحد AUTO_WEIGHT_MAX): "يساعدني" لوحدها = 1 ،
+  "ابي احد يسوي لي سكليف" = 3.
+- الفئة = فئة أتقل كلمة متطابقة ليها فئة. لو مفيش، نموذج bag-of-words صغير
+  (Naive Bayes على unigrams + bigrams بـ feature hashing) متدرب من سجل التنبيهات
+  بيخمن الفئة من النص.
+- score_batch() بتقيّم دفعة كاملة مرة واحدة: مع numpy الدفعة كلها gather + reduceat
+  على مصفوفة الأوزان، ومن غيرها loop عادي بنفس النتيجة.
+"""
+
+import math
+import logging
+import importlib.util
+from collections import Counter
+
+from normalize import normalize_arabic
+
+# numpy اختياري — تقييم الدفعات vectorized. الـ import نفسه (~50ms) بيتأجل لحد
+# أول تدريب للنموذج بدل ما يتحسب على وقت التشغيل.
+HAS_NUMPY = importlib.util.find_spec("numpy") is not None
+np = None
+
+log = logging.getLogger("userbot")
+
+AUTO_WEIGHT_MAX = 3
+# وزن الكلمات المتطابقة بعد أتقل واحدة
+EXTRA_FACTOR = 0.5
+# حد الـ 🔥: أغلب الكلمات الافتراضية عبارات 3 كلمات (وزن 3)، فتطابق واحد لوحده
+# ما يبقاش عالي القيمة — محتاج عبارة تانية معاه (3 + 0.5 × 2). bench/bench_scoring.py
+# بيطبع النسبة (~18% على الـ corpus الصناعي)
+DEFAULT_HIGH = 4.0
+# feature hashing: 2^16 عمود — مع 5 فئات ~1.3MB (float32)
+HASH_BITS = 16
+HASH_MASK = (1 << HASH_BITS) - 1
+SMOOTHING = 1.0
+# أقل عدد تنبيهات مصنفة (وفئتين على الأقل) قبل ما النموذج يشتغل
+MIN_SAMPLES = 20
+TRAIN_LIMIT = 5000
+
+
+def _load_numpy():
+    global np
+    if np is None and HAS_NUMPY:
+        import numpy
+        np = numpy
+    return np
+
+# ──────────────────────────── FEATURES ──────────────────────────
+
+def features(normalized: str) -> list[int]:
+    """unigrams + bigrams لنص مطبّع → أرقام أعمدة (hash — النموذج بيتدرب في نفس التشغيل)."""
+    tokens = normalized.split()
+    grams = [hash(t) & HASH_MASK for t in tokens]
+    grams += [hash((a, b)) & HASH_MASK for a, b in zip(tokens, tokens[1:])]
+    return grams
+
+
+def keyword_weight(kw: dict) -> float:
+    """وزن الكلمة: المحدد بـ /weight أو عدد كلمات العبارة."""
+    if kw.get("weight") is not None:
+        return kw["weight"]
+    if kw["is_regex"]:
+        return 1.0
+    return float(min(len(kw["keyword"].split()), AUTO_WEIGHT_MAX))
+
+# ──────────────────────────── MODEL ─────────────────────────────
+
+class CategoryModel:
+    """Multinomial Naive Bayes: log P(feature | فئة) لكل عمود + log P(فئة)."""
+
+    def __init__(self, categories: list[str], priors: list[float], counts: list[Counter], samples: int):
+        self.categories = categories
+        self.samples = samples
+        self.priors = priors
+        # العمود اللي ما ظهرش في فئة معينة ليه قيمة ثابتة (smoothing)
+        totals = [sum(c.values()) + SMOOTHING * (HASH_MASK + 1) for c in counts]
+        self.unseen = [math.log(SMOOTHING / total) for total in totals]
+        seen = set().union(*counts)
+        self.table = {
+            f: [math.log((c[f] + SMOOTHING) / total) for c, total in zip(counts, totals)]
+            for f in seen
+        }
+        self.matrix = None
+        if _load_numpy() is not None:
+            # مصفوفة كاملة (أعمدة × فئات) — الـ gather بيبقى indexing واحد
+            self.matrix = np.tile(np.array(self.unseen, dtype=np.float32), (HASH_MASK + 1, 1))
+            if seen:
+                rows = np.fromiter(self.table.keys(), dtype=np.int64, count=len(self.table))
+                self.matrix[rows] = np.array(list(self.table.values()), dtype=np.float32)
+            self.prior_vector = np.array(priors, dtype=np.float32)
+
+    def __len__(self) -> int:
+        return len(self.categories)
+
+    def predict(self, texts: list[str]) -> list[str]:
+        """أرجح فئة لكل نص (مطبّع) في الدفعة — None للنص الفاضي."""
+        grams = [features(text) for text in texts]
+        result = [None] * len(texts)
+        filled = [i for i, g in enumerate(grams) if g]
+        if not filled:
+            return result
+
+        if self.matrix is not None:
+            index = np.fromiter((f for i in filled for f in grams[i]), dtype=np.int64)
+            offsets = np.cumsum([0] + [len(grams[i]) for i in filled[:-1]])
+            # (دفعة × فئات): مجموع log-probs لكل رسالة في عملية واحدة
+            scores = np.add.reduceat(self.matrix[index], offsets, axis=0) + self.prior_vector
+            for i, best in zip(filled, scores.argmax(axis=1)):
+                result[i] = self.categories[best]
+            return result
+
+        table, unseen = self.table, self.unseen
+        for i in filled:
+            totals = list(self.priors)
+            for f in grams[i]:
+                for c, value in enumerate(table.get(f, unseen)):
+                    totals[c] += value
+            result[i] = self.categories[max(range(len(totals)), key=totals.__getitem__)]
+        return result
+
+
+def train(rows: list[tuple[str, str]], keywords: list[dict]) -> CategoryModel:
+    """تدريب النموذج من السجل: (الكلمات المتطابقة, النص المطبّع).
+
+    التصنيف = فئة أتقل كلمة متطابقة ليها فئة دلوقتي (مش وقت التنبيه) — أي /weight
+    جديد بيبان بعد إعادة التدريب. ترجع None لو البيانات مش كفاية.
+    """
+    by_keyword = {kw["keyword"]: kw for kw in keywords if kw.get("category")}
+    labelled = []
+    for matched, text in rows:
+        found = [by_keyword[k] for k in matched.split(", ") if k in by_keyword]
+        if found:
+            labelled.append((max(found, key=keyword_weight)["category"], text))
+    docs = Counter(category for category, _ in labelled)
+    if len(labelled) < MIN_SAMPLES or len(docs) < 2:
+        return None
+
+    categories = sorted(docs)
+    position = {c: i for i, c in enumerate(categories)}
+    counts = [Counter() for _ in categories]
+    for category, text in labelled:
+        counts[position[category]].update(features(text))
+    priors = [math.log(docs[c] / len(labelled)) for c in categories]
+    return CategoryModel(categories, priors, counts, len(labelled))
+
+# ──────────────────────────── SCORER ────────────────────────────
+
+class Scorer:
+    """أوزان وفئات الكلمات + النموذج + الحدود. بيتبني من جديد مع أي تغيير في الكلمات أو الأوزان."""
+
+    def __init__(self, keywords: list[dict], model: CategoryModel = None, threshold: float = 0, high: float = DEFAULT_HIGH):
+        self.weights = {kw["keyword"]: keyword_weight(kw) for kw in keywords}
+        self.categories = {kw["keyword"]: kw["category"] for kw in keywords if kw.get("category")}
+        self.model = model
+        self.threshold = threshold      # أقل درجة للتنبيه
+        self.high = high                # من الدرجة دي التنبيه بيتبعت قبل الباقي
+
+    def score_batch(self, texts: list[str], matched: list[list[str]]) -> list[tuple[float, str]]:
+        """(درجة, فئة) لكل رسالة في الدفعة."""
+        weights, categories = self.weights, self.categories
+        scores = []
+        for kws in matched:
+            values = [weights.get(k, 1.0) for k in kws]
+            top = max(values, default=0.0)
+            scores.append(top + EXTRA_FACTOR * (sum(values) - top))
+        labels = []
+        for kws in matched:
+            labelled = [k for k in kws if k in categories]
+            labels.append(categories[max(labelled, key=weights.__getitem__)] if labelled else None)
+
+        missing = [i for i, label in enumerate(labels) if label is None]
+        if missing and self.model is not None:
+            guesses = self.model.predict([normalize_arabic(texts[i]) for i in missing])
+            for i, guess in zip(missing, guesses):
+                labels[i] = guess
+        return list(zip(scores, labels))
@@ -33,6 +33,51 @@ if command -v termux-wake-lock &>/dev/null; then
     termux-wake-lock
 fi
 
-# تشغيل البوت
-echo "🚀  جاري تشغيل البوت..."
-python main.py
+set +e
+
+# ملف الـ heartbeat (لازم يطابق HEARTBEAT_FILE في .env لو اتغير)
+HEARTBEAT="${HEARTBEAT_FILE:-heartbeat.json}"
+# لو الملف ما اتحدثش المدة دي (ثواني) البرنامج معلّق — نعيد تشغيله
+STALE_AFTER="${STALE_AFTER:-180}"
+delay=2
+
+# تشغيل البوت — ولو وقع نعيد تشغيله (إعادة الاتصال العادية بتحصل جوه البرنامج نفسه)
+while true; do
+    echo "🚀  جاري تشغيل البوت..."
+    started=$(date +%s)
+    # heartbeat قديم من تشغيل سابق ما يتحسبش
+    rm -f "$HEARTBEAT"
+    # 0<&0: الـ stdin يفضل الترمنال (تسجيل الدخول أول مرة بيطلب الكود)
+    python main.py "$@" 0<&0 &
+    pid=$!
+    trap 'kill -INT $pid 2>/dev/null; wait $pid; exit 0' INT TERM
+
+    while kill -0 "$pid" 2>/dev/null; do
+        sleep 30
+        if [ -f "$HEARTBEAT" ]; then
+            age=$(( $(date +%s) - $(stat -c %Y "$HEARTBEAT") ))
+            if [ "$age" -gt "$STALE_AFTER" ]; then
+                echo "⚠️  مفيش heartbeat من ${age}s — إعادة تشغيل..."
+                kill "$pid" 2>/dev/null
+                sleep 5
+                kill -9 "$pid" 2>/dev/null
+            fi
+        fi
+    done
+    wait "$pid"
+    code=$?
+    trap - INT TERM
+
+    # 0 = إيقاف عادي (Ctrl+C) ، 2 = الجلسة اتلغت (لازم تسجيل دخول من جديد)
+    if [ "$code" -eq 0 ] || [ "$code" -eq 2 ]; then
+        exit "$code"
+    fi
+
+    # لو فضل شغال فترة كويسة نرجع الانتظار للأول
+    if [ $(( $(date +%s) - started )) -gt 300 ]; then
+        delay=2
+    fi
+    echo "🔁  البوت وقف (كود $code) — إعادة التشغيل بعد ${delay}s..."
+    sleep "$delay"
+    delay=$(( delay * 2 > 60 ? 60 : delay * 2 ))
+done
@@ -0,0 +1,726 @@
+"""
+Storage
+=======
+قاعدة بيانات الكلمات المفتاحية والإعدادات (SQLite) + نسخة منها في الذاكرة.
+المسار الساخن (كل رسالة واردة) يقرأ من الذاكرة فقط — القاعدة تُلمس عند التعديل.
+"""
+
+import time
+import sqlite3
+import logging
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from normalize import normalize_keyword
+
+log = logging.getLogger("userbot")
+
+DB_FILE = "keywords.db"
+
+# قواعد الجروبات
+RULE_ALLOW = "allow"     # لو في جروبات مسموحة، الباقي كله بيتجاهل
+RULE_DENY = "deny"       # الجروب بيتجاهل دايماً
+
+# طرق مطابقة الكلمات العادية (غير regex)
+MODE_PHRASE = "phrase"   # العبارة كما هي (substring)
+MODE_WORDS = "words"     # كل كلمات العبارة موجودة بأي ترتيب
+
+# ──────────────────────────── DEFAULT KEYWORDS ──────────────────
+
+DEFAULT_KEYWORDS = [
+    "تعروفون احد يسوي",
+    "تعرفون احد يحل",
+    "تعرفون احد يطلع",
+    "تعرفون حد يسوي",
+    "تعرفون حد يساعندي",
+    "تعرفون حد يحل",
+    "تعرفون شخص يسوي",
+    "تعرفون شخص يحل",
+    "تعرفون شخص يطلع",
+    "تعرفون ناس يسون",
+    "تعرفون ناس تحل",
+    "تعرفون ناس يحلون",
+    "تعرفون ناس تطلع اعذار",
+    "تعرفون ناس تطلع سكليف",
+    "تعرفون ناس يطلعون اعذار",
+    "تعرفون ناس يطلعون سكليف",
+    "ابي احد يحل",
+    "ابي احد يسوي",
+    "ابي احد يساعدني",
+    "ابي احد يطلع",
+    "ابي احد يلخص",
+    "ابي مساعده",
+    "ابي مساعدة",
+    "ابي احد يصمم",
+    "عندكم احد يحل",
+    "عندكم احد يسوي",
+    "عندكم احد يطلع",
+    "ابغى احد يحل",
+    "ابغى احد يسوي",
+    "ابغى احد يطلع",
+    "ابغى احد يساعدني",
+    "احد يحل واجب",
+    "احد يسوي واجب",
+    "احد يطلع سكليف",
+    "احد يطلع اعذار",
+    "ابغا احد يحل",
+    "ابغا احد يسوي",
+    "ابغا احد يطلع",
+    "يحل كويز",
+    "من يحل واجب",
+    "من يسوي لي واجب",
+    "من يسوي سكليف",
+    "من يسوي تلخيص",
+    "من يسوي بروزنتيشن",
+    "من يسوي بوربوينت",
+    "من يسوي تصميم",
+    "من وين اجيب سكليف",
+    "كيف اجيب سكليف",
+    "كيف اخذ سكليف",
+    "كيف اجيب عذر",
+    "ابغى عذر",
+    "ابغا حد يحل واجب",
+    "ابي احد يحل لي واجب",
+    "فيه احد يقدر يسوي عرض",
+    "تعرفون احد يسوي برفريزنق",
+    "تعرفون احد يطلع سكليف",
+    "يساعدني",
+    "السلام عليكم فيه احد يحل",
+    "السلام عليكم فيه احد يسوي",
+    "السلام عليكم فيه احد يطلع",
+    "فيه احد يحل يساعدني",
+    "احد يعرف مضمون يسوي اعذار",
+    "تعرفون احد يسوي",
+    "احتاج مساعده",
+    "احتاج مساعدة",
+    "ابغى مساعده",
+    "ابغى مساعدة",
+    "حد يعرف حد يحل",
+    "حد يعرف حد يسوي",
+    "حد يعرف حد يطلع",
+    "حد يعرف حد يساعدني",
+    "بنات اللي يسون سكسليقات ثقه ولا ابي سكليف",
+    "ابي سكليف على تاريخ قديم في احد يسوي",
+    "احد يسوي عروض تقديميه",
+    "احد يسوي سكليف",
+    "احد يسوي بحث",
+    "احد يسوي عذر",
+    "احد يسوي تقرير",
+    "ابي عذر",
+    "ابغا عذر",
+    "احتاج عذر",
+    "احتاج اعذار",
+    "مين يحل كويز",
+    "مين يحل واجب",
+    "مين يحل واجبات",
+    "مين يسوي واجب",
+    "مين يسوي بحث",
+    "مين يسوي تقرير",
+    "مين يسوي عروض",
+    "مين يسوي سكليف",
+    "مين يطلع عذر",
+    "مين يطلع اعذار",
+    "مين يطلع سكليف",
+    "مين يطلع اجازة مرضية",
+    "فيه احد يطلع سكليف",
+    "فيه احد يطلع اعذار",
+    "فيه احد يطلع اجازة مرضية",
+    "فيه احد يسوي واجب",
+    "فيه احد يسوي واجبات",
+    "فيه احد يسوي بحوث",
+    "فيه احد يسوي بحث",
+    "ابي رقم احد يسوي سكليف ثقه",
+    "ابي رقم احد يسوي بحث",
+    "ابي رقم احد يسوي واجبات",
+    "ابي رقم احد يسوي اجازة مرضية",
+    "ابي رقم احد يسوي عرض",
+    "ابي رقم احد يسوي عروض",
+    "ابي احد يسوي لي سكليف",
+    "ابي احد يسوي لي تقرير",
+    "ابي احد يسوي لي بحث",
+    "تعرفون ناس يحلون واجبات",
+    "تعرفون ناس يسون بحوث",
+    "تعرفون ناس يسون عروض",
+    "تعرفون ناس يسون اجازات مرضية",
+    "ياخوان ابي حد يحل كويز فيزياء",
+    "ابي حد يحل كويز",
+    "السلام عليكم بغيت واحد يسوي لي ميرشنت",
+    "بغيت واحد يسوي لي ميرشنت",
+    "بغيت واحد يسوي لي واجب",
+    "احد يعرف شخص يسوي خريطه ذهنيه",
+    "احد يعرف شخص يسوي سكليف",
+    "مين يعرف يحل انقليزي",
+    "مين يعرف يحل واجب",
+    "مين يعرف يسوي بحث",
+    "ابي دكتور يحل لي",
+    "ابي دكتور يسوي لي",
+    "ابي دكتور يطلع لي",
+    "من يعرف واحد يسوي",
+]
+
+# ──────────────────────────── MIGRATIONS ────────────────────────
+
+# كل عنصر = نسخة schema جديدة (PRAGMA user_version = رقم العنصر).
+# لا تعدّل migration قديم — أضف واحد جديد في الآخر.
+MIGRATIONS = [
+    # 1 — الجداول الأصلية. IF NOT EXISTS عشان ملفات keywords.db القديمة (user_version = 0)
+    """
+    CREATE TABLE IF NOT EXISTS keywords (
+        id       INTEGER PRIMARY KEY AUTOINCREMENT,
+        keyword  TEXT    NOT NULL UNIQUE,
+        is_regex INTEGER NOT NULL DEFAULT 0
+    );
+    CREATE TABLE IF NOT EXISTS config (
+        key   TEXT PRIMARY KEY,
+        value TEXT
+    );
+    """,
+    # 2 — طابور التنبيهات اللي لسه ما اتبعتتش (عشان ما يضيعش تنبيه لو البرنامج وقف)
+    """
+    CREATE TABLE IF NOT EXISTS pending_alerts (
+        id         INTEGER PRIMARY KEY AUTOINCREMENT,
+        payload    TEXT    NOT NULL,
+        created_at REAL    NOT NULL
+    );
+    """,
+    # 3 — طريقة مطابقة لكل كلمة: phrase (العبارة كما هي) أو words (كل الكلمات بأي ترتيب)
+    """
+    ALTER TABLE keywords ADD COLUMN mode TEXT NOT NULL DEFAULT 'phrase';
+    """,
+    # 4 — فلترة الجروبات: قوائم سماح/حظر + كلمات مربوطة بجروبات معينة
+    """
+    CREATE TABLE IF NOT EXISTS chat_rules (
+        chat_id INTEGER PRIMARY KEY,
+        rule    TEXT    NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS keyword_scopes (
+        keyword TEXT    NOT NULL,
+        chat_id INTEGER NOT NULL,
+        PRIMARY KEY (keyword, chat_id)
+    );
+    """,
+    # 5 — سجل التنبيهات (البحث فيه بـ FTS5 — الفهرس بيتعمل في ensure_fts)
+    """
+    CREATE TABLE IF NOT EXISTS alert_history (
+        id          INTEGER PRIMARY KEY AUTOINCREMENT,
+        created_at  REAL    NOT NULL,
+        chat_id     INTEGER,
+        chat_title  TEXT,
+        sender_id   INTEGER,
+        sender_name TEXT,
+        msg_id      INTEGER,
+        link        TEXT,
+        matched     TEXT    NOT NULL,
+        text        TEXT    NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS alert_history_created ON alert_history (created_at);
+    """,
+    # 6 — backfill: آخر رسالة اتشافت في كل جروب + الفجوات اللي لسه ما اتفحصتش
+    """
+    CREATE TABLE IF NOT EXISTS chat_marks (
+        chat_id     INTEGER PRIMARY KEY,
+        last_msg_id INTEGER NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS backfill_gaps (
+        id        INTEGER PRIMARY KEY AUTOINCREMENT,
+        chat_id   INTEGER NOT NULL,
+        after_id  INTEGER NOT NULL,
+        before_id INTEGER
+    );
+    """,
+    # 7 — تقييم التنبيهات: وزن الكلمة (NULL = تلقائي من طولها) وفئتها
+    """
+    ALTER TABLE keywords ADD COLUMN weight REAL;
+    ALTER TABLE keywords ADD COLUMN category TEXT;
+    """,
+    # 8 — dead letters: تنبيه فشل نهائياً بيفضل محفوظ (مع السبب) بس بيطلع من طابور الإرسال
+    """
+    ALTER TABLE pending_alerts ADD COLUMN dead INTEGER NOT NULL DEFAULT 0;
+    ALTER TABLE pending_alerts ADD COLUMN error TEXT;
+    """,
+]
+
+# فهرس البحث النصي — external content فوق alert_history ومتزامن بـ triggers.
+# منفصل عن MIGRATIONS لأن FTS5 ممكن ما يكونش متاح في sqlite بتاع الجهاز.
+FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS alert_history_fts USING fts5(
+    text, matched, content='alert_history', content_rowid='id'
+);
+CREATE TRIGGER IF NOT EXISTS alert_history_ai AFTER INSERT ON alert_history BEGIN
+    INSERT INTO alert_history_fts (rowid, text, matched) VALUES (new.id, new.text, new.matched);
+END;
+CREATE TRIGGER IF NOT EXISTS alert_history_ad AFTER DELETE ON alert_history BEGIN
+    INSERT INTO alert_history_fts (alert_history_fts, rowid, text, matched)
+    VALUES ('delete', old.id, old.text, old.matched);
+END;
+"""
+
+HISTORY_COLUMNS = (
+    "created_at", "chat_id", "chat_title", "sender_id", "sender_name",
+    "msg_id", "link", "matched", "text",
+)
+
+PRAGMAS = (
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",     # آمن مع WAL وأسرع بكثير على flash
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA cache_size = -2000",       # ~2MB
+    "PRAGMA busy_timeout = 5000",
+)
+
+# ──────────────────────────── DATABASE ──────────────────────────
+
+class Database:
+    """اتصال SQLite واحد طول عمر البرنامج (WAL) بدل فتح اتصال لكل عملية."""
+
+    def __init__(self, path: str = DB_FILE):
+        self.path = path
+        # autocommit — المعاملات بتتفتح صراحةً في transaction()
+        self.conn = sqlite3.connect(path, isolation_level=None)
+        for pragma in PRAGMAS:
+            self.conn.execute(pragma)
+        self.migrate()
+        self.fts = self.ensure_fts()
+
+    @contextmanager
+    def transaction(self):
+        """معاملة واحدة — commit مرة واحدة في الآخر، rollback لو حصل خطأ."""
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield self.conn
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+        self.conn.execute("COMMIT")
+
+    def migrate(self):
+        """تطبيق أي migrations ناقصة بالترتيب."""
+        current = self.conn.execute("PRAGMA user_version").fetchone()[0]
+        for version in range(current + 1, len(MIGRATIONS) + 1):
+            script = MIGRATIONS[version - 1]
+            try:
+                self.conn.executescript(
+                    f"BEGIN;\n{script}\nPRAGMA user_version = {version};\nCOMMIT;"
+                )
+            except sqlite3.Error:
+                if self.conn.in_transaction:
+                    self.conn.execute("ROLLBACK")
+                raise
+            log.info(f"🗄  تم تطبيق migration رقم {version}.")
+
+    def ensure_fts(self) -> bool:
+        """إنشاء فهرس FTS5 للسجل لو مش موجود. ترجع False لو FTS5 مش مدعوم (البحث بـ LIKE)."""
+        exists = self.conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE name = 'alert_history_fts'"
+        ).fetchone()
+        try:
+            self.conn.executescript(f"BEGIN;\n{FTS_SCHEMA}\nCOMMIT;")
+        except sqlite3.OperationalError as e:
+            if self.conn.in_transaction:
+                self.conn.execute("ROLLBACK")
+            log.warning(f"⚠️  FTS5 غير متاح ({e}) — البحث في السجل هيبقى أبطأ.")
+            return False
+        if not exists:
+            # سجل قديم اتعمل قبل الفهرس
+            self.conn.execute("INSERT INTO alert_history_fts (alert_history_fts) VALUES ('rebuild')")
+        return True
+
+    def close(self):
+        self.conn.close()
+
+    def seed_defaults(self, keywords: list[str]) -> bool:
+        """إضافة الكلمات الافتراضية إذا كانت القاعدة فاضية — في معاملة واحدة.
+
+        ترجع True لو اتضافت.
+        """
+        count = self.conn.execute("SELECT COUNT(*) FROM keywords").fetchone()[0]
+        if count:
+            return False
+        log.info(f"📥  إضافة {len(keywords)} كلمة مفتاحية افتراضية...")
+        with self.transaction() as conn:
+            conn.executemany(
+                "INSERT OR IGNORE INTO keywords (keyword, is_regex) VALUES (?, 0)",
+                [(kw,) for kw in keywords],
+            )
+        log.info("✅  تمت إضافة الكلمات الافتراضية بنجاح.")
+        return True
+
+    def get_keywords(self) -> list[dict]:
+        """إرجاع كل الكلمات المفتاحية."""
+        rows = self.conn.execute(
+            "SELECT keyword, is_regex, mode, weight, category FROM keywords ORDER BY id"
+        ).fetchall()
+        return [
+            {"keyword": r[0], "is_regex": bool(r[1]), "mode": r[2], "weight": r[3], "category": r[4]}
+            for r in rows
+        ]
+
+    def add_keywords(self, items: list[dict]) -> list[bool]:
+        """إضافة عدة كلمات في معاملة واحدة. ترجع لكل كلمة True لو اتضافت."""
+        with self.transaction() as conn:
+            return [
+                conn.execute(
+                    "INSERT OR IGNORE INTO keywords (keyword, is_regex, mode, weight, category)"
+                    " VALUES (?, ?, ?, ?, ?)",
+                    (
+                        kw["keyword"], int(kw["is_regex"]), kw.get("mode", MODE_PHRASE),
+                        kw.get("weight"), kw.get("category"),
+                    ),
+                ).rowcount > 0
+                for kw in items
+            ]
+
+    def del_keywords(self, keywords: list[str]) -> list[bool]:
+        """حذف عدة كلمات في معاملة واحدة. ترجع لكل كلمة True لو اتحذفت."""
+        with self.transaction() as conn:
+            conn.executemany("DELETE FROM keyword_scopes WHERE keyword = ?", [(kw,) for kw in keywords])
+            return [
+                conn.execute("DELETE FROM keywords WHERE keyword = ?", (keyword,)).rowcount > 0
+                for keyword in keywords
+            ]
+
+    def import_keywords(self, items: list[dict], replace: bool = False) -> tuple[int, int, int]:
+        """استيراد كلمات بكل خصائصها في معاملة واحدة: الجديدة تتضاف والموجودة تتحدث
+        (النوع/الوزن/الفئة/الجروبات). replace=True يحذف كمان أي كلمة مش في القائمة.
+
+        ترجع (اتضافت, اتحدثت, اتحذفت).
+        """
+        names = {kw["keyword"] for kw in items}
+        with self.transaction() as conn:
+            existing = {row[0] for row in conn.execute("SELECT keyword FROM keywords")}
+            gone = [(kw,) for kw in existing - names] if replace else []
+            conn.executemany("DELETE FROM keyword_scopes WHERE keyword = ?", gone)
+            conn.executemany("DELETE FROM keywords WHERE keyword = ?", gone)
+            conn.executemany(
+                "INSERT INTO keywords (keyword, is_regex, mode, weight, category) VALUES (?, ?, ?, ?, ?)"
+                " ON CONFLICT (keyword) DO UPDATE SET is_regex = excluded.is_regex, mode = excluded.mode,"
+                " weight = excluded.weight, category = excluded.category",
+                [
+                    (kw["keyword"], int(kw["is_regex"]), kw.get("mode", MODE_PHRASE), kw.get("weight"), kw.get("category"))
+                    for kw in items
+                ],
+            )
+            # الجروبات في الملف بتستبدل القديمة (مفيش = كل الجروبات)
+            conn.executemany("DELETE FROM keyword_scopes WHERE keyword = ?", [(kw,) for kw in names])
+            conn.executemany(
+                "INSERT OR IGNORE INTO keyword_scopes (keyword, chat_id) VALUES (?, ?)",
+                [(kw["keyword"], c) for kw in items for c in kw.get("chats") or ()],
+            )
+        return len(names - existing), len(names & existing), len(gone)
+
+    def set_weight(self, keyword: str, weight: float, category: str) -> bool:
+        """وزن وفئة كلمة (None = تلقائي / بدون فئة). ترجع False لو الكلمة مش موجودة."""
+        return self.conn.execute(
+            "UPDATE keywords SET weight = ?, category = ? WHERE keyword = ?",
+            (weight, category, keyword),
+        ).rowcount > 0
+
+    def get_chat_rules(self) -> dict[int, str]:
+        """قواعد الجروبات: chat_id → allow/deny."""
+        return dict(self.conn.execute("SELECT chat_id, rule FROM chat_rules").fetchall())
+
+    def set_chat_rules(self, chat_ids: list[int], rule: str):
+        """تعيين قاعدة لعدة جروبات (rule=None يشيل القاعدة)."""
+        with self.transaction() as conn:
+            if rule is None:
+                conn.executemany("DELETE FROM chat_rules WHERE chat_id = ?", [(c,) for c in chat_ids])
+            else:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO chat_rules (chat_id, rule) VALUES (?, ?)",
+                    [(c, rule) for c in chat_ids],
+                )
+
+    def get_scopes(self) -> dict[str, set[int]]:
+        """الكلمات المربوطة بجروبات: keyword → مجموعة chat_id."""
+        scopes: dict[str, set[int]] = {}
+        for keyword, chat_id in self.conn.execute("SELECT keyword, chat_id FROM keyword_scopes"):
+            scopes.setdefault(keyword, set()).add(chat_id)
+        return scopes
+
+    def set_scope(self, keyword: str, chat_ids: list[int]):
+        """استبدال جروبات كلمة (قائمة فاضية = الكلمة تشتغل في كل الجروبات)."""
+        with self.transaction() as conn:
+            conn.execute("DELETE FROM keyword_scopes WHERE keyword = ?", (keyword,))
+            conn.executemany(
+                "INSERT OR IGNORE INTO keyword_scopes (keyword, chat_id) VALUES (?, ?)",
+                [(keyword, c) for c in chat_ids],
+            )
+
+    def set_config(self, key: str, value: str):
+        """تعيين إعداد في قاعدة البيانات."""
+        self.conn.execute("INSERT OR REPLACE INTO config (key, value) VALUES (?, ?)", (key, value))
+
+    def get_all_config(self) -> dict[str, str]:
+        """جلب كل الإعدادات مرة واحدة."""
+        rows = self.conn.execute("SELECT key, value FROM config").fetchall()
+        return {k: v for k, v in rows}
+
+    def add_pending_alert(self, payload: str) -> int:
+        """حفظ تنبيه في طابور الإرسال. ترجع رقمه."""
+        cur = self.conn.execute(
+            "INSERT INTO pending_alerts (payload, created_at) VALUES (?, ?)",
+            (payload, time.time()),
+        )
+        return cur.lastrowid
+
+    def del_pending_alerts(self, alert_ids: list[int]):
+        """حذف تنبيهات من الطابور بعد إرسالها — في معاملة واحدة."""
+        with self.transaction() as conn:
+            conn.executemany("DELETE FROM pending_alerts WHERE id = ?", [(i,) for i in alert_ids])
+
+    def get_pending_alerts(self) -> list[tuple[int, str]]:
+        """كل التنبيهات اللي لسه ما اتبعتتش بالترتيب."""
+        return self.conn.execute("SELECT id, payload FROM pending_alerts WHERE dead = 0 ORDER BY id").fetchall()
+
+    def dead_letter_alert(self, alert_id: int, error: str):
+        """تنبيه فشل نهائياً — بيطلع من الطابور ويفضل محفوظ بسبب الفشل."""
+        self.conn.execute("UPDATE pending_alerts SET dead = 1, error = ? WHERE id = ?", (error, alert_id))
+
+    def count_dead_alerts(self) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM pending_alerts WHERE dead = 1").fetchone()[0]
+
+    def open_backfill_gaps(self) -> tuple[dict[int, int], list[list]]:
+        """فجوة مفتوحة (after_id = آخر رسالة اتشافت) لكل جروب ملهوش فجوة مفتوحة.
+
+        ترجع (آخر رسالة لكل جروب, كل الفجوات [id, chat_id, after_id, before_id]).
+        """
+        with self.transaction() as conn:
+            conn.execute(
+                "INSERT INTO backfill_gaps (chat_id, after_id)"
+                " SELECT m.chat_id, m.last_msg_id FROM chat_marks m WHERE NOT EXISTS ("
+                "   SELECT 1 FROM backfill_gaps g WHERE g.chat_id = m.chat_id AND g.before_id IS NULL)"
+            )
+            marks = dict(conn.execute("SELECT chat_id, last_msg_id FROM chat_marks").fetchall())
+            gaps = [list(row) for row in conn.execute(
+                "SELECT id, chat_id, after_id, before_id FROM backfill_gaps ORDER BY id"
+            )]
+        return marks, gaps
+
+    def save_backfill(self, marks: dict[int, int], gaps: list[list], done: list[int]):
+        """حفظ آخر رسالة لكل جروب + تقدم الفجوات — في معاملة واحدة."""
+        with self.transaction() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO chat_marks (chat_id, last_msg_id) VALUES (?, ?)",
+                list(marks.items()),
+            )
+            conn.executemany(
+                "UPDATE backfill_gaps SET after_id = ?, before_id = ? WHERE id = ?",
+                [(after_id, before_id, gap_id) for gap_id, _, after_id, before_id in gaps],
+            )
+            conn.executemany("DELETE FROM backfill_gaps WHERE id = ?", [(i,) for i in done])
+
+    def add_history(self, rows: list[tuple]):
+        """إضافة دفعة تنبيهات للسجل في معاملة واحدة (بترتيب HISTORY_COLUMNS)."""
+        with self.transaction() as conn:
+            conn.executemany(
+                f"INSERT INTO alert_history ({', '.join(HISTORY_COLUMNS)})"
+                f" VALUES ({', '.join('?' * len(HISTORY_COLUMNS))})",
+                rows,
+            )
+
+    def prune_history(self, before: float) -> int:
+        """حذف السجل الأقدم من before (مدى على فهرس created_at). ترجع عدد المحذوف."""
+        with self.transaction() as conn:
+            return conn.execute("DELETE FROM alert_history WHERE created_at < ?", (before,)).rowcount
+
+    def history_samples(self, limit: int) -> list[tuple[str, str]]:
+        """آخر limit تنبيه (الكلمات المتطابقة, النص المطبّع) — لتدريب نموذج الفئات."""
+        return self.conn.execute(
+            "SELECT matched, text FROM alert_history ORDER BY id DESC LIMIT ?", (limit,)
+        ).fetchall()
+
+    def search_history(self, terms: list[str], limit: int, offset: int) -> tuple[int, list[dict]]:
+        """بحث في السجل (كل الكلمات لازم تكون موجودة) — الأحدث الأول. ترجع (العدد الكلي, الصفحة)."""
+        columns = ", ".join(f"h.{c}" for c in HISTORY_COLUMNS)
+        if self.fts:
+            # كل كلمة prefix بين "" — من غير ما المستخدم يقدر يكتب syntax بتاع FTS
+            query = " ".join('"{}"*'.format(t.replace('"', '""')) for t in terms)
+            source = (
+                "alert_history_fts f JOIN alert_history h ON h.id = f.rowid"
+                " WHERE alert_history_fts MATCH ?"
+            )
+            params = [query]
+        else:
+            source = "alert_history h WHERE " + " AND ".join(
+                "(h.text LIKE ? OR h.matched LIKE ?)" for _ in terms
+            )
+            params = [p for t in terms for p in (f"%{t}%", f"%{t}%")]
+        total = self.conn.execute(f"SELECT COUNT(*) FROM {source}", params).fetchone()[0]
+        rows = self.conn.execute(
+            f"SELECT {columns} FROM {source} ORDER BY h.id DESC LIMIT ? OFFSET ?",
+            params + [limit, offset],
+        ).fetchall()
+        return total, [dict(zip(HISTORY_COLUMNS, row)) for row in rows]
+
+# ──────────────────────────── IN-MEMORY STORE ───────────────────
+
+class KeywordStore:
+    """الكلمات والإعدادات في الذاكرة — تُحمّل مرة عند التشغيل وتتحدث مع كل تعديل.
+
+    القراءة (keywords / get_config) من الذاكرة مباشرة. أي عملية على القاعدة بتتنفذ
+    على thread واحد مخصص (single writer) عشان الـ event loop ما يتوقفش على I/O.
+    version يزيد مع كل تغيير في الكلمات (أو جروباتها)، عشان أي كاش معتمد عليها
+    (زي المطابق) يعرف إمتى يعيد البناء. الأوزان والفئات ليها weights_version لوحدها
+    — /weight بيعيد بناء التقييم بس، مش المطابق.
+
+    قواعد الجروبات في sets عشان chat_allowed() تبقى O(1) قبل أي شغل على النص.
+    """
+
+    def __init__(self, path: str = DB_FILE):
+        self.path = path
+        self.db: Database = None
+        self.keywords: list[dict] = []
+        self.config: dict[str, str] = {}
+        self.chat_rules: dict[int, str] = {}
+        self.allowed_chats: set[int] = set()
+        self.denied_chats: set[int] = set()
+        self.version = 0
+        self.weights_version = 0
+        # اتصال SQLite مربوط بالـ thread اللي فتحه — فكل الشغل على نفس الـ thread
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="db")
+
+    async def execute(self, fn, *args):
+        """تشغيل fn(db, *args) على thread القاعدة وانتظار النتيجة."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, lambda: fn(self.db, *args))
+
+    def _open(self) -> tuple:
+        self.db = Database(self.path)
+        return (
+            self.db.get_keywords(),
+            self.db.get_all_config(),
+            self.db.get_chat_rules(),
+            self.db.get_scopes(),
+        )
+
+    @staticmethod
+    def _prepare(kw: dict, chats=None) -> dict:
+        # التطبيع مرة واحدة هنا بدل ما يتعمل مع كل بناء للمطابق
+        kw["normalized"] = normalize_keyword(kw)
+        # None = الكلمة شغالة في كل الجروبات
+        kw["chats"] = frozenset(chats) if chats else None
+        return kw
+
+    async def load(self):
+        """فتح القاعدة (مع migrations) وتحميل كل شيء في الذاكرة."""
+        loop = asyncio.get_running_loop()
+        keywords, self.config, rules, scopes = await loop.run_in_executor(self.executor, self._open)
+        self.keywords = [self._prepare(kw, scopes.get(kw["keyword"])) for kw in keywords]
+        self._set_rules(rules)
+        self.version += 1
+        log.info(f"💾  تم تحميل {len(self.keywords)} كلمة من القاعدة.")
+
+    async def seed_defaults(self):
+        """الكلمات الافتراضية لو القاعدة فاضية (أول تشغيل) — القراءة من القاعدة
+        بتتعاد بس لو اتضافت فعلاً."""
+        if not await self.execute(Database.seed_defaults, DEFAULT_KEYWORDS):
+            return
+        keywords = await self.execute(Database.get_keywords)
+        self.keywords = [self._prepare(kw) for kw in keywords]
+        self.version += 1
+
+    async def close(self):
+        if self.db is not None:
+            await self.execute(Database.close)
+        self.executor.shutdown(wait=True)
+
+    def get_keywords(self) -> list[dict]:
+        return self.keywords
+
+    def get_config(self, key: str) -> str:
+        return self.config.get(key)
+
+    async def add_keywords(self, items: list[dict]) -> tuple[list[str], list[str]]:
+        """إضافة مجموعة كلمات دفعة واحدة ({"keyword", "is_regex", "mode", "weight"?, "category"?}).
+
+        ترجع (اتضافت, موجودة مسبقاً).
+        """
+        results = await self.execute(Database.add_keywords, items)
+        added = [kw["keyword"] for kw, ok in zip(items, results) if ok]
+        exist = [kw["keyword"] for kw, ok in zip(items, results) if not ok]
+        if added:
+            self.keywords = self.keywords + [
+                self._prepare({
+                    "keyword": kw["keyword"],
+                    "is_regex": bool(kw["is_regex"]),
+                    "mode": kw.get("mode", MODE_PHRASE),
+                    "weight": kw.get("weight"),
+                    "category": kw.get("category"),
+                })
+                for kw, ok in zip(items, results) if ok
+            ]
+            self.version += 1
+        return added, exist
+
+    async def del_keywords(self, keywords: list[str]) -> tuple[list[str], list[str]]:
+        """حذف مجموعة كلمات دفعة واحدة. ترجع (اتحذفت, غير موجودة)."""
+        results = await self.execute(Database.del_keywords, keywords)
+        deleted = [kw for kw, ok in zip(keywords, results) if ok]
+        not_found = [kw for kw, ok in zip(keywords, results) if not ok]
+        if deleted:
+            deleted_set = set(deleted)
+            self.keywords = [kw for kw in self.keywords if kw["keyword"] not in deleted_set]
+            self.version += 1
+        return deleted, not_found
+
+    async def import_keywords(self, items: list[dict], replace: bool = False) -> tuple[int, int, int]:
+        """استيراد ملف كلمات (keywords_io) — معاملة واحدة وزيادة version مرة واحدة،
+        يعني المطابق بيتبني مرة واحدة مهما كان عدد الكلمات. ترجع (اتضافت, اتحدثت, اتحذفت)."""
+        counts = await self.execute(Database.import_keywords, items, replace)
+        keywords, scopes = await self.execute(lambda db: (db.get_keywords(), db.get_scopes()))
+        self.keywords = [self._prepare(kw, scopes.get(kw["keyword"])) for kw in keywords]
+        self.version += 1
+        return counts
+
+    # ───────── فلترة الجروبات ─────────
+
+    def _set_rules(self, rules: dict[int, str]):
+        self.chat_rules = rules
+        self.allowed_chats = {c for c, r in rules.items() if r == RULE_ALLOW}
+        self.denied_chats = {c for c, r in rules.items() if r == RULE_DENY}
+
+    def chat_allowed(self, chat_id: int) -> bool:
+        """هل رسائل الجروب ده تستاهل تتفحص؟ (lookup في set — من غير أي شغل على النص)"""
+        if chat_id in self.denied_chats:
+            return False
+        return not self.allowed_chats or chat_id in self.allowed_chats
+
+    async def set_chat_rules(self, chat_ids: list[int], rule: str):
+        """allow / deny لعدة جروبات — rule=None يشيل القاعدة."""
+        await self.execute(Database.set_chat_rules, chat_ids, rule)
+        rules = dict(self.chat_rules)
+        for chat_id in chat_ids:
+            if rule is None:
+                rules.pop(chat_id, None)
+            else:
+                rules[chat_id] = rule
+        self._set_rules(rules)
+
+    async def set_scope(self, keyword: str, chat_ids: list[int]) -> bool:
+        """ربط كلمة بجروبات معينة (قائمة فاضية = كل الجروبات). ترجع False لو الكلمة مش موجودة."""
+        if not any(kw["keyword"] == keyword for kw in self.keywords):
+            return False
+        await self.execute(Database.set_scope, keyword, chat_ids)
+        self.keywords = [
+            dict(kw, chats=frozenset(chat_ids) if chat_ids else None) if kw["keyword"] == keyword else kw
+            for kw in self.keywords
+        ]
+        self.version += 1
+        return True
+
+    async def set_weight(self, keyword: str, weight: float, category: str) -> bool:
+        """وزن وفئة كلمة للتقييم (None = تلقائي / بدون فئة). ترجع False لو الكلمة مش موجودة."""
+        if not await self.execute(Database.set_weight, keyword, weight, category):
+            return False
+        self.keywords = [
+            dict(kw, weight=weight, category=category) if kw["keyword"] == keyword else kw
+            for kw in self.keywords
+        ]
+        self.weights_version += 1
+        return True
+
+    async def set_config(self, key: str, value: str):
+        # الذاكرة أولاً عشان أي قراءة بعدها تشوف القيمة الجديدة فوراً
+        self.config[key] = value
+        await self.execute(Database.set_config, key, value)
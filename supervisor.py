@@ -0,0 +1,147 @@
+"""
+Supervisor
+==========
+إبقاء الحسابات متصلة من غير ما البرنامج يقفل ويبدأ من الأول:
+
+- لو run_until_disconnected() رجعت أو وقعت (Android قفل الشبكة، Telethon خلص
+  محاولاته) بنعيد الاتصال في نفس البرنامج بـ backoff متزايد — المطابق والكاش
+  والطوابير كلها فاضلة في الذاكرة.
+- بعد كل اتصال: catch_up() — Telethon بيجيب التحديثات اللي فاتت من آخر pts/qts.
+  حالة التحديثات بتتحفظ في ملف الجلسة كل heartbeat (مش عند القفل النضيف بس)،
+  فحتى لو البرنامج اتقتل التشغيل الجاي بيكمل من آخر نقطة.
+- heartbeat: ملف صغير بيتحدث كل interval (الوقت + الاتصال + تأخير الـ event loop)
+  — scripts/run_termux.sh بيعيد تشغيل البرنامج لو الملف وقف يتحدث.
+"""
+
+import os
+import json
+import time
+import random
+import asyncio
+import inspect
+import logging
+
+from metrics import metrics
+
+log = logging.getLogger("userbot")
+
+BACKOFF_START = 1
+BACKOFF_MAX = 60
+
+# ──────────────────────────── ERRORS ────────────────────────────
+
+class SessionRevoked(Exception):
+    """الجلسة اتلغت (logout من جهاز تاني مثلاً) — إعادة الاتصال مش هتفيد."""
+
+# ──────────────────────────── SUPERVISOR ────────────────────────
+
+class Supervisor:
+    """حلقة اتصال لكل حساب + heartbeat واحد."""
+
+    def __init__(self, clients: list, heartbeat_file: str = None, interval: float = 30, max_delay: float = BACKOFF_MAX):
+        self.clients = clients
+        self.heartbeat_file = heartbeat_file
+        self.interval = interval
+        self.max_delay = max_delay
+        self.stats = {"reconnects": 0, "failures": 0, "beats": 0}
+
+    async def run(self):
+        """لحد ما الحساب الأساسي يتقفل نهائياً (SessionRevoked) أو الـ task تتلغي."""
+        primary, *others = self.clients
+        tasks = [asyncio.create_task(self._keep(account), name="supervise") for account in others]
+        tasks.append(asyncio.create_task(self._heartbeat(), name="heartbeat"))
+        try:
+            await self._keep(primary)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    # ───────── الاتصال ─────────
+
+    async def _keep(self, client):
+        primary = client is self.clients[0]
+        while True:
+            try:
+                await client.run_until_disconnected()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                log.warning(f"⚠️  الاتصال وقع: {e}")
+            try:
+                await self._reconnect(client)
+            except SessionRevoked:
+                if primary:
+                    raise
+                # حساب إضافي — الباقيين يكملوا من غيره
+                log.error("❌  جلسة حساب إضافي اتلغت — المراقبة بيه اتوقفت.")
+                return
+
+    async def _reconnect(self, client):
+        delay = BACKOFF_START
+        while True:
+            start = time.perf_counter()
+            try:
+                await client.connect()
+                if not await client.is_user_authorized():
+                    raise SessionRevoked()
+                # التحديثات اللي وصلت وإحنا مفصولين (من آخر pts/qts)
+                await client.catch_up()
+                self.stats["reconnects"] += 1
+                metrics.observe("reconnect", time.perf_counter() - start)
+                log.info(f"🔌  رجع الاتصال ({time.perf_counter() - start:.1f}s).")
+                return
+            except (asyncio.CancelledError, SessionRevoked):
+                raise
+            except Exception as e:
+                self.stats["failures"] += 1
+                # jitter عشان الحسابات ما تعيدش كلها في نفس اللحظة
+                wait = delay * random.uniform(0.8, 1.2)
+                log.warning(f"🔌  فشل إعادة الاتصال ({e}) — محاولة تانية بعد {wait:.0f}s")
+                await asyncio.sleep(wait)
+                delay = min(delay * 2, self.max_delay)
+
+    # ───────── heartbeat ─────────
+
+    @staticmethod
+    async def save_state(client):
+        """حفظ pts/qts والكيانات في ملف الجلسة.
+
+        Telethon بيعمل ده عند disconnect بس — مفيش API عام ليه، فبنستخدم الداخلي
+        لو موجود في النسخة المتسطبة (async في 1.x الجديدة، sync في القديمة).
+        """
+        save = getattr(client, "_save_states_and_entities", None)
+        if save is not None:
+            result = save()
+            if inspect.isawaitable(result):
+                await result
+            client.session.save()
+
+    def _write(self, payload: dict):
+        tmp = f"{self.heartbeat_file}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(payload, f)
+        os.replace(tmp, self.heartbeat_file)
+
+    async def _heartbeat(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self.interval)
+            # لو الـ loop كان مشغول (مطابقة تقيلة/I/O) الـ sleep بيصحى متأخر
+            lag = max(loop.time() - start - self.interval, 0.0)
+            metrics.observe("loop_lag", lag)
+            self.stats["beats"] += 1
+            connected = [client.is_connected() for client in self.clients]
+            for client, ok in zip(self.clients, connected):
+                if ok:
+                    try:
+                        await self.save_state(client)
+                    except Exception as e:
+                        log.debug("تعذر حفظ حالة التحديثات: %s", e)
+            if self.heartbeat_file:
+                payload = {"time": time.time(), "connected": connected, "lag": round(lag, 3)}
+                try:
+                    await loop.run_in_executor(None, self._write, payload)
+                except Exception as e:
+                    log.warning(f"⚠️  فشل كتابة ملف الـ heartbeat: {e}")
@@ -0,0 +1,10 @@
+"""
+إعداد مشترك للاختبارات — الموديولات في جذر المشروع (مش package)، فبنضيفه للـ path.
+
+    python -m pytest -q
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
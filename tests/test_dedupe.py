@@ -0,0 +1,62 @@
+"""اختبارات منع التكرار: check() و release() والوضع التقريبي."""
+
+from dedupe import Deduper
+
+
+def alert(text, sender_id=1):
+    return {"text": text, "sender_id": sender_id}
+
+
+def test_duplicate_returns_first_alert():
+    deduper = Deduper()
+    first = alert("مطلوب مبرمج بايثون")
+    assert deduper.check(first["text"], 1, first) is None
+    # نفس النص بعد التطبيع (همزات/تشكيل) = نفس الرسالة
+    assert deduper.check("مطلوب مُبرمج بأيثون", 2, alert("x", 2)) is first
+    assert deduper.suppressed == 1
+
+
+def test_by_sender_keeps_senders_apart():
+    deduper = Deduper(by_sender=True)
+    assert deduper.check("مطلوب مبرمج", 1, alert("مطلوب مبرمج", 1)) is None
+    assert deduper.check("مطلوب مبرمج", 2, alert("مطلوب مبرمج", 2)) is None
+
+
+def test_release_forgets_unsent_alert():
+    deduper = Deduper()
+    first = alert("شقة للبيع")
+    deduper.check(first["text"], 1, first)
+    # التنبيه ما دخلش الطابور — النسخة الجاية لازم تتبلغ
+    deduper.release(first["text"], 1, first)
+    assert len(deduper) == 0
+    second = alert("شقة للبيع")
+    assert deduper.check(second["text"], 1, second) is None
+
+
+def test_release_keeps_someone_elses_entry():
+    deduper = Deduper()
+    first, later = alert("شقة للبيع"), alert("شقة للبيع")
+    deduper.check(first["text"], 1, first)
+    assert deduper.check(later["text"], 1, later) is first
+    # later كان متكرر أصلاً — release بتاعه ما يمسحش بصمة first
+    deduper.release(later["text"], 1, later)
+    assert deduper.check("شقة للبيع", 1, alert("شقة للبيع")) is first
+
+
+def test_release_clears_near_duplicate_bands():
+    deduper = Deduper(near_duplicates=True)
+    text = "مطلوب مبرمج بايثون لمشروع صغير بالساعة والدفع اول باول"
+    first = alert(text)
+    deduper.check(text, 1, first)
+    deduper.release(text, 1, first)
+    assert deduper.band_index == {}
+    assert deduper.check(text + " جدا", 1, alert(text)) is None
+
+
+def test_near_duplicate_is_suppressed():
+    deduper = Deduper(near_duplicates=True)
+    text = "مطلوب مبرمج بايثون لمشروع صغير بالساعة والدفع اول باول"
+    first = alert(text)
+    deduper.check(text, 1, first)
+    # كلمة زيادة في الآخر — بصمة مختلفة بس قريبة (simhash)
+    assert deduper.check(text + " جدا", 2, alert(text + " جدا")) is first
@@ -0,0 +1,106 @@
+"""اختبارات تصدير/استيراد الكلمات: round-trip بالصيغتين ورفض السطور الغلط."""
+
+import asyncio
+
+import pytest
+
+import keywords_io
+from keywords_io import FORMAT_CSV, FORMAT_JSONL, export_keywords, parse_keywords
+from storage import KeywordStore, MODE_PHRASE, MODE_WORDS
+
+
+def keyword(text, mode=MODE_PHRASE, is_regex=False, weight=None, category=None, chats=None):
+    return KeywordStore._prepare(
+        {"keyword": text, "is_regex": is_regex, "mode": mode, "weight": weight, "category": category},
+        chats,
+    )
+
+
+KEYWORDS = [
+    keyword("ابي احد يحل"),
+    keyword("شقة للبيع", MODE_WORDS, weight=2.5, category="عقارات", chats=[-100123, -100456]),
+    keyword(r"01\d{9}", is_regex=True, weight=1),
+    keyword("مطلوب, مبرمج \"بايثون\"", category="شغل"),
+]
+
+
+def expected(kw: dict) -> dict:
+    return {
+        "keyword": kw["keyword"],
+        "is_regex": kw["is_regex"],
+        "mode": kw["mode"],
+        "weight": kw["weight"],
+        "category": kw["category"],
+        "chats": sorted(kw["chats"] or []),
+    }
+
+
+# ───────── round-trip ─────────
+
+@pytest.mark.parametrize("fmt", [FORMAT_JSONL, FORMAT_CSV])
+def test_round_trip(fmt):
+    items, errors = parse_keywords(export_keywords(KEYWORDS, fmt), fmt)
+    assert errors == []
+    assert items == [expected(kw) for kw in KEYWORDS]
+
+
+def test_round_trip_through_store(tmp_path):
+    async def scenario():
+        store = KeywordStore(str(tmp_path / "keywords.db"))
+        await store.load()
+        items, _ = parse_keywords(export_keywords(KEYWORDS), FORMAT_JSONL)
+        assert await store.import_keywords(items) == (len(KEYWORDS), 0, 0)
+        # نفس الملف تاني = تحديث بس، مفيش إضافة
+        assert await store.import_keywords(items) == (0, len(KEYWORDS), 0)
+        exported = export_keywords(store.get_keywords())
+        await store.close()
+        return exported
+
+    items, errors = parse_keywords(asyncio.run(scenario()), FORMAT_JSONL)
+    assert errors == []
+    assert items == [expected(kw) for kw in KEYWORDS]
+
+
+def test_detect_format():
+    assert keywords_io.detect_format("keywords.CSV") == FORMAT_CSV
+    assert keywords_io.detect_format("keywords.jsonl") == FORMAT_JSONL
+    assert keywords_io.detect_format(None) == FORMAT_JSONL
+
+
+def test_last_duplicate_wins():
+    data = '{"keyword": "شقة", "weight": 1}\n{"keyword": "شقة", "weight": 3}\n'.encode()
+    items, errors = parse_keywords(data, FORMAT_JSONL)
+    assert errors == [] and [item["weight"] for item in items] == [3.0]
+
+
+# ───────── الرفض ─────────
+
+@pytest.mark.parametrize("line", [
+    '{"regex": false}',
+    '{"keyword": "شقة", "mode": "fuzzy"}',
+    '{"keyword": "شقة", "weight": -1}',
+    '{"keyword": "شقة", "weight": "abc"}',
+    '{"keyword": "شقة", "weight": NaN}',
+    '{"keyword": "شقة", "weight": Infinity}',
+    '{"keyword": "شقة", "weight": "nan"}',
+    '{"keyword": "شقة", "weight": "-inf"}',
+    '{"keyword": "(a+)+$", "regex": true}',
+    '{"keyword": "[", "regex": true}',
+    '{"keyword": "شقة", "chats": ["abc"]}',
+    '["شقة"]',
+    '{"keyword": "شقة"',
+])
+def test_bad_line_is_rejected(line):
+    data = (line + '\n{"keyword": "سليمة"}\n').encode()
+    items, errors = parse_keywords(data, FORMAT_JSONL)
+    # السطر الغلط بيتساب مع سببه — والباقي بيتستورد عادي
+    assert [item["keyword"] for item in items] == ["سليمة"]
+    assert len(errors) == 1 and errors[0].startswith("سطر 1:")
+
+
+@pytest.mark.parametrize("weight", ["nan", "inf", "-1"])
+def test_bad_csv_weight_is_rejected(weight):
+    data = f"keyword,weight\nشقة,{weight}\nسليمة,2\n".encode()
+    items, errors = parse_keywords(data, FORMAT_CSV)
+    assert [item["keyword"] for item in items] == ["سليمة"]
+    assert len(errors) == 1 and errors[0].startswith("سطر 2:")
@@ -0,0 +1,88 @@
+"""اختبارات المطابق: العبارات، وضع words، الـ regex، fuzzy، وربط الكلمات بالجروبات."""
+
+import pytest
+
+from matcher import KeywordMatcher, match_keywords
+from storage import KeywordStore, MODE_PHRASE, MODE_WORDS
+
+
+def keyword(text, mode=MODE_PHRASE, is_regex=False, chats=None):
+    """نفس شكل الكلمة اللي بترجعها get_keywords() بعد التحميل."""
+    return KeywordStore._prepare(
+        {"keyword": text, "is_regex": is_regex, "mode": mode, "weight": None, "category": None},
+        chats,
+    )
+
+
+@pytest.fixture
+def keywords():
+    return [
+        keyword("ابي احد يحل"),
+        keyword("شقة للبيع", MODE_WORDS),
+        keyword("مطلوب مبرمج"),
+        keyword(r"\d{11}", is_regex=True),
+        keyword("تصميم شعار", chats=[5]),
+    ]
+
+
+# ───────── العبارات ─────────
+
+@pytest.mark.parametrize("fuzzy", [0, 1])
+def test_phrase_matches_after_normalization(keywords, fuzzy):
+    matcher = KeywordMatcher(keywords, fuzzy=fuzzy)
+    assert matcher.match("أبي أحد يحل الواجب") == ["ابي احد يحل"]
+
+
+@pytest.mark.parametrize("fuzzy", [0, 1])
+def test_phrase_keeps_word_order(keywords, fuzzy):
+    # العبارة لازم تبقى متتالية وبنفس الترتيب — حتى مع fuzzy
+    matcher = KeywordMatcher(keywords, fuzzy=fuzzy)
+    assert matcher.match("يحل احد ابي") == []
+    assert matcher.match("مبرمج مطلوب") == []
+
+
+def test_phrase_needs_every_word(keywords):
+    assert KeywordMatcher(keywords).match("ابغى احد يحل") == []
+
+
+# ───────── words (w:) ─────────
+
+@pytest.mark.parametrize("text", ["شقة للبيع", "للبيع شقة", "عندي للبيع في المعادي شقة"])
+def test_words_mode_matches_any_order(keywords, text):
+    assert KeywordMatcher(keywords).match(text) == ["شقة للبيع"]
+
+
+def test_words_mode_needs_every_word(keywords):
+    assert KeywordMatcher(keywords).match("شقة للايجار") == []
+
+
+# ───────── fuzzy ─────────
+
+def test_fuzzy_tolerates_typo(keywords):
+    assert KeywordMatcher(keywords).match("مطلوب مبرمح") == []
+    assert KeywordMatcher(keywords, fuzzy=1).match("مطلوب مبرمح") == ["مطلوب مبرمج"]
+
+
+def test_fuzzy_keeps_short_words_exact(keywords):
+    # أقل من 4 حروف = مطابقة تامة — "احد" ما تبقاش "احذ"
+    assert KeywordMatcher(keywords, fuzzy=1).match("ابي احذ يحل") == []
+
+
+# ───────── regex والجروبات ─────────
+
+def test_regex_keyword(keywords):
+    assert KeywordMatcher(keywords).match("رقمي 01234567890") == [r"\d{11}"]
+    assert KeywordMatcher(keywords).match("رقمي 0123") == []
+
+
+def test_scoped_keyword_only_in_its_chats(keywords):
+    matcher = KeywordMatcher(keywords)
+    assert matcher.match("تصميم شعار", 5) == ["تصميم شعار"]
+    assert matcher.match("تصميم شعار", 7) == []
+    # من غير chat_id (زي match_keywords) مفيش فلترة
+    assert matcher.match("تصميم شعار") == ["تصميم شعار"]
+
+
+def test_results_follow_keyword_order(keywords):
+    text = "مطلوب مبرمج وابي احد يحل"
+    assert match_keywords(text, keywords) == ["ابي احد يحل", "مطلوب مبرمج"]
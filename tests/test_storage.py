@@ -0,0 +1,99 @@
+"""اختبارات القاعدة: الـ migrations على ملف جديد وملف قديم، وكاش الكلمات في KeywordStore."""
+
+import asyncio
+import sqlite3
+
+from storage import Database, KeywordStore, MIGRATIONS, MODE_PHRASE, MODE_WORDS, DEFAULT_KEYWORDS
+
+
+def user_version(path) -> int:
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute("PRAGMA user_version").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def columns(db: Database, table: str) -> set[str]:
+    return {row[1] for row in db.conn.execute(f"PRAGMA table_info({table})")}
+
+
+# ───────── migrations ─────────
+
+def test_fresh_database_gets_every_migration(tmp_path):
+    path = str(tmp_path / "keywords.db")
+    db = Database(path)
+    assert {"mode", "weight", "category"} <= columns(db, "keywords")
+    assert {"dead", "error"} <= columns(db, "pending_alerts")
+    db.close()
+    assert user_version(path) == len(MIGRATIONS)
+
+
+def test_migrate_twice_is_a_no_op(tmp_path):
+    path = str(tmp_path / "keywords.db")
+    Database(path).close()
+    db = Database(path)
+    assert db.get_keywords() == []
+    db.close()
+    assert user_version(path) == len(MIGRATIONS)
+
+
+def test_legacy_database_keeps_its_keywords(tmp_path):
+    # keywords.db من قبل الـ migrations: الجدولين الأصليين و user_version = 0
+    path = str(tmp_path / "keywords.db")
+    conn = sqlite3.connect(path)
+    conn.executescript(
+        """
+        CREATE TABLE keywords (id INTEGER PRIMARY KEY AUTOINCREMENT, keyword TEXT NOT NULL UNIQUE,
+                               is_regex INTEGER NOT NULL DEFAULT 0);
+        CREATE TABLE config (key TEXT PRIMARY KEY, value TEXT);
+        INSERT INTO keywords (keyword, is_regex) VALUES ('شقة للبيع', 0), ('\\d{11}', 1);
+        INSERT INTO config (key, value) VALUES ('log_channel', '-100123');
+        """
+    )
+    conn.close()
+
+    db = Database(path)
+    assert db.get_keywords() == [
+        {"keyword": "شقة للبيع", "is_regex": False, "mode": MODE_PHRASE, "weight": None, "category": None},
+        {"keyword": "\\d{11}", "is_regex": True, "mode": MODE_PHRASE, "weight": None, "category": None},
+    ]
+    assert db.get_all_config() == {"log_channel": "-100123"}
+    db.close()
+    assert user_version(path) == len(MIGRATIONS)
+
+
+# ───────── KeywordStore ─────────
+
+def test_store_seeds_once_and_tracks_changes(tmp_path):
+    path = str(tmp_path / "keywords.db")
+
+    async def scenario():
+        store = KeywordStore(path)
+        await store.load()
+        await store.seed_defaults()
+        assert [kw["keyword"] for kw in store.get_keywords()] == DEFAULT_KEYWORDS
+
+        version = store.version
+        added, exist = await store.add_keywords([
+            {"keyword": "مطلوب مبرمج", "is_regex": False, "mode": MODE_WORDS},
+            {"keyword": DEFAULT_KEYWORDS[0], "is_regex": False},
+        ])
+        assert (added, exist) == (["مطلوب مبرمج"], [DEFAULT_KEYWORDS[0]])
+        assert store.version == version + 1
+        assert store.get_keywords()[-1]["normalized"]
+
+        deleted, not_found = await store.del_keywords(["مطلوب مبرمج", "مش موجودة"])
+        assert (deleted, not_found) == (["مطلوب مبرمج"], ["مش موجودة"])
+        assert store.version == version + 2
+        await store.close()
+
+        # تشغيل تاني: القاعدة مش فاضية فمفيش seed تاني، والحذف اتحفظ
+        store = KeywordStore(path)
+        await store.load()
+        await store.seed_defaults()
+        keywords = [kw["keyword"] for kw in store.get_keywords()]
+        await store.close()
+        return keywords
+
+    assert asyncio.run(scenario()) == DEFAULT_KEYWORDS